@@ -0,0 +1,122 @@
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from libs.vk import vk_json
+from libs.vk.vk_types import User, Post, parse
+
+__all__ = ['PAYLOADS', 'PATHS', 'measure', 'main']
+
+
+# ----------------------------------------------------------------------------
+#                         ТЕСТОВЫЕ ОТВЕТЫ VK
+# ----------------------------------------------------------------------------
+
+def _users(n: int) -> bytes:
+    items = [{
+        "id": 100000 + i, "first_name": "Иван", "last_name": f"Петров{i}", "can_access_closed": True,
+        "is_closed": False, "sex": 2, "screen_name": f"id{100000 + i}", "photo_100": f"https://sun.userapi.com/{i}.jpg",
+        "city": {"id": 1, "title": "Москва"}, "online": i % 2,
+    } for i in range(n)]
+    return json.dumps({"response": items}, ensure_ascii=False).encode()
+
+
+def _friends(n: int) -> bytes:
+    return json.dumps({"response": {"count": n, "items": list(range(1, n + 1))}}).encode()
+
+
+def _wall(n: int) -> bytes:
+    items = [{
+        "id": i, "owner_id": -1, "from_id": -1, "date": 1700000000 + i, "text": "Текст поста " * 20,
+        "attachments": [{"type": "photo", "photo": {"id": i, "sizes": [{"url": "https://x/y.jpg", "width": 604}] * 4}}],
+        "likes": {"count": i, "user_likes": 0}, "reposts": {"count": 1}, "comments": {"count": 2},
+        "views": {"count": 1000},
+    } for i in range(n)]
+    return json.dumps({"response": {"count": n * 10, "items": items}}, ensure_ascii=False).encode()
+
+
+PAYLOADS = {
+    "users.get x1000": (_users(1000), User),
+    "friends.get x5000": (_friends(5000), None),
+    "wall.get x100": (_wall(100), Post),
+}
+
+
+# ----------------------------------------------------------------------------
+#                         ПУТИ ДЕКОДИРОВАНИЯ
+# ----------------------------------------------------------------------------
+#
+# Каждый путь повторяет то, что делает call_api после получения тела ответа.
+
+def _full(loads):
+    def run(body, model):
+        data = loads(body)
+        if "error" in data:
+            raise ValueError(data["error"])
+        return data.get("response")
+    return run
+
+
+def _raw(body, model):
+    if vk_json.peek_error(body) is not None:
+        raise ValueError("error")
+    return body
+
+
+def _models(extra: bool):
+    def run(body, model):
+        response = _full(vk_json.loads)(body, model)
+        return parse(response, model, extra) if model is not None else response
+    return run
+
+
+def _paths() -> dict:
+    paths = {"json (stdlib)": _full(json.loads)}
+    try:
+        import orjson
+        paths["orjson"] = _full(orjson.loads)
+    except ImportError:
+        pass
+    paths[f"models ({vk_json.backend})"] = _models(True)
+    paths["models, extra=False"] = _models(False)
+    paths["raw (envelope only)"] = _raw
+    return paths
+
+
+PATHS = _paths()
+
+
+def measure(path, body: bytes, model, repeat: int) -> dict:
+    # Время — без tracemalloc (он замедляет аллокации в разы)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        path(body, model)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    result = path(body, model)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {"us": elapsed * 1e6, "peak_kb": peak / 1024, "retained_kb": retained / 1024}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микро-бенчмарк декодирования ответов VK")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    for name, (body, model) in PAYLOADS.items():
+        print(f"{name} ({len(body) / 1024:.0f} KB)")
+        for path_name, path in PATHS.items():
+            r = measure(path, body, model, args.repeat)
+            print(f"  {path_name:>22}: {r['us']:9.1f} мкс, пик {r['peak_kb']:8.1f} KB, "
+                  f"удержано {r['retained_kb']:8.1f} KB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
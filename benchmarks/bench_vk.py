@@ -0,0 +1,615 @@
+import gc
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import functools
+import contextlib
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import libs.vk.vk_async as vk_async
+from libs.vk.vk import VK
+from libs.vk.vk_async import AsyncVK
+from libs.vk.vk_http import HTTPPool
+from libs.vk.vk_loop import run_sync
+from libs.vk.vk_metrics import Metrics
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_rucaptcha import RuCaptchaClient
+from libs.vk.vk_captcha import CaptchaSolver, CaptchaProvider
+from libs.vk.vk_shard import ShardPool
+from libs.vk.vk_registry import AccountRegistry
+from libs.vk.vk_hedge import Hedger
+from libs.vk.vk_longpoll import LongPollHub
+from libs.vk.vk_prewarm import PrewarmPolicy
+from libs.vk.vk_token_store import SQLiteTokenStore
+from libs.vk.vk_auth_with_solver import solve_captcha_rucaptcha
+from libs.vk.benchmarks.standins import StandinConfig, StandinServer
+
+__all__ = ['Recorder', 'SCENARIOS', 'run_scenario', 'main']
+
+
+# ----------------------------------------------------------------------------
+#                         ИЗМЕРЕНИЯ
+# ----------------------------------------------------------------------------
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Латентности и исходы одного сценария."""
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.outcomes: dict[str, int] = {}
+        self.started = None
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+
+    @contextlib.contextmanager
+    def measure(self):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except VKExceptions.APIError as e:
+            outcome = f"error_{e.code}"
+        except Exception as e:
+            outcome = type(e).__name__
+        self.latencies.append(time.perf_counter() - started)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def report(self) -> dict:
+        values = sorted(self.latencies)
+        return {
+            "requests": len(values),
+            "elapsed": round(self.elapsed, 3),
+            "rps": round(len(values) / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+            "outcomes": dict(sorted(self.outcomes.items())),
+        }
+
+
+# ----------------------------------------------------------------------------
+#                         СЦЕНАРИИ
+# ----------------------------------------------------------------------------
+#
+# Каждый сценарий получает (server, args) и возвращает Recorder.
+# Синхронные сценарии гоняют публичный VK из пула потоков — так его
+# использует прикладной код; асинхронные — AsyncVK из одного loop.
+
+def _accounts(args) -> list[dict]:
+    return [{"login": f"bench{i}@example.com", "password": "secret"} for i in range(args.accounts)]
+
+
+def _scheduler_option(args) -> dict:
+    """В AsyncVK планировщик выключен по умолчанию — бенчмарк включает его явно, как прод."""
+    return {"scheduler": True} if args.scheduler else {}
+
+
+def scenario_auth(server: StandinServer, args) -> Recorder:
+    """VK.auth на args.accounts аккаунтах; need_captcha → эмулированный браузерный fallback."""
+    recorder = Recorder()
+    accounts = _accounts(args)
+    captcha_solver = _captcha_client(server, args)
+
+    def one(account):
+        vk = VK(captcha_solver=captcha_solver, **({"prewarm": True} if args.prewarm else {}))
+        vk.set_proxy(server.proxy)
+        with recorder.measure():
+            if vk.auth(account["login"], account["password"]) is None:
+                raise LookupError("no token")
+
+    with recorder, ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(one, accounts))
+    return recorder
+
+
+def _client_options(args) -> dict:
+    options = _scheduler_option(args)
+    if args.batch:
+        options["batch"] = True
+    if args.cache:
+        options["cache"] = True
+    if args.hedge:
+        options["hedge"] = True
+    return options
+
+
+def _user_ids(n: int, args) -> int:
+    # --distinct-ids: повторяющиеся запросы, чтобы было что кэшировать
+    return n % args.distinct_ids if args.distinct_ids else n
+
+
+def _sessions(server: StandinServer, args, factory) -> list:
+    clients = []
+    for account in _accounts(args):
+        client = factory(**_client_options(args))
+        client.set_session({
+            "access_token": "bench_" + account["login"],
+            "user_id": 1,
+            "device_id": "bench",
+            "proxy": server.proxy,
+        })
+        clients.append(client)
+    return clients
+
+
+def scenario_api(server: StandinServer, args) -> Recorder:
+    """VK.call_api('users.get') — args.requests вызовов, раскиданных по аккаунтам."""
+    recorder = Recorder()
+    clients = _sessions(server, args, VK)
+
+    def one(n):
+        with recorder.measure():
+            clients[n % len(clients)].call_api("users.get", {"user_ids": _user_ids(n, args)})
+
+    with recorder, ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(one, range(args.requests)))
+    return recorder
+
+
+def scenario_api_async(server: StandinServer, args) -> Recorder:
+    """То же, что api, но AsyncVK из одного event loop (без накладных расходов потоков)."""
+    recorder = Recorder()
+
+    async def run():
+        clients = _sessions(server, args, AsyncVK)
+        limit = asyncio.Semaphore(args.concurrency)
+
+        async def one(n):
+            async with limit:
+                started = time.perf_counter()
+                outcome = "ok"
+                try:
+                    await clients[n % len(clients)].call_api("users.get", {"user_ids": _user_ids(n, args)})
+                except VKExceptions.APIError as e:
+                    outcome = f"error_{e.code}"
+                recorder.latencies.append(time.perf_counter() - started)
+                recorder.outcomes[outcome] = recorder.outcomes.get(outcome, 0) + 1
+
+        with recorder:
+            await asyncio.gather(*(one(n) for n in range(args.requests)))
+
+        for client in clients:
+            client.disable_batching()
+        await HTTPPool.default().close()
+
+    asyncio.run(run())
+    return recorder
+
+
+def _shard_init(oauth_url: str, api_url: str):
+    # Выполняется в каждом процессе-шарде: там свой vk_async, патч родителя не виден
+    vk_async.VK_OAUTH_TOKEN_URL = oauth_url
+    vk_async.VK_API_URL = api_url
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def scenario_api_shard(server: StandinServer, args) -> Recorder:
+    """То же, что api_async, но через ShardPool из args.shards процессов (токены — из общего SQLite)."""
+    recorder = Recorder()
+    store_dir = tempfile.TemporaryDirectory()
+    store_path = os.path.join(store_dir.name, "tokens.sqlite3")
+
+    store = SQLiteTokenStore(store_path)
+    accounts = [account["login"] for account in _accounts(args)]
+    for login in accounts:
+        store.put(login, {"access_token": "bench_" + login, "user_id": 1, "device_id": "bench",
+                          "proxy": server.proxy})
+    store.close()
+
+    async def run():
+        pool = ShardPool(args.shards, store_path, client_options=_client_options(args),
+                         initializer=functools.partial(_shard_init, server.OAUTH_TOKEN_URL, server.API_URL))
+        async with pool:
+            # Прогрев: запуск процессов (spawn + импорты) в замер не входит
+            await asyncio.gather(*(pool.call_api(login, "users.get") for login in accounts))
+            limit = asyncio.Semaphore(args.concurrency)
+
+            async def one(n):
+                async with limit:
+                    with recorder.measure():
+                        await pool.call_api(accounts[n % len(accounts)], "users.get", {"user_ids": _user_ids(n, args)})
+
+            with recorder:
+                await asyncio.gather(*(one(n) for n in range(args.requests)))
+
+    try:
+        asyncio.run(run())
+    finally:
+        store_dir.cleanup()
+    return recorder
+
+
+def scenario_longpoll(server: StandinServer, args) -> Recorder:
+    """LongPollHub на args.accounts аккаунтах в течение --lp-duration сек; замер — задержка доставки события."""
+    recorder = Recorder()
+
+    async def run():
+        clients = _sessions(server, args, AsyncVK)
+        hub = LongPollHub(wait=args.lp_wait)
+
+        @hub.on
+        def received(name, update):
+            recorder.latencies.append(max(0.0, time.time() - update[4]))
+            recorder.outcomes["ok"] = recorder.outcomes.get("ok", 0) + 1
+
+        with recorder:
+            for client in clients:
+                hub.add(client, name=client.access_token)
+            await asyncio.sleep(args.lp_duration)
+            polls = hub.stats().values()
+            await hub.close()
+
+        recorder.outcomes |= {key: sum(s[key] for s in polls) for key in ("resyncs", "key_refreshes", "errors")}
+        await HTTPPool.default().close()
+
+    asyncio.run(run())
+    return recorder
+
+
+def scenario_iter(server: StandinServer, args) -> Recorder:
+    """VK.iter_api('friends.get') — полный обход коллекции на каждом аккаунте (замер — на коллекцию)."""
+    recorder = Recorder()
+    clients = _sessions(server, args, VK)
+
+    def one(client):
+        with recorder.measure():
+            items = sum(1 for _ in client.iter_api("friends.get", page_size=args.page_size, prefetch=args.prefetch,
+                                                   pages_per_call=args.pages_per_call))
+            if items != server.config.collection_size:
+                raise LookupError(f"{items} items")
+
+    with recorder, ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(one, clients))
+    return recorder
+
+
+def scenario_captcha(server: StandinServer, args) -> Recorder:
+    """solve_captcha_rucaptcha — args.captchas задач против заглушки RuCaptcha (или --captcha-providers)."""
+    recorder = Recorder()
+    solver = RuCaptchaClient._default = _captcha_client(server, args)
+    captcha = {"image": "data:image/png;base64,AAAA", "steps": [0, 1, 2, 3], "status": "OK"}
+
+    def one(_):
+        with recorder.measure():
+            if solve_captcha_rucaptcha(captcha) is None:
+                raise LookupError("no solution")
+
+    with recorder, ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(one, range(args.captchas)))
+
+    if isinstance(solver, CaptchaSolver):
+        recorder.outcomes["spent"] = solver.spent
+        for name, provider in solver.stats()["providers"].items():
+            recorder.outcomes |= {f"{name}_solved": provider["solved"], f"{name}_lost": provider["lost"]}
+    return recorder
+
+
+def _open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return 0
+
+
+def scenario_registry(server: StandinServer, args) -> Recorder:
+    """
+    args.accounts аккаунтов на --proxies прокси, по вызову users.get с каждого:
+    «before» — AsyncVK со своим HTTPPool на аккаунт (как прежняя requests.Session на VK),
+    «after» — AccountRegistry с общим пулом. В outcomes — память Python на аккаунт,
+    открытые fd и TCP-соединения, которые увидела заглушка.
+    """
+    recorder = Recorder()
+    options = _scheduler_option(args)
+
+    def auth_data(n: int, login: str) -> dict:
+        # Через JSON — строки новые на каждый аккаунт, как после чтения из TokenStore;
+        # разные учётные данные одной заглушки — для HTTPPool это разные прокси
+        return json.loads(json.dumps({
+            "access_token": "bench_" + login, "user_id": 1, "device_id": f"bench{n}",
+            "proxy": f"http://u{n % args.proxies}:bench@{server.host}:{server.port}",
+            "user_agent": "VKAndroidApp/8.52-14102 (Android 13; SDK 33; arm64-v8a; Samsung SM-G998B; ru; 2400x1080)",
+        }))
+
+    async def phase(label: str, build, call):
+        limit = asyncio.Semaphore(args.concurrency)
+
+        async def one(n, login):
+            async with limit:
+                with recorder.measure():
+                    await call(state, n, login)
+
+        gc.collect()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        memory, fds, connections = tracemalloc.get_traced_memory()[0], _open_fds(), server.counters["connections"]
+
+        logins = [account["login"] for account in _accounts(args)]
+        state = build(logins)
+        await asyncio.gather(*(one(n, login) for n, login in enumerate(logins)))
+
+        gc.collect()
+        per_account = (tracemalloc.get_traced_memory()[0] - memory) / len(logins)
+        if not tracing:
+            tracemalloc.stop()
+        recorder.outcomes |= {
+            f"{label}_kb_per_account": round(per_account / 1024, 2),
+            f"{label}_fds": _open_fds() - fds,
+            f"{label}_connections": server.counters["connections"] - connections,
+        }
+        return state
+
+    def build_before(logins):
+        clients = {}
+        for n, login in enumerate(logins):
+            client = AsyncVK(pool=HTTPPool(), **options)
+            client.set_session(auth_data(n, login))
+            client.account = login
+            clients[login] = client
+        return clients
+
+    async def call_before(clients, n, login):
+        await clients[login].call_api("users.get", {"user_ids": n})
+
+    def build_after(logins):
+        registry = AccountRegistry(**options)
+        for n, login in enumerate(logins):
+            registry.add(login, auth_data(n, login))
+        return registry
+
+    async def call_after(registry, n, login):
+        await registry.call_api(login, "users.get", {"user_ids": n})
+
+    async def run():
+        with recorder:
+            clients = await phase("before", build_before, call_before)
+            for client in clients.values():
+                await client.pool.close()
+            del clients
+            await phase("after", build_after, call_after)
+        await HTTPPool.default().close()
+
+    asyncio.run(run())
+    return recorder
+
+
+SCENARIOS = {
+    "auth": scenario_auth,
+    "api": scenario_api,
+    "api_async": scenario_api_async,
+    "api_shard": scenario_api_shard,
+    "longpoll": scenario_longpoll,
+    "registry": scenario_registry,
+    "iter": scenario_iter,
+    "captcha": scenario_captcha,
+}
+
+
+# ----------------------------------------------------------------------------
+#                         ОКРУЖЕНИЕ
+# ----------------------------------------------------------------------------
+
+def _captcha_client(server: StandinServer, args) -> RuCaptchaClient | CaptchaSolver:
+    if not args.captcha_providers:
+        return RuCaptchaClient(key="bench", base_url=server.rucaptcha_url, initial_delay=args.captcha_initial_delay)
+    # Задача у каждого сервиса стоит 1 — --captcha-max-cost 1 запрещает гонку
+    return CaptchaSolver([
+        CaptchaProvider(RuCaptchaClient(key="bench", base_url=server.captcha_provider_url(i),
+                                        initial_delay=args.captcha_initial_delay), name=f"p{i}", cost=1.0)
+        for i in range(len(args.captcha_providers))
+    ], race=args.captcha_race, max_cost=args.captcha_max_cost)
+
+
+class _FakeBrowserLogin:
+    """
+    Вместо Playwright (тот же интерфейс, что у BrowserLogin): open() — половина
+    page_time (контекст + загрузка OAuth-страницы), run() — решение капчи через
+    заглушку RuCaptcha + вторая половина. Токен — как у заглушки OAuth.
+    """
+
+    page_time = 1.0
+
+    def __init__(self, login, password, proxy=None, browser_pool=None, captcha_solver=None, **_):
+        self.login = login
+        self.captcha_solver = captcha_solver
+        self._opening = None
+
+    def prepare(self):
+        if self._opening is None:
+            self._opening = asyncio.ensure_future(asyncio.sleep(self.page_time / 2))
+
+    async def open(self):
+        self.prepare()
+        await asyncio.shield(self._opening)
+
+    async def run(self):
+        await self.open()
+        solver = self.captcha_solver or RuCaptchaClient.default()
+        best_step = await solver.solve({"image": "data:image/png;base64,AAAA", "steps": [0, 1], "status": "OK"})
+        await asyncio.sleep(self.page_time / 2)
+        if best_step is None:
+            return None
+        return {"access_token": "bench_" + self.login, "user_id": 1, "expires_in": 0}
+
+    async def close(self):
+        if self._opening is not None:
+            self._opening.cancel()
+
+
+async def _fake_browser_fallback(login, password, proxy=None, browser_pool=None, captcha_solver=None,
+                                 prepared=None, **_):
+    browser_login = prepared or _FakeBrowserLogin(login, password, proxy, browser_pool, captcha_solver)
+    try:
+        return await browser_login.run()
+    finally:
+        await browser_login.close()
+
+
+@contextlib.contextmanager
+def patched_endpoints(server: StandinServer, browser_time: float):
+    """Направляет VK OAuth/API на заглушку (через неё же как прокси) и подменяет браузерный fallback."""
+    saved = (vk_async.VK_OAUTH_TOKEN_URL, vk_async.VK_API_URL, vk_async._obtain_token_selenium_async,
+             vk_async.BrowserLogin, RuCaptchaClient._default)
+    vk_async.VK_OAUTH_TOKEN_URL = server.OAUTH_TOKEN_URL
+    vk_async.VK_API_URL = server.API_URL
+    vk_async._obtain_token_selenium_async = _fake_browser_fallback
+    vk_async.BrowserLogin = _FakeBrowserLogin
+    _FakeBrowserLogin.page_time = browser_time
+    try:
+        yield
+    finally:
+        (vk_async.VK_OAUTH_TOKEN_URL, vk_async.VK_API_URL, vk_async._obtain_token_selenium_async,
+         vk_async.BrowserLogin, RuCaptchaClient._default) = saved
+
+
+async def _close_default_pool():
+    await HTTPPool.default().close()
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss — в КБ на Linux, в байтах на macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_scenario(name: str, server: StandinServer, args) -> dict:
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    with patched_endpoints(server, args.browser_time):
+        recorder = SCENARIOS[name](server, args)
+
+    result = {"scenario": name} | recorder.report() | {"max_rss_mb": round(_max_rss_mb(), 1)}
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["py_peak_mb"] = round(peak / (1024 * 1024), 2)
+    return result
+
+
+# ----------------------------------------------------------------------------
+#                         CLI
+# ----------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Оффлайн-бенчмарк VK-клиента на локальных заглушках")
+    parser.add_argument("scenarios", nargs="*", help=f"какие сценарии гонять: {', '.join(SCENARIOS)} (по умолчанию — все)")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000, help="вызовов API в сценариях api*")
+    parser.add_argument("--captchas", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch", action="store_true", help="AsyncVK(batch=True) — склейка в execute")
+    parser.add_argument("--shards", type=int, default=None, help="api_shard: процессов (по умолчанию — по ядрам)")
+    parser.add_argument("--cache", action="store_true", help="кэш read-методов (ResponseCache)")
+    parser.add_argument("--hedge", action="store_true", help="hedged-запросы read-методов (Hedger)")
+    parser.add_argument("--proxies", type=int, default=10, help="registry: различных прокси на аккаунты")
+    parser.add_argument("--distinct-ids", type=int, default=0, help="api*: различных user_ids (0 — все разные)")
+    parser.add_argument("--no-scheduler", dest="scheduler", action="store_false",
+                        help="без RateScheduler; по умолчанию бенчмарк сам включает scheduler=True "
+                             "(лимит по типу токена, 3 rps у user), хотя в AsyncVK он выключен")
+    parser.add_argument("--page-size", type=int, default=100, help="iter: count на страницу")
+    parser.add_argument("--prefetch", type=int, default=1, help="iter: запросов наперёд")
+    parser.add_argument("--pages-per-call", type=int, default=1, help="iter: страниц на один execute")
+    parser.add_argument("--collection-size", type=int, default=1000, help="iter: размер коллекции на заглушке")
+    parser.add_argument("--lp-duration", type=float, default=10.0, help="longpoll: сколько слушать, сек")
+    parser.add_argument("--lp-wait", type=int, default=25, help="longpoll: wait запроса a_check")
+    parser.add_argument("--lp-event-rate", type=float, default=1.0, help="longpoll: событий/сек на аккаунт")
+    parser.add_argument("--lp-failed-rate", type=float, default=0.0, help="longpoll: доля ответов failed")
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    parser.add_argument("--api-error6-rate", type=float, default=0.0, help="доля ответов с error 6")
+    parser.add_argument("--api-slow-rate", type=float, default=0.0, help="доля зависающих запросов API")
+    parser.add_argument("--api-slow-latency", type=float, default=5.0, help="сколько висит такой запрос")
+    parser.add_argument("--api-token-rps", type=float, default=None, help="лимит заглушки на токен")
+    parser.add_argument("--oauth-latency", type=float, default=0.05)
+    parser.add_argument("--oauth-captcha-rate", type=float, default=0.0, help="доля need_captcha")
+    parser.add_argument("--oauth-error-rate", type=float, default=0.0, help="доля invalid_client")
+    parser.add_argument("--captcha-solve-time", type=float, default=2.0, help="время решения в RuCaptcha")
+    parser.add_argument("--captcha-initial-delay", type=float, default=1.0)
+    parser.add_argument("--captcha-providers", type=lambda value: [float(x) for x in value.split(",")], default=None,
+                        help="captcha: несколько сервисов, среднее время решения каждого через запятую (3,10)")
+    parser.add_argument("--captcha-race", action="store_true", help="captcha: задача сразу двум лучшим сервисам")
+    parser.add_argument("--captcha-max-cost", type=float, default=None, help="captcha: лимит цены на капчу")
+    parser.add_argument("--prewarm", action="store_true", help="auth: прогрев браузера на время grant'а")
+    parser.add_argument("--browser-time", type=float, default=1.0, help="эмулируемое время Playwright-flow")
+    parser.add_argument("--tracemalloc", action="store_true", help="пиковая память Python-объектов (медленнее)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="вывод JSON-строками")
+    parser.add_argument("--metrics", action="store_true", help="в конце — гистограммы фаз в формате Prometheus")
+    args = parser.parse_args(argv)
+
+    # Клиент логирует каждый успех — на тысячах запросов это меряет терминал, а не код
+    logging.getLogger().setLevel(logging.WARNING)
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = StandinServer(StandinConfig(
+        api_latency=args.api_latency,
+        api_error6_rate=args.api_error6_rate,
+        api_token_rps=args.api_token_rps,
+        api_slow_rate=args.api_slow_rate,
+        api_slow_latency=args.api_slow_latency,
+        lp_event_rate=args.lp_event_rate,
+        lp_failed_rate=args.lp_failed_rate,
+        oauth_latency=args.oauth_latency,
+        oauth_captcha_rate=args.oauth_captcha_rate,
+        oauth_error_rate=args.oauth_error_rate,
+        rucaptcha_solve_time=args.captcha_solve_time,
+        collection_size=args.collection_size,
+        captcha_providers=args.captcha_providers,
+        seed=args.seed,
+    )).start_in_thread()
+
+    try:
+        for name in args.scenarios or list(SCENARIOS):
+            result = run_scenario(name, server, args)
+            if args.json:
+                print(json.dumps(result, ensure_ascii=False))
+                continue
+            print(f"{name:>10}: {result['requests']} req за {result['elapsed']} сек — {result['rps']} rps, "
+                  f"p50 {result['p50_ms']} / p95 {result['p95_ms']} / p99 {result['p99_ms']} мс, "
+                  f"RSS {result['max_rss_mb']} МБ"
+                  + (f", py peak {result['py_peak_mb']} МБ" if "py_peak_mb" in result else ""))
+            print(f"{'':>10}  {result['outcomes']}")
+    finally:
+        run_sync(_close_default_pool())
+        server.stop_thread()
+
+    print(f"{'stand-in':>10}: {server.counters}")
+    if args.hedge:
+        print(f"{'hedge':>10}: {Hedger.default().stats()}")
+    if args.prewarm:
+        print(f"{'prewarm':>10}: {PrewarmPolicy.default().stats()}")
+    if args.metrics:
+        print(Metrics.default().prometheus(), end="")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
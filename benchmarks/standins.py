@@ -0,0 +1,280 @@
+import re
+import time
+import json
+import random
+import asyncio
+import threading
+import aiohttp
+from aiohttp import web
+
+__all__ = ['StandinConfig', 'StandinServer']
+
+_EXECUTE_CALL_RE = re.compile(r'API\.([a-zA-Z]+\.[a-zA-Z]+)\((\{.*?\})\)(?=,API\.|\];)')
+
+
+class StandinConfig:
+    """Поведение локальных заглушек VK OAuth / VK API / RuCaptcha."""
+
+    def __init__(self, api_latency: float = 0.02, api_jitter: float = 0.01, api_error6_rate: float = 0.0,
+                 api_token_rps: float | None = None, oauth_latency: float = 0.05, oauth_captcha_rate: float = 0.0,
+                 oauth_error_rate: float = 0.0, rucaptcha_solve_time: float = 2.0, rucaptcha_latency: float = 0.01,
+                 collection_size: int = 1000, api_slow_rate: float = 0.0, api_slow_latency: float = 5.0,
+                 lp_event_rate: float = 1.0, lp_failed_rate: float = 0.0, rucaptcha_pingback_loss: float = 0.0,
+                 captcha_providers: list[float] | None = None, seed: int | None = None):
+        self.api_latency = api_latency
+        self.api_jitter = api_jitter
+        self.api_error6_rate = api_error6_rate
+        # Хвост латентности: доля запросов, зависающих на api_slow_latency (плохой хоп прокси)
+        self.api_slow_rate = api_slow_rate
+        self.api_slow_latency = api_slow_latency
+        # Эмуляция лимита VK: не больше api_token_rps запросов в секунду на токен
+        self.api_token_rps = api_token_rps
+        self.oauth_latency = oauth_latency
+        self.oauth_captcha_rate = oauth_captcha_rate
+        self.oauth_error_rate = oauth_error_rate
+        self.rucaptcha_solve_time = rucaptcha_solve_time
+        self.rucaptcha_latency = rucaptcha_latency
+        # Доля задач с callbackUrl, чей pingback теряется (клиент должен дойти до getTaskResult)
+        self.rucaptcha_pingback_loss = rucaptcha_pingback_loss
+        # Доп. сервисы капчи (/captcha/<i>/...): среднее время решения, распределение экспоненциальное
+        self.captcha_providers = captcha_providers or []
+        self.collection_size = collection_size
+        # Long Poll: событий в секунду на соединение, доля ответов failed (1/2/3 поровну)
+        self.lp_event_rate = lp_event_rate
+        self.lp_failed_rate = lp_failed_rate
+        self.random = random.Random(seed)
+
+
+class StandinServer:
+    """
+    Один aiohttp-сервер, который одновременно:
+      - служит HTTP-прокси для клиента (запросы приходят в absolute-form),
+      - отвечает за oauth.vk.com/token, api.vk.com/method/* и RuCaptcha.
+
+    Клиенту достаточно направить VK_OAUTH_TOKEN_URL / VK_API_URL на http://
+    адреса и указать сервер как прокси; RuCaptcha — через base_url.
+    """
+
+    def __init__(self, config: StandinConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StandinConfig()
+        self.host = host
+        self.port = port
+
+        self.counters = {"oauth": 0, "api": 0, "execute": 0, "error6": 0, "slow": 0, "lp": 0, "lp_failed": 0, "createTask": 0, "getTaskResult": 0, "pingback": 0, "connections": 0}
+        # Адреса клиентских сокетов, с которых приходили запросы API, — число TCP-соединений
+        self._peers: set = set()
+        self._tasks: dict[int, tuple[float, float]] = {}
+        self._pingbacks: set[asyncio.Task] = set()
+        self._token_hits: dict[str, list[float]] = {}
+        self._runner: web.AppRunner | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    # ---------------- URLs ----------------
+
+    @property
+    def proxy(self) -> str:
+        return f"http://bench:bench@{self.host}:{self.port}"
+
+    @property
+    def rucaptcha_url(self) -> str:
+        return f"http://{self.host}:{self.port}/rucaptcha"
+
+    def captcha_provider_url(self, index: int) -> str:
+        return f"http://{self.host}:{self.port}/captcha/{index}"
+
+    OAUTH_TOKEN_URL = "http://oauth.vk.local/token"
+    API_URL = "http://api.vk.local/method"
+    LONGPOLL_URL = "http://lp.vk.local/lp"
+
+    # ---------------- handlers ----------------
+
+    async def _oauth(self, request: web.Request):
+        cfg = self.config
+        self.counters["oauth"] += 1
+        data = await request.post()
+        await asyncio.sleep(cfg.oauth_latency)
+
+        roll = cfg.random.random()
+        if roll < cfg.oauth_captcha_rate:
+            return web.json_response({"error": "need_captcha", "captcha_sid": str(cfg.random.randrange(10 ** 9))})
+        if roll < cfg.oauth_captcha_rate + cfg.oauth_error_rate:
+            return web.json_response({"error": "invalid_client", "error_description": "Username or password is incorrect"})
+
+        return web.json_response({
+            "access_token": "bench_" + data.get("username", ""),
+            "expires_in": 0,
+            "user_id": abs(hash(data.get("username", ""))) % 10 ** 9,
+        })
+
+    def _throttled(self, token: str) -> bool:
+        cfg = self.config
+        if cfg.random.random() < cfg.api_error6_rate:
+            return True
+        if not cfg.api_token_rps:
+            return False
+        now = time.monotonic()
+        hits = [t for t in self._token_hits.get(token, []) if now - t < 1.0]
+        hits.append(now)
+        self._token_hits[token] = hits
+        return len(hits) > cfg.api_token_rps
+
+    async def _api(self, request: web.Request):
+        cfg = self.config
+        method = request.match_info["method"]
+        data = await request.post()
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        if peer is not None and peer not in self._peers:
+            self._peers.add(peer)
+            self.counters["connections"] += 1
+        latency = cfg.api_latency + cfg.random.random() * cfg.api_jitter
+        if cfg.api_slow_rate and cfg.random.random() < cfg.api_slow_rate:
+            self.counters["slow"] += 1
+            latency = cfg.api_slow_latency
+        await asyncio.sleep(latency)
+
+        if self._throttled(data.get("access_token", "")):
+            self.counters["error6"] += 1
+            return web.json_response({"error": {"error_code": 6, "error_msg": "Too many requests per second"}})
+
+        if method == "execute":
+            self.counters["execute"] += 1
+            calls = _EXECUTE_CALL_RE.findall(data.get("code", ""))
+            return web.json_response({"response": [self._method(m, json.loads(args)) for m, args in calls]})
+
+        self.counters["api"] += 1
+        return web.json_response({"response": self._method(method, data)})
+
+    def _method(self, method: str, params) -> dict | list:
+        if method in ("messages.getLongPollServer", "groups.getLongPollServer"):
+            return {"key": "bench", "server": self.LONGPOLL_URL, "ts": 1, "pts": 1}
+        if method == "messages.getLongPollHistory":
+            return {"history": [], "messages": {"count": 0, "items": []}, "new_pts": int(params.get("pts", 0) or 0)}
+        # offset/count-методы: коллекция из collection_size элементов
+        count = int(params.get("count", 0) or 0)
+        if count:
+            offset = int(params.get("offset", 0) or 0)
+            total = self.config.collection_size
+            return {"count": total, "items": list(range(offset, min(total, offset + count)))}
+        return [{"id": 1, "first_name": "Bench", "last_name": "User"}]
+
+    async def _longpoll(self, request: web.Request):
+        """
+        a_check: ждёт следующего события (пуассоновский поток lp_event_rate/сек) или wait сек.
+        Событие — как 4 (новое сообщение) в User Long Poll; [4] — время отправки, по нему меряется задержка.
+        """
+        cfg = self.config
+        self.counters["lp"] += 1
+        ts = int(request.query.get("ts", 1))
+
+        if cfg.random.random() < cfg.lp_failed_rate:
+            self.counters["lp_failed"] += 1
+            return web.json_response({"failed": cfg.random.choice((1, 2, 3)), "ts": ts + 1})
+
+        wait = float(request.query.get("wait", 25))
+        until_event = cfg.random.expovariate(cfg.lp_event_rate) if cfg.lp_event_rate else wait
+        if until_event >= wait:
+            await asyncio.sleep(wait)
+            return web.json_response({"ts": ts, "pts": ts, "updates": []})
+
+        await asyncio.sleep(until_event)
+        return web.json_response({"ts": ts + 1, "pts": ts + 1, "updates": [[4, ts, 1, 2000000001, time.time(), "bench"]]})
+
+    async def _create_task(self, request: web.Request):
+        """
+        С callbackUrl решение, как у RuCaptcha, POST'ится формой id/code.
+        Нулевое время решения — pingback уходит раньше ответа createTask
+        (клиент получает результат до того, как начал его ждать).
+        """
+        self.counters["createTask"] += 1
+        payload = json.loads(await request.read())
+        await asyncio.sleep(self.config.rucaptcha_latency)
+        provider = request.match_info.get("provider")
+        if provider is None:
+            solve_time = self.config.rucaptcha_solve_time
+        else:
+            solve_time = self.config.random.expovariate(1 / self.config.captcha_providers[int(provider)])
+        task_id = len(self._tasks) + 1
+        self._tasks[task_id] = (time.monotonic(), solve_time)
+
+        callback_url = payload.get("callbackUrl")
+        if callback_url and self.config.random.random() >= self.config.rucaptcha_pingback_loss:
+            if solve_time <= 0:
+                await self._pingback(callback_url, task_id, 0)
+            else:
+                task = asyncio.create_task(self._pingback(callback_url, task_id, solve_time))
+                self._pingbacks.add(task)
+                task.add_done_callback(self._pingbacks.discard)
+
+        return web.json_response({"errorId": 0, "taskId": task_id})
+
+    async def _pingback(self, url: str, task_id: int, delay: float):
+        await asyncio.sleep(delay)
+        self.counters["pingback"] += 1
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, data={"id": str(task_id), "code": "7"}) as response:
+                    await response.read()
+        except aiohttp.ClientError:
+            # Недоставленный pingback — клиент заберёт решение через getTaskResult
+            pass
+
+    async def _get_result(self, request: web.Request):
+        self.counters["getTaskResult"] += 1
+        payload = json.loads(await request.read())
+        await asyncio.sleep(self.config.rucaptcha_latency)
+        task = self._tasks.get(payload.get("taskId"))
+        if task is None:
+            return web.json_response({"errorId": 16, "errorCode": "ERROR_NO_SUCH_CAPCHA_ID"})
+        created, solve_time = task
+        if time.monotonic() - created < solve_time:
+            return web.json_response({"errorId": 0, "status": "processing"})
+        return web.json_response({"errorId": 0, "status": "ready", "solution": {"best_step": 7}})
+
+    # ---------------- lifecycle ----------------
+
+    def _app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/token", self._oauth)
+        app.router.add_post("/method/{method}", self._api)
+        app.router.add_get("/lp", self._longpoll)
+        app.router.add_post("/rucaptcha/createTask", self._create_task)
+        app.router.add_post("/rucaptcha/getTaskResult", self._get_result)
+        app.router.add_post("/captcha/{provider}/createTask", self._create_task)
+        app.router.add_post("/captcha/{provider}/getTaskResult", self._get_result)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, backlog=4096)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for task in self._pingbacks:
+            task.cancel()
+        await asyncio.gather(*self._pingbacks, return_exceptions=True)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self):
+        """Сервер в отдельном потоке со своим loop — чтобы не делить CPU-время с клиентом."""
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="vk-standin", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop_thread(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+import libs.vk.vk_async as vk_async
+from libs.vk.vk_http import HTTPPool
+from libs.vk.benchmarks.standins import StandinConfig, StandinServer
+
+
+@pytest.fixture
+def run():
+    """Выполняет корутину в новом loop и закрывает HTTPPool.default() этого loop."""
+    def runner(coro):
+        async def wrapped():
+            try:
+                return await coro
+            finally:
+                await HTTPPool.default().close()
+        return asyncio.run(wrapped())
+    return runner
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    """standin(**StandinConfig) → запущенная заглушка VK; OAuth/API AsyncVK направлены на неё."""
+    servers = []
+
+    def start(**config) -> StandinServer:
+        config = {"api_latency": 0.001, "api_jitter": 0.0, "seed": 1} | config
+        server = StandinServer(StandinConfig(**config)).start_in_thread()
+        servers.append(server)
+        monkeypatch.setattr(vk_async, "VK_OAUTH_TOKEN_URL", server.OAUTH_TOKEN_URL)
+        monkeypatch.setattr(vk_async, "VK_API_URL", server.API_URL)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop_thread()
+
+
+@pytest.fixture
+def client(standin):
+    """client(server, **AsyncVK options) → AsyncVK с сессией на заглушке."""
+    def make(server, token: str = "test", **options):
+        vk = vk_async.AsyncVK(**({"scheduler": False} | options))
+        vk.set_session({"access_token": token, "user_id": 1, "device_id": "test", "proxy": server.proxy})
+        return vk
+    return make
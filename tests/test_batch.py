@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from libs.vk.vk_batch import ExecuteBatcher, build_execute_code
+from libs.vk.vk_exceptions import VKExceptions
+
+
+def test_concurrent_calls_share_one_execute(standin, client, run):
+    server = standin()
+
+    async def main():
+        vk = client(server, batch=True)
+        try:
+            return await asyncio.gather(*(vk.call_api("users.get", {"user_ids": i}) for i in range(10)))
+        finally:
+            vk.disable_batching()
+
+    results = run(main())
+    assert len(results) == 10
+    assert server.counters["execute"] == 1
+    assert server.counters["api"] == 0
+
+
+def test_execute_errors_map_to_failed_calls(run):
+    async def send(method, params, access_token):
+        assert method == "execute"
+        return {"response": [1, False, 3], "execute_errors": [{"error_code": 15, "error_msg": "Access denied"}]}
+
+    async def main():
+        batcher = ExecuteBatcher(send, linger=0.01)
+        return await asyncio.gather(*(batcher.submit("users.get", {"n": i}, "token") for i in range(3)),
+                                    return_exceptions=True)
+
+    first, second, third = run(main())
+    assert (first, third) == (1, 3)
+    assert isinstance(second, VKExceptions.APIError) and second.code == 15
+
+
+def test_transport_error_reaches_every_call(run):
+    async def send(method, params, access_token):
+        raise ConnectionError("reset")
+
+    async def main():
+        batcher = ExecuteBatcher(send, linger=0.01)
+        return await asyncio.gather(*(batcher.submit("users.get", {}, "token") for _ in range(3)),
+                                    return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in run(main()))
+
+
+def test_cancelled_send_cancels_calls_instead_of_hanging(run):
+    async def send(method, params, access_token):
+        raise asyncio.CancelledError()
+
+    async def main():
+        batcher = ExecuteBatcher(send, linger=0.01)
+        calls = [asyncio.ensure_future(batcher.submit("users.get", {}, "token")) for _ in range(2)]
+        done, pending = await asyncio.wait(calls, timeout=1)
+        return done, pending
+
+    done, pending = run(main())
+    assert not pending
+    assert all(task.cancelled() for task in done)
+
+
+def test_execute_code_escapes_params():
+    code = build_execute_code([("users.get", {"user_ids": 'a"b'}), ("wall.get", {"count": 2})])
+    assert code == 'return [API.users.get({"user_ids":"a\\"b"}),API.wall.get({"count":2})];'
+
+
+def test_api_error_from_standin(standin, client, run):
+    server = standin(api_error6_rate=1.0)
+
+    async def main():
+        vk = client(server, throttle_retries=0)
+        with pytest.raises(VKExceptions.APIError) as error:
+            await vk.call_api("users.get", {"user_ids": 1})
+        return error.value.code
+
+    assert run(main()) == 6
@@ -0,0 +1,32 @@
+import os
+import stat
+
+import pytest
+
+pytest.importorskip("cryptography")
+
+from libs.vk.vk_browser_state import BrowserStateStore
+
+
+@pytest.fixture(autouse=True)
+def no_env_key(monkeypatch):
+    monkeypatch.delenv("VK_BROWSER_STATE_KEY", raising=False)
+
+
+def test_key_is_required(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    with pytest.raises(ValueError):
+        BrowserStateStore(path)
+    assert not os.path.exists(path + ".key")
+
+
+def test_key_path_is_created_private(tmp_path):
+    key_path = tmp_path / "keys" / "state.key"
+    key_path.parent.mkdir()
+    store = BrowserStateStore(str(tmp_path / "state.sqlite3"), key_path=str(key_path))
+    store.save("login", {"cookies": [{"name": "remixsid", "domain": ".vk.com", "expires": -1}]}, "device")
+
+    assert stat.S_IMODE(key_path.stat().st_mode) == 0o600
+    reopened = BrowserStateStore(str(tmp_path / "state.sqlite3"), key_path=str(key_path))
+    assert reopened.load("login", "device")["cookies"][0]["name"] == "remixsid"
+    assert reopened.device_id("login") == "device"
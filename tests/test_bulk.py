@@ -0,0 +1,71 @@
+import json
+
+from libs.vk.vk_bulk import BulkAuth, read_accounts, read_done
+
+
+def _accounts(server, count: int) -> list[dict]:
+    return [{"login": f"user{i}", "password": "secret", "proxy": server.proxy} for i in range(count)]
+
+
+def _records(path) -> list[dict]:
+    records = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            pass
+    return records
+
+
+def _bulk(run, accounts, output, retry_errors=False) -> dict:
+    async def main():
+        bulk = BulkAuth(grants=4, browsers=1)
+        try:
+            return await bulk.run(accounts, str(output), retry_errors)
+        finally:
+            await bulk.close()
+    return run(main())
+
+
+def test_resume_after_partial_run(run, standin, tmp_path):
+    server = standin(oauth_latency=0.001)
+    accounts = _accounts(server, 6)
+    output = tmp_path / "out.jsonl"
+
+    assert _bulk(run, accounts[:3], output)["ok"] == 3
+    # Падение посреди записи: недописанная строка не ломает продолжение
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"login": "user3", "sta')
+
+    stats = _bulk(run, accounts, output)
+    assert (stats["ok"], stats["skipped"]) == (3, 3)
+    assert server.counters["oauth"] == 6
+    records = _records(output)
+    assert sorted(r["login"] for r in records) == [f"user{i}" for i in range(6)]
+    assert all(r["status"] == "ok" and r["auth_data"]["access_token"] == "bench_" + r["login"] for r in records)
+
+
+def test_retry_errors(run, standin, tmp_path):
+    server = standin(oauth_latency=0.001)
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"login": "user0", "status": "error"}) + "\n"
+                      + json.dumps({"login": "user1", "status": "ok"}) + "\n", encoding="utf-8")
+
+    assert read_done(str(output)) == {"user0", "user1"}
+    assert read_done(str(output), retry_errors=True) == {"user1"}
+
+    stats = _bulk(run, _accounts(server, 2), output, retry_errors=True)
+    assert (stats["ok"], stats["skipped"]) == (1, 1)
+
+
+def test_read_accounts_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "accounts.csv"
+    csv_path.write_text("login,password,proxy\n# comment\na,1,http://p:1\nb,2\n", encoding="utf-8")
+    jsonl_path = tmp_path / "accounts.jsonl"
+    jsonl_path.write_text('{"login": "c", "password": "3"}\n\n', encoding="utf-8")
+
+    assert list(read_accounts(str(csv_path))) == [
+        {"login": "a", "password": "1", "proxy": "http://p:1"},
+        {"login": "b", "password": "2", "proxy": None},
+    ]
+    assert list(read_accounts(str(jsonl_path))) == [{"login": "c", "password": "3"}]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from libs.vk.vk_cache import ResponseCache
+
+
+def test_concurrent_calls_are_coalesced(run, standin, client):
+    server = standin(api_latency=0.05)
+    cache = ResponseCache()
+    vk = client(server, cache=cache)
+
+    async def main():
+        first = await asyncio.gather(*[vk.call_api("users.get", {"user_ids": 1}) for _ in range(10)])
+        again = await vk.call_api("users.get", {"user_ids": 1})
+        return first, again
+
+    first, again = run(main())
+    assert server.counters["api"] == 1
+    assert all(response is first[0] for response in first) and again is first[0]
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 9, 1)
+
+
+def test_cache_scope_and_uncached_methods(run, standin, client):
+    server = standin()
+    cache = ResponseCache()
+    alice, bob = client(server, token="alice", cache=cache), client(server, token="bob", cache=cache)
+
+    async def main():
+        # users.get зависит от смотрящего, utils.resolveScreenName — общий на все токены
+        for vk in (alice, bob):
+            await vk.call_api("users.get", {"user_ids": 1})
+            await vk.call_api("utils.resolveScreenName", {"screen_name": "durov"})
+            await vk.call_api("friends.get", {"user_id": 1})
+
+    run(main())
+    assert server.counters["api"] == 2 + 1 + 2
+
+
+def test_errors_are_shared_but_not_cached(run):
+    cache = ResponseCache()
+    key = cache.key("users.get", {"user_ids": 1}, "t")
+    calls = []
+
+    async def failing():
+        calls.append("fail")
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def ok():
+        calls.append("ok")
+        return {"id": 1}
+
+    async def main():
+        results = await asyncio.gather(*[cache.get_or_call(key, failing) for _ in range(3)], return_exceptions=True)
+        return results, await cache.get_or_call(key, ok)
+
+    results, after = run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert after == ({"id": 1}, "miss")
+    assert calls == ["fail", "ok"]
+
+
+def test_cancelled_leader_hands_over(run):
+    cache = ResponseCache()
+    key = cache.key("users.get", {}, "t")
+
+    async def slow():
+        await asyncio.sleep(3600)
+
+    async def ok():
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_call(key, slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_call(key, ok))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.wait_for(follower, 1)
+
+    assert run(main()) == ("value", "miss")
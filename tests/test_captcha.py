@@ -0,0 +1,52 @@
+import asyncio
+
+from libs.vk.vk_captcha import CaptchaProvider, CaptchaSolver
+
+
+class _Client:
+    def __init__(self, best_step=None, error=None, delay=0.0):
+        self.best_step = best_step
+        self.error = error
+        self.delay = delay
+
+    async def solve(self, captcha):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.best_step
+
+
+def _race(*clients):
+    providers = [CaptchaProvider(client, name=str(i)) for i, client in enumerate(clients)]
+    solver = CaptchaSolver(providers, race=True, race_width=len(providers), explore=0)
+
+    async def main():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        best_step = await solver.solve({})
+        await asyncio.sleep(0.05)
+        return best_step, errors
+
+    best_step, errors = asyncio.run(main())
+    return best_step, errors, [provider.stats() for provider in providers]
+
+
+def test_race_records_every_finished_task():
+    # Победитель и упавшие завершаются в одном wait — учитываются все
+    best_step, errors, stats = _race(*[_Client(error=RuntimeError("down")) for _ in range(4)], _Client(7))
+    assert best_step == 7
+    assert errors == []
+    assert [s["failed"] for s in stats] == [1, 1, 1, 1, 0]
+    assert stats[-1]["solved"] == 1
+
+
+def test_race_marks_slower_tasks_lost():
+    best_step, errors, stats = _race(_Client(7), _Client(8, delay=10))
+    assert best_step == 7
+    assert (stats[0]["solved"], stats[1]["lost"], stats[1]["failed"]) == (1, 1, 0)
+
+
+def test_race_falls_through_when_all_fail():
+    best_step, errors, stats = _race(_Client(None), _Client(error=RuntimeError("down")))
+    assert best_step is None
+    assert [s["failed"] for s in stats] == [1, 1]
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from libs.vk.vk_hedge import Hedger
+
+
+def _request(result=None, delay=0.0, error=None, log=None, name=None):
+    async def call():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{name} cancelled")
+            raise
+        if error is not None:
+            raise error
+        return result
+    return call
+
+
+def test_slow_primary_is_hedged(run):
+    hedger = Hedger(initial_delay=0.01)
+    log = []
+    result = run(hedger.run("users.get", _request("primary", 10, log=log, name="primary"), _request("backup")))
+    assert result == "backup"
+    assert (hedger.hedged, hedger.wins) == (1, 1)
+    assert log == ["primary cancelled"]
+
+
+def test_fast_primary_is_not_hedged(run):
+    hedger = Hedger(initial_delay=1.0)
+    result = run(hedger.run("users.get", _request("primary"), _request("backup")))
+    assert result == "primary"
+    assert hedger.hedged == 0
+
+
+def test_budget_limits_hedges(run):
+    hedger = Hedger(initial_delay=0.01, burst=1, budget=0.0)
+
+    async def main():
+        return [await hedger.run("users.get", _request("primary", 0.05), _request("backup")) for _ in range(3)]
+
+    assert run(main()) == ["backup", "primary", "primary"]
+    assert (hedger.hedged, hedger.denied) == (1, 2)
+
+
+def test_failed_request_falls_back_to_the_other(run):
+    hedger = Hedger(initial_delay=0.01)
+    result = run(hedger.run("users.get", _request(delay=0.05, error=RuntimeError("reset")), _request("backup", 0.1)))
+    assert result == "backup"
+
+    with pytest.raises(RuntimeError, match="primary"):
+        run(hedger.run("users.get", _request(delay=0.05, error=RuntimeError("primary")),
+                       _request(error=RuntimeError("backup"))))
+
+
+def test_delay_follows_latency_percentile():
+    hedger = Hedger(min_samples=20, percentile=90, min_delay=0.0)
+    for latency in range(1, 21):
+        hedger._observe("users.get", latency / 100)
+    assert hedger.delay("users.get") == pytest.approx(0.19)
+    assert hedger.delay("groups.get") == hedger.initial_delay
+
+
+def test_hedge_against_slow_standin(run, standin, client):
+    server = standin(api_slow_rate=0.3, api_slow_latency=1.0)
+    hedger = Hedger(initial_delay=0.05)
+    vk = client(server, hedge=hedger)
+
+    async def main():
+        return [await vk.call_api("users.get", {"user_ids": n}) for n in range(10)]
+
+    responses = run(main())
+    assert all(response[0]["id"] == 1 for response in responses)
+    assert hedger.hedged > 0 and hedger.wins > 0
@@ -0,0 +1,86 @@
+import io
+import json
+import base64
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from libs.vk.vk_local_solver import evaluate_payloads, layouts_from_steps, solve_slider_local
+
+GRID = 4
+TILE = 40
+
+
+def _slider(true_step: int, pairs: int = 10, seed: int = 1) -> dict:
+    """
+    Синтетическая капча: гладкая картинка, перемешанная так, что её
+    собирают первые true_step перестановок из steps.
+    """
+    rng = random.Random(seed)
+    tiles = GRID * GRID
+    steps = []
+    for _ in range(pairs):
+        steps += rng.sample(range(tiles), 2)
+
+    size = GRID * TILE
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32)
+    original = np.stack([x / size * 255, y / size * 255, (np.sin(x / 17) + np.cos(y / 23) + 2) * 60], axis=-1)
+
+    # Плитка scrambled[layout[pos]] стоит в позиции pos при правильном положении слайдера
+    layout = layouts_from_steps(steps, tiles)[true_step]
+    scrambled = np.empty_like(original)
+    for pos in range(tiles):
+        src, dst = divmod(pos, GRID), divmod(int(layout[pos]), GRID)
+        scrambled[dst[0] * TILE:(dst[0] + 1) * TILE, dst[1] * TILE:(dst[1] + 1) * TILE] = \
+            original[src[0] * TILE:(src[0] + 1) * TILE, src[1] * TILE:(src[1] + 1) * TILE]
+
+    buffer = io.BytesIO()
+    Image.fromarray(scrambled.astype(np.uint8)).save(buffer, format="PNG")
+    return {"image": "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode(), "steps": steps}
+
+
+def test_layouts_from_steps():
+    assert layouts_from_steps([0, 1, 1, 2], 3).tolist() == [[0, 1, 2], [1, 0, 2], [1, 2, 0]]
+
+
+@pytest.mark.parametrize("true_step", [0, 4, 10])
+def test_solver_finds_slider_position(true_step):
+    result = solve_slider_local(_slider(true_step))
+    assert result.best_step == true_step
+    assert result.confidence > 0.6
+    assert len(result.scores) == 11
+
+
+@pytest.mark.parametrize("captcha", [
+    {"image": None, "steps": [0, 1]},
+    {"image": "aGVsbG8=", "steps": [0]},
+    {"image": "aGVsbG8=", "steps": ["x", 1]},
+    {"image": "aGVsbG8=", "steps": [0, 1]},
+], ids=["no-image", "short-steps", "bad-steps", "not-an-image"])
+def test_solver_rejects_bad_input(captcha):
+    assert solve_slider_local(captcha) is None
+
+
+def _dump(directory, name, captcha, **label):
+    payload = {"response": {"status": "OK", "extension": "png", **captcha}}
+    data = {"payload": payload, **label} if label else payload
+    (directory / f"{name}.json").write_text(json.dumps(data))
+
+
+def test_evaluate_payloads_counts_only_labelled_accuracy(tmp_path):
+    _dump(tmp_path, "a", _slider(4, seed=1), best_step=4, source="rucaptcha")
+    _dump(tmp_path, "b", _slider(7, seed=2), best_step=7, source="manual")
+    _dump(tmp_path, "c", _slider(2, seed=3))
+    # Ответ самого локального решателя эталоном не считается
+    _dump(tmp_path, "d", _slider(5, seed=4), best_step=5, source="local")
+
+    stats = evaluate_payloads(str(tmp_path), min_confidence=0.5)
+    assert (stats["total"], stats["labelled"], stats["accepted"], stats["accepted_labelled"]) == (4, 2, 4, 2)
+    assert stats["accuracy"] == 1.0
+    assert stats["accepted_accuracy"] == 1.0
+
+    strict = evaluate_payloads(str(tmp_path), min_confidence=1.1)
+    assert strict["accepted"] == 0 and strict["accepted_accuracy"] is None
@@ -0,0 +1,133 @@
+import json
+import asyncio
+
+import pytest
+
+from libs.vk.vk_models import VKError
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_longpoll import LongPoll, LongPollHub
+
+
+def _api_error(code: int) -> VKExceptions.APIError:
+    return VKExceptions.APIError(VKError({"error_code": code, "error_msg": f"error {code}"}))
+
+
+class _Account:
+    """
+    AsyncVK и HTTPPool для LongPoll разом. checks — ответы a_check по очереди
+    (исключение — ошибка сети), refreshes — исходы getLongPollServer
+    (None — успех, число — APIError с этим кодом, дальше — всегда успех).
+    """
+
+    def __init__(self, checks, refreshes=(), name: str = "im"):
+        self.name = name
+        self.checks = list(checks)
+        self.refreshes = list(refreshes)
+        self.keys = 0
+        self.history = []
+        self.polled = []
+
+    def request_proxy(self):
+        return None
+
+    async def call_api(self, method, params):
+        if method == "messages.getLongPollServer":
+            outcome = self.refreshes.pop(0) if self.refreshes else None
+            if outcome is not None:
+                raise _api_error(outcome)
+            self.keys += 1
+            return {"server": f"lp.test/{self.name}", "key": f"key{self.keys}", "ts": 100 * self.keys, "pts": 1}
+        if method == "messages.getLongPollHistory":
+            self.history.append(params["ts"])
+            return {"history": [["history", params["ts"]]], "new_pts": 2}
+        raise AssertionError(method)
+
+    async def get(self, url, proxy, params, timeout):
+        self.polled.append((params["key"], params["ts"]))
+        if not self.checks:
+            await asyncio.sleep(3600)
+        check = self.checks.pop(0)
+        if isinstance(check, Exception):
+            raise check
+        return 200, json.dumps(check).encode()
+
+
+class _Pool:
+    """Общий HTTPPool хаба: a_check уходит аккаунту по адресу сервера."""
+
+    def __init__(self, *accounts):
+        self.accounts = {account.name: account for account in accounts}
+
+    async def get(self, url, **options):
+        return await self.accounts[url.rsplit("/", 1)[1]].get(url, **options)
+
+    async def close(self):
+        pass
+
+
+def _events(account, count: int) -> list:
+    async def main():
+        stream = LongPoll(account, pool=account, retry_delay=0.001).events()
+        try:
+            return [await anext(stream) for _ in range(count)]
+        finally:
+            await stream.aclose()
+    return asyncio.run(main())
+
+
+def test_refresh_errors_are_retried():
+    # Ключ не выдан с первого раза; после трёх сбоев опроса перезапрос ключа тоже падает
+    account = _Account([OSError("reset")] * 3 + [{"ts": 101, "updates": [[4, 1]]}], refreshes=[10, None, 10])
+    assert _events(account, 1) == [[4, 1]]
+    assert account.keys == 2
+    # После перезапроса при сбоях ts не сбрасывается
+    assert account.polled[-1] == ("key2", 100)
+
+
+def test_failed_1_loads_history_and_takes_new_ts():
+    account = _Account([{"failed": 1, "ts": 150}, {"ts": 151, "updates": [[4, 2]]}])
+    assert _events(account, 2) == [["history", 100], [4, 2]]
+    assert account.keys == 1
+    assert account.polled == [("key1", 100), ("key1", 150)]
+
+
+def test_failed_2_refreshes_key_and_keeps_ts():
+    account = _Account([{"ts": 105, "updates": [[4, 1]]}, {"failed": 2}, {"ts": 106, "updates": [[4, 2]]}])
+    assert _events(account, 2) == [[4, 1], [4, 2]]
+    assert account.history == []
+    assert account.polled == [("key1", 100), ("key1", 105), ("key2", 105)]
+
+
+def test_failed_3_loads_history_and_resets_ts():
+    account = _Account([{"failed": 3}, {"ts": 201, "updates": [[4, 2]]}], refreshes=[None, 10])
+    assert _events(account, 2) == [["history", 100], [4, 2]]
+    assert account.polled == [("key1", 100), ("key2", 200)]
+
+
+@pytest.mark.parametrize("account", [
+    _Account([], refreshes=[5]),
+    _Account([OSError("reset")] * 3, refreshes=[None, 5]),
+    _Account([{"failed": 4}]),
+], ids=["token-revoked", "token-revoked-on-retry", "unknown-failed"])
+def test_unrecoverable_errors_stop_stream(account):
+    with pytest.raises(VKExceptions.APIError):
+        _events(account, 1)
+
+
+def test_hub_keeps_account_through_refresh_errors():
+    async def main():
+        flaky = _Account([OSError("reset")] * 3 + [{"ts": 101, "updates": [[4, 1]]}], refreshes=[None, 10],
+                         name="flaky")
+        revoked = _Account([], refreshes=[5], name="revoked")
+        hub = LongPollHub(pool=_Pool(flaky, revoked), retry_delay=0.001)
+        received = asyncio.Queue()
+        hub.on(lambda name, update: received.put_nowait((name, update)))
+        hub.add(flaky, name="flaky")
+        hub.add(revoked, name="revoked")
+        try:
+            assert await asyncio.wait_for(received.get(), 5) == ("flaky", [4, 1])
+            return hub.running
+        finally:
+            await hub.close()
+
+    assert asyncio.run(main()) == ["flaky"]
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_metrics import Histogram, Metrics
+
+
+def test_histogram_bucket_counts():
+    histogram = Histogram(buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 1, 3, 10, 50):
+        histogram.observe(value)
+
+    # Граница входит в свой бакет; больше последней — только в count (+Inf)
+    assert histogram.counts == [2, 2, 2]
+    assert histogram.cumulative() == [(0.1, 2), (1, 4), (10, 6)]
+    assert histogram.count == 7
+    assert histogram.sum == pytest.approx(64.65)
+
+
+def test_span_outcomes():
+    metrics = Metrics(buckets=(1,))
+
+    async def cancelled():
+        with metrics.span("phase"):
+            await asyncio.sleep(3600)
+
+    async def main():
+        task = asyncio.ensure_future(cancelled())
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    with metrics.span("phase"):
+        pass
+    with pytest.raises(RuntimeError), metrics.span("phase"):
+        raise RuntimeError("boom")
+    with metrics.span("phase") as phase:
+        phase.set(outcome="timeout")
+    asyncio.run(main())
+
+    outcomes = {entry["labels"]["outcome"]: entry["count"] for entry in metrics.snapshot()["phase"]}
+    assert outcomes == {"ok": 1, "error": 1, "timeout": 1, "cancelled": 1}
+
+
+def test_prometheus_and_hooks():
+    metrics = Metrics(buckets=(0.5, 1), prefix="test")
+    seen = []
+
+    def broken(name, seconds, labels):
+        raise ValueError("hook")
+
+    metrics.add_hook(broken)
+    metrics.add_hook(lambda name, seconds, labels: seen.append((name, seconds, labels)))
+    metrics.observe("api.call", 0.7, method='a"b')
+    metrics.observe("api.call", 2.0, method='a"b')
+
+    assert seen == [("api.call", 0.7, {"method": 'a"b'}), ("api.call", 2.0, {"method": 'a"b'})]
+    assert metrics.prometheus().splitlines() == [
+        "# TYPE test_api_call_seconds histogram",
+        'test_api_call_seconds_bucket{method="a\\"b",le="0.5"} 0',
+        'test_api_call_seconds_bucket{method="a\\"b",le="1"} 1',
+        'test_api_call_seconds_bucket{method="a\\"b",le="+Inf"} 2',
+        'test_api_call_seconds_sum{method="a\\"b"} 2.700000',
+        'test_api_call_seconds_count{method="a\\"b"} 2',
+    ]
+
+
+def test_api_calls_are_measured(run, standin, client, monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(Metrics, "_default", metrics)
+    server = standin()
+    vk = client(server)
+
+    async def main():
+        await vk.call_api("users.get", {"user_ids": 1})
+        server.config.api_error6_rate = 1.0
+        with pytest.raises(VKExceptions.APIError):
+            await vk.call_api("users.get", {"user_ids": 2})
+
+    run(main())
+    calls = {entry["labels"]["outcome"]: entry["count"] for entry in metrics.snapshot()["api.call"]}
+    assert calls == {"ok": 1, "error_6": 1}
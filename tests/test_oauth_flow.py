@@ -0,0 +1,213 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from libs.vk.vk_auth_with_solver import (BrowserLogin, OAuthLoginFlow, REDIRECT_URI, JS_SLIDER_GESTURE,
+                                         JS_SLIDER_UP, move_slider_by_best_step)
+
+
+class _Response:
+    url = "https://api.vk.com/method/captchaNotRobot.getContent"
+
+    def __init__(self, data=None, delay=0.0):
+        self.data = data
+        self.delay = delay
+
+    async def json(self):
+        await asyncio.sleep(self.delay)
+        return self.data
+
+
+def test_captcha_fired_with_redirect_is_not_lost(run):
+    async def main():
+        flow = OAuthLoginFlow(None, "login", "password")
+        flow._captchas.put_nowait({"captcha": 1})
+        flow._redirect.set_result(REDIRECT_URI)
+
+        first = await flow._next_event({"captcha", "redirect"}, 1)
+        second = await flow._next_event({"captcha"}, 1)
+        return first, second
+
+    first, second = run(main())
+    assert first == ("redirect", REDIRECT_URI)
+    assert second == ("captcha", {"captcha": 1})
+
+
+def test_next_event_times_out(run):
+    async def main():
+        flow = OAuthLoginFlow(None, "login", "password")
+        return await flow._next_event({"captcha"}, 0.05)
+
+    assert run(main()) == (None, None)
+
+
+def test_captcha_reads_are_tracked_and_cancelled(run):
+    async def main():
+        flow = OAuthLoginFlow(None, "login", "password")
+        flow._on_response(_Response({"fast": 1}))
+        flow._on_response(_Response({"slow": 1}, delay=60))
+        await asyncio.sleep(0.01)
+        assert len(flow._reads) == 1
+        slow = next(iter(flow._reads))
+        await flow.close()
+        return flow._captchas.get_nowait(), slow
+
+    captcha, slow = run(main())
+    assert captcha == {"fast": 1}
+    assert slow.cancelled()
+
+
+class _Field:
+    def __init__(self, page, name):
+        self.page = page
+        self.name = name
+
+    @property
+    def first(self):
+        return self
+
+    def is_shown(self):
+        return self.name in self.page.visible
+
+    async def wait_for(self, state, timeout):
+        while not self.is_shown():
+            await asyncio.sleep(0.001)
+
+    async def is_visible(self):
+        return self.is_shown()
+
+    async def fill(self, value):
+        self.page.actions.append(("fill", self.name, value))
+
+    async def press(self, key):
+        self.page.actions.append(("press", self.name, key))
+        self.page.submit(self.name)
+
+
+class _LoginPage:
+    """Страница OAuth: общая форма (логин и пароль сразу) или логин и пароль по шагам."""
+
+    def __init__(self, combined: bool):
+        self.combined = combined
+        self.visible = {"login", "password"} if combined else {"login"}
+        self.actions = []
+        self.main_frame = SimpleNamespace(url=REDIRECT_URI + "#access_token=t")
+        self.flow = None
+
+    def locator(self, selector, has_text=None):
+        if has_text is not None:
+            return _Field(self, "manual")
+        return _Field(self, "password" if selector == OAuthLoginFlow.PASSWORD_SELECTOR else "login")
+
+    def submit(self, field):
+        filled = {name: value for action, name, value in self.actions if action == "fill"}
+        if field == "login" and not self.combined:
+            self.visible = {"password"}
+        elif filled.get("login") and filled.get("password"):
+            self.visible = set()
+            self.flow._on_navigated(self.main_frame)
+
+
+@pytest.mark.parametrize("combined", [True, False], ids=["combined-form", "two-step"])
+def test_login_is_typed_before_password(run, combined):
+    async def main():
+        page = _LoginPage(combined)
+        flow = page.flow = OAuthLoginFlow(page, "login", "password")
+        flow.opened = True
+        return await flow.run(), page.actions
+
+    url, actions = run(main())
+    assert url == REDIRECT_URI + "#access_token=t"
+    enters = [("press", "password", "Enter")] if combined else \
+        [("press", "login", "Enter"), ("press", "password", "Enter")]
+    assert [a for a in actions if a[0] == "fill"] == [("fill", "login", "login"), ("fill", "password", "password")]
+    assert [a for a in actions if a[0] == "press"] == enters
+
+
+class _SliderPage:
+    """Страница с ползунком капчи: трек 100px, жест «доезжает» до moved px."""
+
+    frames = ()
+
+    def __init__(self, moved):
+        self.moved = moved
+        self.scripts = []
+
+    def locator(self, selector):
+        return self
+
+    @property
+    def first(self):
+        return self
+
+    async def count(self):
+        return 1
+
+    async def wait_for(self, state):
+        pass
+
+    async def bounding_box(self):
+        return {"width": 100}
+
+    async def element_handle(self):
+        return "handle"
+
+    async def evaluate(self, script, args):
+        self.scripts.append((script, args))
+        return self.moved if script is JS_SLIDER_GESTURE else True
+
+
+@pytest.mark.parametrize("moved, released", [(10.2, True), (6.0, False)], ids=["on-target", "off-target"])
+def test_slider_released_only_on_target(run, moved, released):
+    # 5 шагов по ~2.04px — цель ~10.2px, допуск ~1px
+    page = _SliderPage(moved)
+    assert run(move_slider_by_best_step(page, 5, duration=0, corrections=3)) is released
+    gesture_args = page.scripts[0][1]
+    assert gesture_args[-1] == 3
+    assert [script for script, _ in page.scripts] == [JS_SLIDER_GESTURE] + [JS_SLIDER_UP] * released
+
+
+class _StateStore:
+    """BrowserStateStore: пишет вызовы и проверяет, что они не на потоке event loop."""
+
+    def __init__(self, loop_thread):
+        self.loop_thread = loop_thread
+        self.calls = []
+
+    def _call(self, name, *args):
+        assert threading.get_ident() != self.loop_thread
+        self.calls.append((name, *args))
+
+    def load(self, username, device_id=None):
+        self._call("load", username)
+        return {"cookies": []}
+
+    def save(self, username, state, device_id=None):
+        self._call("save", username)
+
+    def delete(self, username):
+        self._call("delete", username)
+
+
+@pytest.mark.parametrize("flow_state, token_data, expected", [
+    ("page", {"access_token": "t"}, [("save", "login")]),
+    ("login", {"access_token": "t"}, [("delete", "login"), ("save", "login")]),
+    ("login", None, [("delete", "login")]),
+], ids=["accepted", "rejected", "rejected-no-token"])
+def test_browser_state_update(run, flow_state, token_data, expected):
+    async def main():
+        store = _StateStore(threading.get_ident())
+        login = BrowserLogin("login", "password", state_store=store)
+        login.state_loaded = await login._load_state() is not None
+        login.flow = SimpleNamespace(state=flow_state)
+
+        async def storage_state():
+            return {"cookies": []}
+        login.context = SimpleNamespace(storage_state=storage_state)
+
+        await login._update_state(token_data)
+        return store.calls
+
+    assert run(main()) == [("load", "login")] + expected
@@ -0,0 +1,87 @@
+import re
+import json
+import asyncio
+
+import pytest
+
+from libs.vk.vk_paginate import Paginator, PAGE_LIMITS
+
+
+class _Collection:
+    """offset/count-метод: total элементов, каждый hidden-й скрыт (страницы короче count)."""
+
+    def __init__(self, total: int, hidden: int = 0):
+        self.total = total
+        self.hidden = hidden
+        self.calls = []
+
+    def page(self, params: dict) -> dict:
+        offset, count = int(params.get("offset", 0)), int(params["count"])
+        items = [i for i in range(offset, min(self.total, offset + count)) if not (self.hidden and i % self.hidden == 0)]
+        return {"count": self.total, "items": items}
+
+    async def call_api(self, method, params):
+        self.calls.append(params)
+        return self.page(params)
+
+    async def send(self, method, params):
+        assert method == "execute"
+        pages = [self.page(json.loads(args)) for args in re.findall(r"API\.[\w.]+\((\{.*?\})\)", params["code"])]
+        self.calls.extend(pages)
+        return {"response": pages}
+
+
+def _collect(paginator) -> list:
+    async def main():
+        return [item async for item in paginator.items()]
+    return asyncio.run(main())
+
+
+def _expected(collection) -> list:
+    return [i for i in range(collection.total) if not (collection.hidden and i % collection.hidden == 0)]
+
+
+@pytest.mark.parametrize("prefetch, pages_per_call", [(0, 1), (2, 1), (1, 3)])
+def test_short_pages_do_not_stop_iteration(prefetch, pages_per_call):
+    collection = _Collection(total=1050, hidden=7)
+    paginator = Paginator(collection.call_api, collection.send, "wall.get", prefetch=prefetch,
+                          pages_per_call=pages_per_call)
+    assert _collect(paginator) == _expected(collection)
+
+
+def test_page_size_is_clamped_to_method_limit():
+    collection = _Collection(total=250)
+    paginator = Paginator(collection.call_api, collection.send, "wall.get", page_size=1000)
+    assert paginator.page_size == PAGE_LIMITS["wall.get"]
+    assert _collect(paginator) == list(range(250))
+    assert {params["count"] for params in collection.calls} == {100}
+
+
+def test_max_items_and_start_offset():
+    collection = _Collection(total=1000)
+    paginator = Paginator(collection.call_api, collection.send, "groups.getMembers", {"offset": 10}, page_size=100,
+                          max_items=250)
+    assert _collect(paginator) == list(range(10, 260))
+
+
+def test_empty_page_stops_when_collection_shrinks():
+    collection = _Collection(total=500)
+
+    async def call_api(method, params):
+        response = await collection.call_api(method, params)
+        collection.total = 150  # удалили во время обхода; count первой страницы устарел
+        return response
+
+    paginator = Paginator(call_api, collection.send, "wall.get", prefetch=0)
+    assert _collect(paginator) == list(range(150))
+    assert len(collection.calls) == 3
+
+
+def test_full_traversal_through_standin(standin, client, run):
+    server = standin(collection_size=1000)
+
+    async def main():
+        vk = client(server)
+        return [item async for item in vk.iter_api("friends.get", page_size=100, prefetch=2, pages_per_call=3)]
+
+    assert run(main()) == list(range(1000))
@@ -0,0 +1,125 @@
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+from libs.vk.vk_auth_with_solver import REDIRECT_URI
+from libs.vk.vk_prewarm import PrewarmPolicy
+
+TOKEN_URL = REDIRECT_URI + "#access_token=browser&user_id=1&expires_in=0"
+
+
+class _Locator:
+    first = property(lambda self: self)
+
+    async def wait_for(self, state, timeout):
+        await asyncio.sleep(3600)
+
+
+class _Page:
+    """OAuth-страница уже залогиненного аккаунта: после загрузки — сразу redirect."""
+
+    def __init__(self):
+        self.listeners = {}
+        self.main_frame = SimpleNamespace(url="about:blank")
+        self.url = "about:blank"
+
+    def on(self, event, callback):
+        self.listeners[event] = callback
+
+    async def goto(self, url, **options):
+        await asyncio.sleep(0.01)
+        self.main_frame.url = self.url = TOKEN_URL
+        self.listeners["framenavigated"](self.main_frame)
+
+    def locator(self, selector, has_text=None):
+        return _Locator()
+
+
+class _Context:
+    async def route(self, pattern, handler):
+        pass
+
+    def on(self, event, callback):
+        pass
+
+    async def new_page(self):
+        return _Page()
+
+
+class _BrowserPool:
+    def __init__(self):
+        self.opened = 0
+        self.closed = 0
+
+    @contextlib.asynccontextmanager
+    async def context(self, **options):
+        self.opened += 1
+        try:
+            yield _Context()
+        finally:
+            self.closed += 1
+
+
+def _auth(run, client, server, policy, login="user"):
+    browser_pool = _BrowserPool()
+    vk = client(server, prewarm=policy, browser_pool=browser_pool)
+
+    async def main():
+        auth_data = await vk.auth(login, "secret")
+        # Непригодившийся контекст возвращается в фоне
+        for _ in range(100):
+            if browser_pool.closed == browser_pool.opened:
+                break
+            await asyncio.sleep(0.01)
+        return auth_data
+
+    return run(main()), browser_pool
+
+
+def test_prewarmed_context_is_used_on_captcha(run, standin, client):
+    server = standin(oauth_latency=0.001, oauth_captcha_rate=1.0)
+    policy = PrewarmPolicy(prior=1.0)
+    auth_data, browser_pool = _auth(run, client, server, policy)
+
+    assert auth_data["access_token"] == "browser"
+    # Контекст открыт заранее один раз, flow капчи взял его же
+    assert (browser_pool.opened, browser_pool.closed) == (1, 1)
+    assert (policy.prewarmed, policy.used, policy.wasted) == (1, 1, 0)
+
+
+def test_unused_prewarm_is_released(run, standin, client):
+    server = standin(oauth_latency=0.05)
+    policy = PrewarmPolicy(prior=1.0)
+    auth_data, browser_pool = _auth(run, client, server, policy)
+
+    assert auth_data["access_token"] == "bench_user"
+    assert (browser_pool.opened, browser_pool.closed) == (1, 1)
+    assert (policy.prewarmed, policy.used, policy.wasted) == (1, 0, 1)
+
+
+def test_no_prewarm_below_threshold(run, standin, client):
+    server = standin(oauth_latency=0.001, oauth_captcha_rate=1.0)
+    policy = PrewarmPolicy(prior=0.0)
+    auth_data, browser_pool = _auth(run, client, server, policy)
+
+    assert auth_data["access_token"] == "browser"
+    assert browser_pool.opened == 1
+    assert (policy.prewarmed, policy.missed) == (0, 1)
+
+
+def test_policy_learns_per_account():
+    policy = PrewarmPolicy(threshold=0.3, alpha=0.5, global_alpha=0.1, max_accounts=2)
+    assert not policy.should_prewarm("a")
+
+    policy.record("a", captcha=True, prewarmed=False)
+    assert policy.should_prewarm("a") and not policy.should_prewarm("b")
+
+    policy.record("a", captcha=False, prewarmed=True)
+    policy.record("a", captcha=False, prewarmed=False)
+    assert not policy.should_prewarm("a")
+
+    policy.record("b", captcha=False, prewarmed=False)
+    policy.record("c", captcha=False, prewarmed=False)
+    assert policy.stats() | {"global_captcha_rate": None} == {
+        "prewarmed": 1, "used": 0, "wasted": 1, "missed": 1, "global_captcha_rate": None, "accounts": 2,
+    }
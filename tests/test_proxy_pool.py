@@ -0,0 +1,58 @@
+import asyncio
+
+import aiohttp
+
+from libs.vk.vk_proxy_pool import ProxyPool
+
+
+class _Probes:
+    """HTTPPool для проб: ответ на прокси — статус или исключение."""
+
+    def __init__(self, answers: dict):
+        self.answers = answers
+
+    async def post(self, url, proxy=None, data=None, timeout=None):
+        answer = self.answers[proxy]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer, b"{}"
+
+
+PROXIES = {
+    "http://slow:1": asyncio.TimeoutError(),
+    "http://refused:1": aiohttp.ClientConnectionError("refused"),
+    "http://auth:1": 407,
+    "http://ok:1": 200,
+}
+
+
+def test_probe_tells_timeouts_from_errors(run):
+    pool = ProxyPool(PROXIES, max_timeouts=2, pool=_Probes(PROXIES))
+
+    async def main():
+        return [await pool.probe_all() for _ in range(2)]
+
+    results = run(main())
+    assert results[-1] == {"http://slow:1": False, "http://refused:1": False, "http://auth:1": False,
+                           "http://ok:1": True}
+
+    stats = {proxy: pool._stats[proxy] for proxy in PROXIES}
+    # Таймауты копятся к вытеснению, ошибки — в долю ошибок
+    assert stats["http://slow:1"].evicted and stats["http://slow:1"].timeouts_in_row == 2
+    for proxy in ("http://refused:1", "http://auth:1"):
+        assert stats[proxy].timeouts_in_row == 0 and stats[proxy].error_rate > 0
+    assert stats["http://ok:1"].error_rate == 0
+
+
+def test_probe_brings_evicted_proxy_back(run):
+    answers = {"http://a:1": asyncio.TimeoutError()}
+    pool = ProxyPool(answers, max_timeouts=1, pool=_Probes(answers))
+
+    async def main():
+        await pool.probe("http://a:1")
+        evicted = pool._stats["http://a:1"].evicted
+        answers["http://a:1"] = 200
+        return evicted, await pool.probe("http://a:1")
+
+    assert run(main()) == (True, True)
+    assert not pool._stats["http://a:1"].evicted
@@ -0,0 +1,64 @@
+import time
+import asyncio
+
+from libs.vk.vk_async import AsyncVK
+from libs.vk.vk_rate import RateScheduler, TokenBucket, TOKEN_RATES
+
+
+def test_bucket_spaces_requests_after_burst():
+    bucket = TokenBucket(rate=10, burst=2)
+    delays = [bucket.reserve() for _ in range(4)]
+    assert delays[:2] == [0.0, 0.0]
+    assert abs(delays[2] - 0.1) < 0.01
+    assert abs(delays[3] - 0.2) < 0.01
+
+
+def test_bucket_backoff_and_recovery():
+    bucket = TokenBucket(rate=4, burst=4, min_rate=1)
+    bucket.slow_down(0.5)
+    assert bucket.rate == 2
+    bucket.slow_down(0.1)
+    assert bucket.rate == 1
+    for _ in range(100):
+        bucket.speed_up(0.5)
+    assert bucket.rate == 4
+
+
+def test_rate_follows_token_type(run):
+    scheduler = RateScheduler()
+
+    async def main():
+        started = time.monotonic()
+        await asyncio.gather(*(scheduler.acquire("group", token_type="group") for _ in range(25)))
+        return time.monotonic() - started
+
+    # 20 сразу (burst = лимит), ещё 5 — за ~0.25 сек
+    assert run(main()) < 0.5
+    assert scheduler._tokens["group"].rate == TOKEN_RATES["group"]
+
+    scheduler.on_throttled("user")
+    assert scheduler._tokens["user"].rate == TOKEN_RATES["user"] * scheduler.backoff
+
+
+def test_explicit_token_rate_wins():
+    scheduler = RateScheduler(token_rate=7)
+    scheduler.on_throttled("group", token_type="group")
+    assert scheduler._tokens["group"].base_rate == 7
+
+
+def test_scheduler_is_opt_in():
+    assert AsyncVK().scheduler is None
+    assert AsyncVK(scheduler=True).scheduler is RateScheduler.default()
+
+
+def test_throttled_call_is_retried(standin, client, run):
+    server = standin(api_error6_rate=0.3)
+    scheduler = RateScheduler(token_rate=50, min_rate=50)
+
+    async def main():
+        vk = client(server, scheduler=scheduler, throttle_retries=10)
+        return [await vk.call_api("users.get", {"user_ids": i}) for i in range(10)]
+
+    assert len(run(main())) == 10
+    assert server.counters["error6"] > 0
+    assert scheduler.throttled == server.counters["error6"]
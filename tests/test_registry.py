@@ -0,0 +1,49 @@
+from libs.vk.vk_http import HTTPPool
+from libs.vk.vk_registry import AccountRegistry
+from libs.vk.vk_token_store import MemoryTokenStore
+
+
+def _proxies(server) -> list[str]:
+    # Один сервер-заглушка, но разные учётки — для HTTPPool это разные прокси
+    host = server.proxy.rsplit("@", 1)[1]
+    return [f"http://a:a@{host}", f"http://b:b@{host}"]
+
+
+def test_one_session_per_proxy(run, standin):
+    server = standin()
+    proxies = _proxies(server)
+    registry = AccountRegistry(scheduler=False)
+    for i in range(20):
+        # Новая строка на каждую запись, как после json.loads
+        registry.add(f"acc{i}", {"access_token": f"t{i}", "user_id": i, "user_agent": "UA",
+                                 "proxy": "".join(proxies[i % 2])})
+
+    async def main():
+        for _ in range(2):
+            for login in registry:
+                await registry.call_api(login, "users.get", {"user_ids": 1})
+        return set(HTTPPool.default()._sessions)
+
+    sessions = run(main())
+    assert sessions == set(proxies)
+    # Последовательные вызовы 20 аккаунтов — по одному keep-alive соединению на прокси
+    assert server.counters["connections"] == 2 and server.counters["api"] == 40
+
+    # Строки общие: одна копия прокси и user_agent на все записи
+    assert registry.get("acc0").proxy is registry.get("acc2").proxy
+    assert registry.get("acc0").user_agent is registry.get("acc1").user_agent
+    assert registry.stats() == {"accounts": 20, "proxies": 2, "shared_strings": 3}
+
+
+def test_load_and_auth(run, standin):
+    server = standin(oauth_latency=0.001)
+    store = MemoryTokenStore()
+    store.put("alive", {"access_token": "t", "user_id": 1, "proxy": server.proxy, "expires_in": 0})
+    store.put("revoked", {"access_token": None})
+    registry = AccountRegistry(scheduler=False)
+
+    assert registry.load(store) == 1 and "alive" in registry and "revoked" not in registry
+
+    run(registry.auth("new", "secret", proxy=server.proxy))
+    assert registry.get("new").access_token == "bench_new"
+    assert registry.get("new").proxy is registry.get("alive").proxy
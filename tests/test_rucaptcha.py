@@ -0,0 +1,94 @@
+import time
+import socket
+
+import pytest
+
+from libs.vk.vk_pingback import PingbackServer
+from libs.vk.vk_rucaptcha import RuCaptchaClient
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def pingback():
+    port = _free_port()
+    return PingbackServer(f"http://127.0.0.1:{port}", host="127.0.0.1", port=port)
+
+
+def _solve(run, server, pingback=None, **options):
+    captcha_client = RuCaptchaClient(key="test", base_url=server.rucaptcha_url, pingback=pingback,
+                                     initial_delay=0.05, min_interval=0.05, **options)
+
+    async def main():
+        try:
+            return await captcha_client.solve_task({"type": "VKCaptchaImageTask"})
+        finally:
+            if pingback is not None:
+                await pingback.stop()
+    return run(main())
+
+
+def test_pingback_before_waiting(run, standin, pingback):
+    # Решение приходит pingback'ом ещё до ответа createTask
+    server = standin(rucaptcha_solve_time=0)
+    assert _solve(run, server, pingback, pingback_fallback=5) == {"best_step": 7}
+    assert (server.counters["pingback"], server.counters["getTaskResult"]) == (1, 0)
+    assert pingback.received == 1
+
+
+def test_pingback_push(run, standin, pingback):
+    server = standin(rucaptcha_solve_time=0.1)
+    assert _solve(run, server, pingback, pingback_fallback=5) == {"best_step": 7}
+    assert (server.counters["pingback"], server.counters["getTaskResult"]) == (1, 0)
+
+
+def test_lost_pingback_falls_back_to_polling(run, standin, pingback):
+    server = standin(rucaptcha_solve_time=0.1, rucaptcha_pingback_loss=1.0)
+    assert _solve(run, server, pingback, pingback_fallback=0.05) == {"best_step": 7}
+    assert server.counters["pingback"] == 0 and server.counters["getTaskResult"] >= 1
+    assert pingback.received == 0
+
+
+def test_polling_without_pingback(run, standin):
+    server = standin(rucaptcha_solve_time=0.1)
+    assert _solve(run, server) == {"best_step": 7}
+    assert server.counters["getTaskResult"] >= 1
+
+
+class _Flaky(RuCaptchaClient):
+    """getTaskResult отвечает по сценарию: исключение — сбой запроса."""
+
+    def __init__(self, answers, **options):
+        super().__init__(key="test", initial_delay=0.001, min_interval=0.001, max_interval=0.001, **options)
+        self.answers = list(answers)
+        self.calls = 0
+
+    async def get_result(self, task_id):
+        self.calls += 1
+        answer = self.answers.pop(0) if self.answers else {"errorId": 0, "status": "processing"}
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_wait_result_retries_transient_errors(run):
+    client = _Flaky([OSError("reset"), ValueError("bad json"), {"errorId": 0, "status": "processing"},
+                     {"errorId": 0, "status": "ready", "solution": {"best_step": 3}}])
+    assert run(client.wait_result(1, time.monotonic())) == {"best_step": 3}
+    assert client.calls == 4
+
+
+def test_wait_result_gives_up_on_rucaptcha_error(run):
+    client = _Flaky([OSError("reset"), {"errorId": 12, "errorCode": "ERROR_CAPTCHA_UNSOLVABLE"}])
+    assert run(client.wait_result(1, time.monotonic())) is None
+    assert client.calls == 2
+
+
+def test_wait_result_times_out(run):
+    client = _Flaky([OSError("reset")] * 1000, timeout=0.05)
+    assert run(client.wait_result(1, time.monotonic())) is None
+    assert client.calls > 1
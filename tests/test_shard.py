@@ -0,0 +1,62 @@
+import os
+import signal
+import asyncio
+
+import pytest
+
+from libs.vk.vk_async import AsyncVK
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_shard import ShardPool
+from libs.vk.vk_token_store import SQLiteTokenStore
+
+
+def _unpicklable_results():
+    async def call_api(self, endpoint, params=None, **options):
+        return lambda: None
+    AsyncVK.call_api = call_api
+
+
+def _scripted_calls():
+    async def call_api(self, endpoint, params=None, **options):
+        if endpoint == "test.hang":
+            await asyncio.sleep(3600)
+        return {"endpoint": endpoint, "pid": os.getpid()}
+    AsyncVK.call_api = call_api
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = str(tmp_path / "tokens.sqlite3")
+    store = SQLiteTokenStore(path)
+    store.put("acc", {"access_token": "t", "user_id": 1, "expires_in": 0})
+    store.close()
+    return path
+
+
+def test_unpicklable_result_fails_call(run, store_path):
+    async def main():
+        async with ShardPool(1, store_path, client_options={"scheduler": False},
+                             initializer=_unpicklable_results) as pool:
+            with pytest.raises(VKExceptions.APIError):
+                await asyncio.wait_for(pool.call_api("acc", "users.get"), 30)
+    run(main())
+
+
+def test_crashed_shard_fails_pending_and_restarts(run, store_path):
+    async def main():
+        async with ShardPool(1, store_path, client_options={"scheduler": False}, initializer=_scripted_calls,
+                             restart_delay=0.05, check_interval=0.05) as pool:
+            first = await asyncio.wait_for(pool.call_api("acc", "users.get"), 30)
+            hung = asyncio.ensure_future(pool.call_api("acc", "test.hang"))
+            await asyncio.sleep(0.1)
+            os.kill(first["pid"], signal.SIGKILL)
+
+            with pytest.raises(VKExceptions.APIError) as error:
+                await asyncio.wait_for(hung, 10)
+            second = await asyncio.wait_for(pool.call_api("acc", "users.get"), 30)
+            return error.value.code, first, second, pool.stats()
+
+    code, first, second, stats = run(main())
+    assert code == -1
+    assert second["endpoint"] == "users.get" and second["pid"] != first["pid"]
+    assert stats[0]["restarts"] == 1 and stats[0]["pending"] == 0
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from libs.vk.vk_async import AsyncVK
+from libs.vk.vk_token_store import TokenStore, MemoryTokenStore, SQLiteTokenStore, is_token_fresh
+
+
+def test_token_store_is_abstract():
+    with pytest.raises(TypeError):
+        TokenStore()
+
+
+def test_freshness():
+    assert not is_token_fresh(None)
+    assert not is_token_fresh({"access_token": ""})
+    assert is_token_fresh({"access_token": "t", "expires_at": 0})
+    assert is_token_fresh({"access_token": "t", "expires_at": time.time() + 7200}, margin=3600)
+    assert not is_token_fresh({"access_token": "t", "expires_at": time.time() + 60}, margin=3600)
+
+
+def test_sqlite_roundtrip(tmp_path):
+    store = SQLiteTokenStore(str(tmp_path / "tokens.sqlite3"))
+    store.put("login", {"access_token": "t", "expires_in": 3600})
+    data = store.get("login")
+    assert data["access_token"] == "t"
+    assert data["expires_at"] > time.time() + 3500
+    assert dict(store.items()).keys() == {"login"}
+    store.delete("login")
+    assert store.get("login") is None
+    store.close()
+
+
+def test_auth_saves_and_reuses_token(standin, run):
+    server = standin()
+    store = MemoryTokenStore()
+
+    async def auth():
+        vk = AsyncVK(token_store=store)
+        vk.set_proxy(server.proxy)
+        return await vk.auth("user@example.com", "secret")
+
+    first = run(auth())
+    assert store.get("user@example.com")["access_token"] == first["access_token"]
+    assert server.counters["oauth"] == 1
+
+    second = run(auth())
+    assert second["access_token"] == first["access_token"]
+    assert server.counters["oauth"] == 1
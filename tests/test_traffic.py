@@ -0,0 +1,35 @@
+from libs.vk.vk_traffic import ResourceBlocker
+
+
+class _Frame:
+    def __init__(self, url=""):
+        self.url = url
+
+
+class _Request:
+    def __init__(self, url, resource_type="fetch", frame_url=""):
+        self.url = url
+        self.resource_type = resource_type
+        self.frame = _Frame(frame_url)
+
+
+def _passes(blocker, request):
+    return blocker._allowed(request) or not blocker._blocked(request)
+
+
+def test_blocks_media_trackers_and_telemetry():
+    blocker = ResourceBlocker()
+    assert not _passes(blocker, _Request("https://vk.com/images/logo.png", "image"))
+    assert not _passes(blocker, _Request("https://stats.vk-portal.net/event", "ping"))
+    assert not _passes(blocker, _Request("https://mc.yandex.ru/watch/1", "script"))
+    assert not _passes(blocker, _Request("https://api.vk.com/method/statEvents.addMiniApps", "fetch"))
+
+
+def test_keeps_login_and_captcha_requests():
+    blocker = ResourceBlocker()
+    # "other" — fetch/beacon'ы и виджет капчи
+    assert _passes(blocker, _Request("https://login.vk.com/?act=connect_authorize", "other"))
+    assert _passes(blocker, _Request("https://id.vk.com/auth", "document"))
+    assert _passes(blocker, _Request("https://api.vk.com/method/captchaNotRobot.getContent", "fetch"))
+    # Картинки внутри iframe капчи не режем
+    assert _passes(blocker, _Request("https://vk.com/img.png", "image", frame_url="https://id.vk.com/not_robot"))
@@ -0,0 +1,35 @@
+import pytest
+
+from libs.vk.vk_types import User, Page, parse
+
+
+def test_from_dict_fills_slots_and_extra():
+    user = User.from_dict({"id": 1, "first_name": "A", "city": {"id": 2}})
+    assert (user.id, user.first_name, user.last_name) == (1, "A", None)
+    assert user.city == {"id": 2}
+    assert user.extra == {"city": {"id": 2}}
+    assert not hasattr(user, "__dict__")
+
+    lean = User.from_dict({"id": 1, "city": {"id": 2}}, extra=False)
+    assert lean.extra is None
+    with pytest.raises(AttributeError):
+        lean.city
+
+
+def test_roundtrip_and_equality():
+    data = {"id": 1, "first_name": "A", "photo_100": "x"}
+    assert User.from_dict(data).to_dict() == data
+    assert User.from_dict(data) == User(**data)
+    assert User.from_dict(data) != User.from_dict(data | {"id": 2})
+
+
+def test_models_are_unhashable_by_design():
+    with pytest.raises(TypeError):
+        hash(User(id=1))
+
+
+def test_parse_shapes():
+    assert parse([{"id": 1}, 5], User) == [User(id=1), 5]
+    page = parse({"count": 10, "items": [{"id": 1}]}, User)
+    assert isinstance(page, Page) and page.count == 10 and list(page) == [User(id=1)]
+    assert parse({"id": 3}, User) == User(id=3)
@@ -1,201 +1,111 @@
-import re
-import time
-import os
-import requests
-import core.helpers as Helpers
-
-from core.app_config import APP_CONFIG
 from libs.vk.vk_models import *
-from libs.vk.vk_auth_with_solver import obtain_token_selenium
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_async import AsyncVK
+from libs.vk.vk_loop import run_sync
+
+__all__ = ['VK', 'AsyncVK', 'VKExceptions']
 
-__all__ = ['VK', 'VKExceptions']
 
+class _ClientAttr:
+    """Атрибут VK, который читается/пишется напрямую в обёрнутый AsyncVK."""
 
-class VKExceptions:
-    class APIError(Exception):
-        code: int
-        msg: str
+    def __set_name__(self, owner, name):
+        self.name = name
 
-        def __init__(self, error: VKError):
-            self.code = error.code
-            self.msg = error.msg
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return getattr(obj.client, self.name)
 
-        def to_dict(self):
-            return {
-                "error": {
-                    "code": self.code,
-                    "msg": self.msg
-                }
-            }
+    def __set__(self, obj, value):
+        setattr(obj.client, self.name, value)
 
 
 class VK:
-    access_token: str
-    user_id: int
-    user_agent: str
-    device_id: str
-    proxy: str
+    """
+    Синхронная обёртка над AsyncVK: все запросы выполняются в общем
+    фоновом event loop (libs.vk.vk_loop), реализация одна на оба пути.
+    """
+
+    access_token = _ClientAttr()
+    user_id = _ClientAttr()
+    user_agent = _ClientAttr()
+    device_id = _ClientAttr()
+    proxy = _ClientAttr()
 
-    __session: requests.Session
+    __client: AsyncVK
 
-    def __init__(self):
-        self.__session = requests.Session()
+    def __init__(self, **options):
+        # options пробрасываются в AsyncVK (batch=True, batch_linger=... и т.д.)
+        self.__client = AsyncVK(**options)
+
+    @property
+    def client(self) -> AsyncVK:
+        return self.__client
 
     def set_session(self, auth_data: dict):
-        self.access_token = auth_data.get('access_token')
-        self.user_id = auth_data.get('user_id')
-        self.user_agent = auth_data.get('user_agent')
-        self.device_id = auth_data.get('device_id')
-        self.proxy = auth_data.get('proxy')
+        self.__client.set_session(auth_data)
         return self
 
     def set_proxy(self, proxy):
-        self.proxy = proxy
-
-    def _normalize_proxy(self, proxy):
-        if proxy and proxy.startswith('https://'):
-            return proxy.replace('https://', 'http://', 1)
-        return proxy
+        self.__client.set_proxy(proxy)
 
     # --------------------------------------------------------------------
     #                             AUTH
     # --------------------------------------------------------------------
 
-    def auth(self, username: str, password: str, captcha_sid=None, captcha_key=None, _captcha_attempt=0):
+    def auth(self, username: str, password: str, captcha_sid=None, captcha_key=None, _captcha_attempt=0,
+             force: bool = False):
         """
         Авторизация через VK Password Grant.
-        Если VK отвечает need_captcha — переключаемся на Selenium-flow.
+        Если VK отвечает need_captcha — переключаемся на Playwright-flow.
         """
-
-        user_agent = (
-            'VKAndroidApp/8.52-14102 (Android 13; SDK 33; arm64-v8a; Samsung SM-G998B; ru; 2400x1080)'
-        )
-
-        if not getattr(self, "device_id", None):
-            self.device_id = Helpers.get_random_string(16)
-
-        device_id = self.device_id
-
-        data = {
-            "client_id": 2274003,
-            "client_secret": "hHbZxrka2uZ6jB1inYsH",
-            "https": 1,
-            "libverify_support": 1,
-            "scope": "all",
-            "grant_type": "password",
-            "username": username,
-            "password": password,
-            "2fa_supported": 1,
-            "v": 5.199,
-            "lang": "ru",
-            "device_id": device_id,
-            "api_id": 2274003,
-        }
-
-        normalized_proxy = self._normalize_proxy(self.proxy)
-
-        try:
-            request = self.__session.post(
-                "https://oauth.vk.com/token",
-                data=data,
-                headers={
-                    "cache-control": "no-cache",
-                    "user-agent": user_agent,
-                    "x-vk-android-client": "new",
-                    "accept-encoding": "gzip",
-                },
-                proxies={"http": normalized_proxy, "https": normalized_proxy},
-                timeout=30,
-            )
-        except Exception as e:
-            raise VKExceptions.APIError(
-                VKError({"error_code": -1, "error_msg": str(e)})
-            )
-
-        try:
-            json_data = request.json()
-        except Exception:
-            print(request.text)
-            raise VKExceptions.APIError(
-                VKError({"error_code": -999, "error_msg": "Invalid JSON"})
-            )
-
-        error = json_data.get("error")
-
-        # --------------------------------------------------------------------
-        #                     SUCCESS
-        # --------------------------------------------------------------------
-        if error is None:
-            auth_data = json_data | {"user_agent": user_agent, "device_id": device_id}
-            self.set_session(auth_data | {"proxy": self.proxy})
-            print("[VKAuth] SUCCESS")
-            return auth_data
-
-        # --------------------------------------------------------------------
-        #                     CAPTCHA → Fallback to Selenium
-        # --------------------------------------------------------------------
-        if error == "need_captcha":
-            print("[VKAuth] VK requires captcha → switching to Selenium OAuth flow")
-
-            token_data = obtain_token_selenium(username, password, proxy=self.proxy)
-
-            if token_data and token_data.get("access_token"):
-                print("[VKAuth] Selenium auth success")
-                self.set_session(token_data | {"proxy": self.proxy})
-                return token_data
-
-            print("[VKAuth] Selenium returned no token (manual captcha probably needed).")
-            return None  # <-- НЕ кидаем ошибку!
-
-        # --------------------------------------------------------------------
-        #                     OTHER AUTH ERRORS
-        # --------------------------------------------------------------------
-        print("[VKAuth] ERROR:", json_data)
-        raise VKExceptions.APIError(
-            VKError({
-                "error_code": json_data.get("error_code", -100),
-                "error_msg": json_data.get("error_description", error)
-            })
-        )
+        return run_sync(self.__client.auth(username, password, captcha_sid, captcha_key, _captcha_attempt, force))
 
     # -------------------------------------------------------------------------
-    #                         API METHODS (unchanged)
+    #                         API METHODS
     # -------------------------------------------------------------------------
 
-    def call_api(self, endpoint: str, params=None):
-        if params is None:
-            params = {}
+    def call_api(self, endpoint: str, params=None, raw: bool = False, model=None):
+        return run_sync(self.__client.call_api(endpoint, params, raw, model))
 
-        params['v'] = 5.199
-        params['lang'] = 'ru'
-        params['https'] = 1
-        params['device_id'] = self.device_id
-        params['access_token'] = self.access_token
+    def iter_api(self, method: str, params=None, **options):
+        """
+        Элементы offset/count-метода по одному (параметры — как у AsyncVK.iter_pages).
+        Страницы подкачиваются в фоновом loop, пока вызывающий разбирает текущую.
+        """
+        pages = self.__client.iter_pages(method, params, **options)
+        try:
+            while True:
+                page = run_sync(_anext(pages))
+                if page is _END:
+                    return
+                yield from page
+        finally:
+            # Прерванный обход — отменяем уже отправленные запросы
+            run_sync(pages.aclose())
+
+    def listen(self, group_id: int | None = None, **options):
+        """
+        События Long Poll по одному (блокирующий итератор; параметры — как у AsyncVK.longpoll).
+        Соединение держится в фоновом loop; прерванный цикл закрывает его.
+        """
+        events = self.__client.longpoll(group_id, **options).events()
+        try:
+            while True:
+                update = run_sync(_anext(events))
+                if update is _END:
+                    return
+                yield update
+        finally:
+            run_sync(events.aclose())
 
-        if not self.proxy:
-            raise VKExceptions.APIError(VKError({'error_code': -5, 'error_msg': 'proxy is empty'}))
 
-        normalized_proxy = self._normalize_proxy(self.proxy)
+_END = object()
 
-        try:
-            request = self.__session.post(
-                f"https://api.vk.com/method/{endpoint}",
-                data=params,
-                headers={
-                    'cache-control': 'no-cache',
-                    'user-agent': self.user_agent,
-                    'x-vk-android-client': 'new',
-                    'content-type': 'application/x-www-form-urlencoded; charset=utf-8'
-                },
-                proxies={'http': normalized_proxy, 'https': normalized_proxy},
-                timeout=30
-            )
-        except Exception as e:
-            raise VKExceptions.APIError(VKError({'error_code': -1, 'error_msg': str(e)}))
-
-        json_data = request.json()
-
-        if "error" in json_data:
-            raise VKExceptions.APIError(VKError(json_data["error"]))
-
-        return json_data.get("response")
+
+async def _anext(iterator):
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return _END
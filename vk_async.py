@@ -0,0 +1,520 @@
+import time
+import asyncio
+import logging
+import aiohttp
+import contextlib
+import core.helpers as Helpers
+
+from libs.vk.vk_models import *
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_http import HTTPPool, encode_params, normalize_proxy
+from libs.vk.vk_batch import ExecuteBatcher, EXECUTE_MAX_CALLS
+from libs.vk.vk_loop import spawn
+from libs.vk.vk_rate import RateScheduler, THROTTLE_ERROR_CODES
+from libs.vk.vk_token_store import TokenStore, is_token_fresh
+from libs.vk.vk_browser_pool import BrowserPool
+from libs.vk.vk_rucaptcha import RuCaptchaClient
+from libs.vk.vk_captcha import CaptchaSolver
+from libs.vk.vk_proxy_pool import ProxyPool
+from libs.vk.vk_metrics import span, observe
+from libs.vk.vk_paginate import Paginator
+from libs.vk.vk_types import Model, parse
+from libs.vk.vk_cache import ResponseCache
+from libs.vk.vk_hedge import Hedger
+from libs.vk.vk_longpoll import LongPoll
+from libs.vk.vk_prewarm import PrewarmPolicy
+from libs.vk.vk_browser_state import BrowserStateStore
+from libs.vk import vk_json
+from libs.vk.vk_auth_with_solver import _obtain_token_selenium_async, BrowserLogin
+
+__all__ = ['AsyncVK', 'Session', 'VK_OAUTH_TOKEN_URL', 'VK_API_URL']
+
+log = logging.getLogger(__name__)
+
+VK_OAUTH_TOKEN_URL = "https://oauth.vk.com/token"
+VK_API_URL = "https://api.vk.com/method"
+VK_API_VERSION = 5.199
+
+class Session:
+    """Состояние аккаунта (токен, устройство, прокси) на __slots__ — без dict на каждый из тысяч аккаунтов."""
+
+    __slots__ = ('account', 'access_token', 'user_id', 'user_agent', 'device_id', 'proxy')
+
+    def __init__(self, account: str | None = None, access_token: str | None = None, user_id: int | None = None,
+                 user_agent: str | None = None, device_id: str | None = None, proxy: str | None = None):
+        self.account = account
+        self.access_token = access_token
+        self.user_id = user_id
+        self.user_agent = user_agent
+        self.device_id = device_id
+        self.proxy = proxy
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+
+class _SessionAttr:
+    """Атрибут AsyncVK, который хранится в его Session (её может держать AccountRegistry)."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return getattr(obj.session, self.name)
+
+    def __set__(self, obj, value):
+        setattr(obj.session, self.name, value)
+
+
+class AsyncVK:
+    access_token = _SessionAttr()
+    user_id = _SessionAttr()
+    user_agent = _SessionAttr()
+    device_id = _SessionAttr()
+    proxy = _SessionAttr()
+    account = _SessionAttr()
+
+    _pool: HTTPPool | None
+    _batcher: ExecuteBatcher | None
+    _scheduler: RateScheduler | None
+    token_store: TokenStore | None
+
+    def __init__(self, pool: HTTPPool | None = None, batch: bool = False, batch_linger: float = 0.005,
+                 batch_size: int = EXECUTE_MAX_CALLS, scheduler: RateScheduler | bool | None = None,
+                 throttle_retries: int = 3, token_store: TokenStore | None = None,
+                 token_margin: float = 3600, browser_pool: BrowserPool | None = None,
+                 captcha_solver: RuCaptchaClient | CaptchaSolver | None = None, grant_limit: asyncio.Semaphore | None = None,
+                 proxy_pool: ProxyPool | None = None, cache: ResponseCache | bool | None = None,
+                 hedge: Hedger | bool | None = None, prewarm: PrewarmPolicy | bool | None = None,
+                 browser_state: BrowserStateStore | None = None, session: Session | None = None,
+                 token_type: str = "user"):
+        # Состояние аккаунта; общая Session — клиент пишет прямо в запись реестра
+        self.session = session if session is not None else Session()
+        self._pool = pool
+        self._batcher = None
+        self.throttle_retries = throttle_retries
+        self.token_store = token_store
+        self.token_margin = token_margin
+        self.browser_pool = browser_pool
+        self.captcha_solver = captcha_solver
+        # Общий семафор на одновременные password grant'ы (bulk-авторизация)
+        self.grant_limit = grant_limit
+        # Если задан пул — прокси выбирается им (sticky по аккаунту), а не set_proxy
+        self.proxy_pool = proxy_pool
+        # Кэш read-методов: True — общий кэш текущего loop, ResponseCache — свой, None — выключен
+        self._cache = cache
+        # Hedged-запросы read-методов: True — общий Hedger процесса, Hedger — свой, None — выключены
+        self._hedger = Hedger.default() if hedge is True else hedge or None
+        # Спекулятивный прогрев браузера на время password grant'а (по доле капчи аккаунта)
+        self._prewarm = PrewarmPolicy.default() if prewarm is True else prewarm or None
+        # Сессии браузера по аккаунтам: повторный OAuth без логина и капчи
+        self.browser_state = browser_state
+
+        # True — общий планировщик процесса, RateScheduler — свой, None/False — без ограничения скорости.
+        # Лимит токена — по token_type ("user", "group", "service"), если у планировщика не задан token_rate
+        self._scheduler = RateScheduler.default() if scheduler is True else scheduler or None
+        self.token_type = token_type
+
+        if batch:
+            self.enable_batching(batch_linger, batch_size)
+
+    def enable_batching(self, linger: float = 0.005, max_size: int = EXECUTE_MAX_CALLS):
+        """Включает склейку call_api в execute (до 25 вызовов, окно ожидания linger сек)."""
+        self._batcher = ExecuteBatcher(self._send, linger=linger, max_size=max_size)
+        return self
+
+    def disable_batching(self):
+        self._batcher = None
+        return self
+
+    @property
+    def pool(self) -> HTTPPool:
+        return self._pool or HTTPPool.default()
+
+    @property
+    def scheduler(self) -> RateScheduler | None:
+        return self._scheduler
+
+    @property
+    def hedger(self) -> Hedger | None:
+        return self._hedger
+
+    @property
+    def cache(self) -> ResponseCache | None:
+        if self._cache is True:
+            return ResponseCache.default()
+        return self._cache or None
+
+    def set_session(self, auth_data: dict):
+        self.access_token = auth_data.get('access_token')
+        self.user_id = auth_data.get('user_id')
+        self.user_agent = auth_data.get('user_agent')
+        self.device_id = auth_data.get('device_id')
+        self.proxy = auth_data.get('proxy')
+        return self
+
+    def set_proxy(self, proxy):
+        self.proxy = proxy
+
+    def _normalize_proxy(self, proxy):
+        return normalize_proxy(proxy)
+
+    def request_proxy(self):
+        """Прокси для своих запросов мимо call_api (Long Poll): закреплённый в пуле, в формате aiohttp."""
+        return self._normalize_proxy(self._resolve_proxy())
+
+    def _account_key(self) -> str | None:
+        if self.account:
+            return self.account
+        if self.user_id:
+            return str(self.user_id)
+        return self.access_token
+
+    def _resolve_proxy(self):
+        """С пулом прокси — берём закреплённый за аккаунтом (он же переживает failover)."""
+        if self.proxy_pool is not None:
+            key = self._account_key()
+            if key:
+                self.proxy = self.proxy_pool.assign(key) or self.proxy
+        return self.proxy
+
+    def _report_proxy(self, proxy, started: float, error: Exception | None = None):
+        if self.proxy_pool is None:
+            return
+
+        if error is None:
+            self.proxy_pool.report(proxy, time.monotonic() - started, ok=True)
+            return
+
+        # Таймаут или обрыв соединения — вина прокси; переносим аккаунт на другой
+        broken = isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+        self.proxy_pool.report(proxy, None, ok=False, timeout=broken)
+        key = self._account_key()
+        # Упал дубль hedged-запроса через чужой прокси — аккаунт не переносим
+        if broken and key and proxy == self.proxy:
+            self.proxy = self.proxy_pool.failover(key) or self.proxy
+
+    # --------------------------------------------------------------------
+    #                             AUTH
+    # --------------------------------------------------------------------
+
+    async def auth(self, username: str, password: str, captcha_sid=None, captcha_key=None, _captcha_attempt=0,
+                   force: bool = False):
+        """
+        Авторизация через VK Password Grant.
+        Если VK отвечает need_captcha — переключаемся на Playwright-flow.
+        Если задан token_store и в нём есть живой токен — OAuth не выполняется
+        (force=True — игнорировать сохранённый токен).
+        """
+        with span("auth") as auth_span:
+            return await self._auth(username, password, auth_span, force)
+
+    async def _auth(self, username: str, password: str, auth_span, force: bool):
+        self.account = username
+
+        if self.token_store is not None and not force:
+            # SQLite — блокирующий вызов, не на event loop
+            stored = await asyncio.to_thread(self.token_store.get, username)
+            if is_token_fresh(stored, self.token_margin):
+                log.info("[VKAuth] Token loaded from store")
+                auth_span.set(outcome="stored")
+                self.set_session(stored | {"proxy": self.proxy or stored.get("proxy")})
+                return stored
+
+        user_agent = (
+            'VKAndroidApp/8.52-14102 (Android 13; SDK 33; arm64-v8a; Samsung SM-G998B; ru; 2400x1080)'
+        )
+
+        if not self.device_id:
+            # Тот же device_id, под которым сохранена сессия браузера, — для VK это одно устройство
+            if self.browser_state is not None:
+                self.device_id = await asyncio.to_thread(self.browser_state.device_id, username)
+            self.device_id = self.device_id or Helpers.get_random_string(16)
+
+        device_id = self.device_id
+
+        data = {
+            "client_id": 2274003,
+            "client_secret": "hHbZxrka2uZ6jB1inYsH",
+            "https": 1,
+            "libverify_support": 1,
+            "scope": "all",
+            "grant_type": "password",
+            "username": username,
+            "password": password,
+            "2fa_supported": 1,
+            "v": VK_API_VERSION,
+            "lang": "ru",
+            "device_id": device_id,
+            "api_id": 2274003,
+        }
+
+        prewarm = None
+        try:
+            proxy = self._resolve_proxy()
+            normalized_proxy = self._normalize_proxy(proxy)
+            started = time.monotonic()
+
+            try:
+                wait_started = time.perf_counter()
+                async with self.grant_limit or contextlib.nullcontext():
+                    observe("auth.grant_wait", time.perf_counter() - wait_started)
+                    # Браузер готовится, пока grant в полёте: на need_captcha он уже открыт
+                    prewarm = self._start_prewarm(username, password)
+                    with span("auth.password_grant"):
+                        status, body = await self.pool.post(
+                            VK_OAUTH_TOKEN_URL,
+                            proxy=normalized_proxy,
+                            data=encode_params(data),
+                            headers={
+                                "cache-control": "no-cache",
+                                "user-agent": user_agent,
+                                "x-vk-android-client": "new",
+                                "accept-encoding": "gzip",
+                            },
+                            timeout=30,
+                        )
+            except Exception as e:
+                self._report_proxy(proxy, started, e)
+                raise VKExceptions.APIError(
+                    VKError({"error_code": -1, "error_msg": str(e) or type(e).__name__})
+                )
+
+            self._report_proxy(proxy, started)
+
+            try:
+                json_data = vk_json.loads(body)
+            except Exception:
+                log.error("[VKAuth] Invalid JSON: %s", body.decode('utf-8', 'replace')[:500])
+                raise VKExceptions.APIError(
+                    VKError({"error_code": -999, "error_msg": "Invalid JSON"})
+                )
+
+            error = json_data.get("error")
+            if self._prewarm is not None:
+                self._prewarm.record(username, error == "need_captcha", prewarm is not None)
+
+            # --------------------------------------------------------------------
+            #                     SUCCESS
+            # --------------------------------------------------------------------
+            if error is None:
+                auth_data = json_data | {"user_agent": user_agent, "device_id": device_id}
+                self.set_session(auth_data | {"proxy": self.proxy})
+                await self._store_token(username, auth_data)
+                log.info("[VKAuth] SUCCESS")
+                return auth_data
+
+            # --------------------------------------------------------------------
+            #                     CAPTCHA → Fallback to Playwright
+            # --------------------------------------------------------------------
+            if error == "need_captcha":
+                log.info("[VKAuth] VK requires captcha → switching to Playwright OAuth flow")
+                auth_span.set(outcome="captcha")
+
+                prepared, prewarm = prewarm, None
+                token_data = await _obtain_token_selenium_async(
+                    username, password, proxy=self.proxy,
+                    browser_pool=self.browser_pool, captcha_solver=self.captcha_solver, prepared=prepared,
+                    state_store=self.browser_state, device_id=self.device_id
+                )
+
+                if token_data and token_data.get("access_token"):
+                    log.info("[VKAuth] Playwright auth success")
+                    self.set_session(token_data | {"proxy": self.proxy})
+                    await self._store_token(username, token_data)
+                    return token_data
+
+                log.warning("[VKAuth] Playwright returned no token (manual captcha probably needed).")
+                auth_span.set(outcome="no_token")
+                return None  # <-- НЕ кидаем ошибку!
+
+            # --------------------------------------------------------------------
+            #                     OTHER AUTH ERRORS
+            # --------------------------------------------------------------------
+            log.error("[VKAuth] ERROR: %s", json_data)
+            raise VKExceptions.APIError(
+                VKError({
+                    "error_code": json_data.get("error_code", -100),
+                    "error_msg": json_data.get("error_description", error)
+                })
+            )
+        finally:
+            # Не пригодился (или auth прервали) — контекст возвращается в пул в фоне
+            self._release_prewarm(prewarm)
+
+    def _start_prewarm(self, username: str, password: str) -> BrowserLogin | None:
+        if self._prewarm is None or not self._prewarm.should_prewarm(username):
+            return None
+        prewarm = BrowserLogin(username, password, proxy=self.proxy, browser_pool=self.browser_pool,
+                               captcha_solver=self.captcha_solver, state_store=self.browser_state,
+                               device_id=self.device_id)
+        prewarm.prepare()
+        return prewarm
+
+    def _release_prewarm(self, prewarm: BrowserLogin | None):
+        if prewarm is None:
+            return
+        # Непригодившийся прогретый браузер возвращается в фоне
+        spawn(prewarm.close())
+
+    async def _store_token(self, username: str, auth_data: dict):
+        if self.token_store is None:
+            return
+        try:
+            await asyncio.to_thread(self.token_store.put, username, auth_data | {"proxy": self.proxy})
+        except Exception as e:
+            log.warning("[VKAuth] Token store error: %s", e)
+
+    # -------------------------------------------------------------------------
+    #                         API METHODS
+    # -------------------------------------------------------------------------
+
+    async def call_api(self, endpoint: str, params=None, raw: bool = False, model: type[Model] | None = None):
+        """
+        raw=True   — вернуть тело ответа байтами как есть ({"response": ...}), без разбора
+                     (ошибка всё равно поднимается APIError — по конверту);
+        model=User — разобрать response в компактные модели vk_types (list / Page / модель).
+        С cache= read-методы из ResponseCache.ttls берутся из кэша (raw — всегда мимо кэша).
+        """
+        if params is None:
+            params = {}
+
+        with span("api.call", method=endpoint) as call_span:
+            if raw:
+                body = await self._send_raw(endpoint, params)
+                error = vk_json.peek_error(body)
+                if error is not None:
+                    raise VKExceptions.APIError(VKError(error))
+                return body
+
+            cache = self.cache
+            if cache is not None and cache.cacheable(endpoint):
+                key = cache.key(endpoint, params, self.access_token)
+                response, how = await cache.get_or_call(key, lambda: self._call(endpoint, params))
+                call_span.set(cache=how)
+            else:
+                response = await self._call(endpoint, params)
+
+            return parse(response, model) if model is not None else response
+
+    async def _call(self, endpoint: str, params: dict):
+        if self._batcher is not None and self._batcher.batchable(endpoint):
+            return await self._batcher.submit(endpoint, params, self.access_token)
+
+        json_data = await self._send(endpoint, params)
+
+        if "error" in json_data:
+            raise VKExceptions.APIError(VKError(json_data["error"]))
+
+        return json_data.get("response")
+
+    def iter_pages(self, method: str, params=None, page_size: int | None = None, prefetch: int = 1,
+                   pages_per_call: int = 1, max_items: int | None = None, items_key: str = "items"):
+        """
+        Страницы offset/count-метода (friends.get, wall.get, groups.getMembers...)
+        как async-генератор списков; следующие страницы подкачиваются заранее.
+        """
+        return Paginator(
+            self.call_api, self._send, method, params,
+            page_size=page_size, prefetch=prefetch, pages_per_call=pages_per_call,
+            max_items=max_items, items_key=items_key,
+        ).pages()
+
+    async def iter_api(self, method: str, params=None, **options):
+        """Элементы offset/count-метода по одному (параметры — как у iter_pages)."""
+        async for page in self.iter_pages(method, params, **options):
+            for item in page:
+                yield item
+
+    def longpoll(self, group_id: int | None = None, **options) -> LongPoll:
+        """
+        События Long Poll аккаунта (group_id — Bots Long Poll сообщества):
+        async for update in vk.longpoll(): ...  Параметры — как у LongPoll.
+        """
+        return LongPoll(self, group_id, **options)
+
+    async def _send(self, endpoint: str, params: dict, access_token=None) -> dict:
+        """Один HTTP-запрос к API; возвращает JSON целиком (response / error / execute_errors)."""
+        return vk_json.loads(await self._send_raw(endpoint, params, access_token))
+
+    async def _send_raw(self, endpoint: str, params: dict, access_token=None) -> bytes:
+        """То же, что _send, но тело ответа не разбирается (ошибка смотрится по конверту)."""
+        params['v'] = VK_API_VERSION
+        params['lang'] = 'ru'
+        params['https'] = 1
+        params['device_id'] = self.device_id
+        params['access_token'] = access_token or self.access_token
+
+        if not self._resolve_proxy():
+            raise VKExceptions.APIError(VKError({'error_code': -5, 'error_msg': 'proxy is empty'}))
+
+        token = params['access_token']
+
+        hedger = self._hedger if self._hedger is not None and self._hedger.hedgeable(endpoint) else None
+
+        for _ in range(self.throttle_retries + 1):
+            proxy = self.proxy
+            normalized_proxy = self._normalize_proxy(proxy)
+
+            if self._scheduler is not None:
+                await self._scheduler.acquire(token, normalized_proxy, self.token_type)
+
+            if hedger is not None:
+                body = await hedger.run(
+                    endpoint,
+                    lambda: self._post(endpoint, params, proxy),
+                    lambda: self._post_hedge(endpoint, params, proxy, token),
+                )
+            else:
+                body = await self._post(endpoint, params, proxy)
+
+            if self._scheduler is None:
+                return body
+
+            error_code = (vk_json.peek_error(body) or {}).get("error_code")
+            if error_code not in THROTTLE_ERROR_CODES:
+                self._scheduler.on_success(token)
+                return body
+
+            self._scheduler.on_throttled(token, normalized_proxy, self.token_type)
+
+            # Flood control (9) повтором не лечится — отдаём ошибку сразу
+            if error_code != 6:
+                return body
+
+        return body
+
+    async def _post_hedge(self, endpoint: str, params: dict, proxy: str, token: str) -> bytes:
+        """Дубль запроса: через другой прокси пула (без пула — тем же, но новым соединением)."""
+        if self.proxy_pool is not None:
+            proxy = self.proxy_pool.best(exclude=(proxy,)) or proxy
+
+        # Дубль — такой же запрос к VK и расходует лимит токена
+        if self._scheduler is not None:
+            await self._scheduler.acquire(token, self._normalize_proxy(proxy), self.token_type)
+
+        return await self._post(endpoint, params, proxy)
+
+    async def _post(self, endpoint: str, params: dict, proxy: str) -> bytes:
+        started = time.monotonic()
+        try:
+            status, body = await self.pool.post(
+                f"{VK_API_URL}/{endpoint}",
+                proxy=self._normalize_proxy(proxy),
+                data=encode_params(params),
+                headers={
+                    'cache-control': 'no-cache',
+                    'user-agent': self.user_agent or '',
+                    'x-vk-android-client': 'new',
+                    'content-type': 'application/x-www-form-urlencoded; charset=utf-8'
+                },
+                timeout=30
+            )
+        except Exception as e:
+            self._report_proxy(proxy, started, e)
+            raise VKExceptions.APIError(VKError({'error_code': -1, 'error_msg': str(e) or type(e).__name__}))
+
+        self._report_proxy(proxy, started)
+        return body
@@ -1,11 +1,28 @@
+import os
 import time
 import random
 import logging
 import json
 import asyncio
-import requests
+import contextlib
 from urllib.parse import urlparse, parse_qs
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+from libs.vk.vk_loop import run_sync
+from libs.vk.vk_browser_pool import BrowserPool
+from libs.vk.vk_traffic import ResourceBlocker
+from libs.vk.vk_browser_state import BrowserStateStore
+from libs.vk.vk_metrics import span, observe
+try:
+    from libs.vk.vk_local_solver import solve_slider_local
+except ImportError:  # numpy / Pillow не установлены — только RuCaptcha
+    solve_slider_local = None
+from libs.vk.vk_rucaptcha import (
+    RuCaptchaClient,
+    RUCAPTCHA_KEY,
+    RUCAPTCHA_CREATE_TASK_URL,
+    RUCAPTCHA_GET_RESULT_URL,
+)
+from libs.vk.vk_captcha import CaptchaSolver
 
 # -------------------------------
 #  Настройки
@@ -46,12 +63,6 @@ USER_AGENTS = [
     "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Mobile/15E148 Safari/604.1",
 ]
 
-# RuCaptcha
-RUCAPTCHA_KEY = "d4a0f283579c2aecc0d5b47211bf312d"
-RUCAPTCHA_CREATE_TASK_URL = "https://api.rucaptcha.com/createTask"
-RUCAPTCHA_GET_RESULT_URL = "https://api.rucaptcha.com/getTaskResult"
-
-
 # -------------------------------
 #   УТИЛИТЫ
 # -------------------------------
@@ -101,7 +112,7 @@ def parse_proxy(proxy_str: str) -> dict:
 def parse_captcha_notrobot(data: dict) -> dict | None:
     """Парсим данные captchaNotRobot.getContent → status, extension, steps, image"""
     if not data or "response" not in data:
-        print("[VKCaptcha] [!] Некорректный ответ VK captchaNotRobot")
+        log.warning("[VKCaptcha] [!] Некорректный ответ VK captchaNotRobot")
         return None
 
     resp = data["response"]
@@ -119,89 +130,169 @@ def parse_captcha_notrobot(data: dict) -> dict | None:
     return parsed
 
 
+async def solve_captcha_rucaptcha_async(captcha: dict, client: RuCaptchaClient | CaptchaSolver | None = None) -> int | None:
+    """Неблокирующее решение через RuCaptcha (или несколько сервисов — CaptchaSolver)."""
+    return await (client or RuCaptchaClient.default()).solve(captcha)
+
+
 def solve_captcha_rucaptcha(captcha: dict) -> int | None:
-    image_b64 = captcha.get("image")
-    steps = captcha.get("steps") or []
+    """Синхронная обёртка (выполняется в общем фоновом loop)."""
+    return run_sync(solve_captcha_rucaptcha_async(captcha))
 
-    if not image_b64 or not steps:
-        print("[RuCaptcha] ❌ Нет image или steps — не могу отправить задачу.")
-        return None
 
-    try:
-        steps = [int(x) for x in steps]
-    except Exception:
-        print("[RuCaptcha] ❌ steps не приводятся к int:", steps)
-        return None
+# ====================== SLIDER MOVE (Playwright, async) ======================
 
-    payload = {
-        "clientKey": RUCAPTCHA_KEY,
-        "task": {
-            "type": "VKCaptchaImageTask",
-            "image": image_b64,
-            "steps": steps,
+# Один жест: pointerdown → траектория с ease-out и небольшим дрожанием
+# (points точек за duration мс) → проверка положения и до corrections доводок.
+# Отпускание — отдельным скриптом, уже после проверки.
+JS_SLIDER_GESTURE = """
+    async (args) => {
+        const [input, deltaX, duration, points, tolerance, corrections] = args;
+
+        const thumb = input.closest('span[data-type="thumb"]');
+        const rect = thumb.getBoundingClientRect();
+
+        const x0 = rect.left + rect.width / 2;
+        const y0 = rect.top + rect.height / 2;
+
+        function fire(kind, x, y){
+            thumb.dispatchEvent(new PointerEvent('pointer' + kind, {
+                pointerId: 1,
+                pointerType: 'mouse',
+                bubbles: true,
+                cancelable: true,
+                clientX: x,
+                clientY: y,
+                buttons: 1,
+            }));
+            thumb.dispatchEvent(new MouseEvent('mouse' + kind, {
+                bubbles: true,
+                cancelable: true,
+                clientX: x,
+                clientY: y,
+                buttons: 1,
+            }));
         }
-    }
 
-    print("\n[RuCaptcha] → createTask...")
-    try:
-        r = requests.post(RUCAPTCHA_CREATE_TASK_URL, json=payload, timeout=20)
-        resp = r.json()
-    except Exception as e:
-        print("[RuCaptcha] ❌ Ошибка запроса createTask:", e)
-        return None
+        function offset(){
+            const r = thumb.getBoundingClientRect();
+            return r.left + r.width / 2 - x0;
+        }
 
-    # print("[RuCaptcha] Ответ createTask:", json.dumps(resp, indent=2, ensure_ascii=False))
+        const sleep = (ms) => new Promise(r => setTimeout(r, ms));
 
-    if resp.get("errorId") != 0:
-        print("[RuCaptcha] ❌ errorId != 0:", resp)
-        return None
+        fire('down', x0, y0);
 
-    task_id = resp.get("taskId")
-    if not task_id:
-        print("[RuCaptcha] ❌ Нет taskId в ответе")
-        return None
+        for (let i = 1; i <= points; i++) {
+            const t = i / points;
+            const eased = 1 - Math.pow(1 - t, 3);
+            const jitter = i < points ? (Math.random() - 0.5) * 2 : 0;
+            fire('move', x0 + deltaX * eased + jitter, y0 + jitter / 2);
+            if (duration > 0) await sleep(duration / points);
+        }
 
-    print(f"[RuCaptcha] ✔ taskId = {task_id}")
-    print("[RuCaptcha] ⏳ Жду решение...")
+        // Доводка, если ползунок отстал/проскочил (округление к шагу слайдера)
+        let moved = offset();
+        let x = x0 + deltaX;
+        for (let i = 0; i < corrections && Math.abs(moved - deltaX) > tolerance; i++) {
+            x += deltaX - moved;
+            fire('move', x, y0);
+            await sleep(16);
+            moved = offset();
+        }
 
-    best_step = None
-    started = time.time()
-    while True:
-        try:
-            rr = requests.post(
-                RUCAPTCHA_GET_RESULT_URL,
-                json={"clientKey": RUCAPTCHA_KEY, "taskId": task_id},
-                timeout=15
-            )
-            rd = rr.json()
-        except Exception as e:
-            print("[RuCaptcha] ❌ Ошибка getTaskResult:", e)
-            break
+        return moved;
+    }
+"""
+
+JS_SLIDER_STEP = """
+    async (args) => {
+        const [input, deltaX] = args;
+
+        const thumb = input.closest('span[data-type="thumb"]');
+        const rect = thumb.getBoundingClientRect();
+
+        let x = rect.left + rect.width / 2;
+        const y = rect.top + rect.height / 2;
+
+        function firePointer(type, x, y){
+            const ev = new PointerEvent(type, {
+                pointerId: 1,
+                pointerType: 'mouse',
+                bubbles: true,
+                cancelable: true,
+                clientX: x,
+                clientY: y,
+                buttons: 1,
+            });
+            thumb.dispatchEvent(ev);
+        }
 
-        if rd.get("status") == "ready":
-            print("[RuCaptcha] 🎉 Решение готово!")
-            # print(json.dumps(rd, indent=2, ensure_ascii=False))
-            solution = rd.get("solution") or {}
-            best_step = solution.get("best_step")
-            break
+        function fireMouse(type, x, y){
+            const ev = new MouseEvent(type, {
+                bubbles: true,
+                cancelable: true,
+                clientX: x,
+                clientY: y,
+                buttons: 1,
+            });
+            thumb.dispatchEvent(ev);
+        }
 
-        if time.time() - started > 180:
-            print("[RuCaptcha] ❌ Таймаут ожидания решения (>180 сек)")
-            break
+        firePointer('pointerdown', x, y);
+        fireMouse('mousedown', x, y);
 
-        time.sleep(1)
+        x += deltaX;
+        firePointer('pointermove', x, y);
+        fireMouse('mousemove', x, y);
 
-    if best_step is None:
-        print("[RuCaptcha] ❌ best_step не получен")
-    else:
-        print(f"[RuCaptcha] ✔ best_step = {best_step}")
+        return true;
+    }
+"""
+
+JS_SLIDER_UP = """
+    async (args) => {
+        const [input] = args;
+
+        const thumb = input.closest('span[data-type="thumb"]');
+        const rect = thumb.getBoundingClientRect();
+        const x = rect.left + rect.width / 2;
+        const y = rect.top + rect.height / 2;
+
+        const ev = new MouseEvent('mouseup', {
+            bubbles: true,
+            cancelable: true,
+            clientX: x,
+            clientY: y
+        });
+
+        thumb.dispatchEvent(ev);
+        return true;
+    }
+"""
 
-    return best_step
 
+async def move_slider_by_best_step(page, best_step: int, mode: str = "gesture", duration: float = 0.6,
+                                   points: int = 12, step_delay: float = 0.35, corrections: int = 3) -> bool:
+    """
+    Двигает ползунок капчи на best_step шагов.
+
+    mode="gesture" — целевое смещение считается один раз и проходится одним
+    evaluate: points промежуточных точек за duration сек (duration=0 — мгновенно),
+    перед отпусканием проверяется фактическое положение ползунка (и доводится
+    до corrections раз). Не довели — ползунок не отпускается и возвращается
+    False: неверный ответ не отправляется и не тратит попытку капчи.
+    mode="steps"   — старое поведение: отдельное событие на каждый шаг с паузой step_delay.
+    """
+    with span("slider.move", mode=mode) as slider_span:
+        ok = await _move_slider(page, best_step, mode, duration, points, step_delay, corrections)
+        if not ok:
+            slider_span.set(outcome="failed")
+        return ok
 
-# ====================== SLIDER MOVE (Playwright, async) ======================
 
-async def move_slider_by_best_step(page, best_step: int) -> bool:
+async def _move_slider(page, best_step: int, mode: str, duration: float, points: int, step_delay: float,
+                       corrections: int) -> bool:
     try:
         # Ищем iframe капчи
         frame = None
@@ -215,7 +306,7 @@ async def move_slider_by_best_step(page, best_step: int) -> bool:
         # Находим "input" + thumb
         slider_input = base.locator("input.vkc__SliderThumb-module__nativeInput")
         if await slider_input.count() == 0:
-            print("[Slider] ❌ Не найден input.vkc__SliderThumb")
+            log.error("[Slider] ❌ Не найден input.vkc__SliderThumb")
             return False
 
         slider_input = slider_input.first
@@ -226,286 +317,491 @@ async def move_slider_by_best_step(page, best_step: int) -> bool:
         track = thumb.locator("xpath=../..")
         track_box = await track.bounding_box()
         if not track_box:
-            print("[Slider] ❌ track_box = None")
+            log.error("[Slider] ❌ track_box = None")
             return False
 
         track_width = track_box["width"]
         px_per_step = track_width / 100 * 2.04082  # как в Selenium
 
-        print(f"[Slider] px_per_step = {px_per_step:.2f}px, steps = {best_step}")
-
-        # JS код как в SeleniumBase — pointerdown + pointermove
-        js_drag = """
-            async (args) => {
-                const [input, deltaX] = args;
-
-                const thumb = input.closest('span[data-type="thumb"]');
-                const rect = thumb.getBoundingClientRect();
-
-                let x = rect.left + rect.width / 2;
-                const y = rect.top + rect.height / 2;
-
-                function firePointer(type, x, y){
-                    const ev = new PointerEvent(type, {
-                        pointerId: 1,
-                        pointerType: 'mouse',
-                        bubbles: true,
-                        cancelable: true,
-                        clientX: x,
-                        clientY: y,
-                        buttons: 1,
-                    });
-                    thumb.dispatchEvent(ev);
-                }
-
-                function fireMouse(type, x, y){
-                    const ev = new MouseEvent(type, {
-                        bubbles: true,
-                        cancelable: true,
-                        clientX: x,
-                        clientY: y,
-                        buttons: 1,
-                    });
-                    thumb.dispatchEvent(ev);
-                }
-
-                firePointer('pointerdown', x, y);
-                fireMouse('mousedown', x, y);
-
-                let steps = 1;
-                x += deltaX;
-                firePointer('pointermove', x, y);
-                fireMouse('mousemove', x, y);
-
-                return true;
-            }
-        """
-
-        js_up = """
-            async (args) => {
-                const [input] = args;
-
-                const thumb = input.closest('span[data-type="thumb"]');
-                const rect = thumb.getBoundingClientRect();
-                const x = rect.left + rect.width / 2;
-                const y = rect.top + rect.height / 2;
-
-                const ev = new MouseEvent('mouseup', {
-                    bubbles: true,
-                    cancelable: true,
-                    clientX: x,
-                    clientY: y
-                });
-
-                thumb.dispatchEvent(ev);
-                return true;
-            }
-        """
-
-        # Выполняем нужное количество шагов
-        for i in range(best_step):
-            delta = px_per_step
-            await base.evaluate(js_drag, [await slider_input.element_handle(), delta])
-            await asyncio.sleep(0.35)
+        log.debug("[Slider] px_per_step = %.2fpx, steps = %s", px_per_step, best_step)
+
+        # Один handle на всё движение
+        handle = await slider_input.element_handle()
+
+        if mode == "steps":
+            for _ in range(best_step):
+                await base.evaluate(JS_SLIDER_STEP, [handle, px_per_step])
+                await asyncio.sleep(step_delay)
+        else:
+            target = best_step * px_per_step
+            tolerance = max(1.0, px_per_step / 2)
+            moved = await base.evaluate(
+                JS_SLIDER_GESTURE,
+                [handle, target, duration * 1000, max(1, points), tolerance, corrections]
+            )
+            if abs(moved - target) > tolerance:
+                # Отпустить — значит отправить неверный ответ и потратить попытку
+                log.warning("[Slider] ⚠ Смещение %.1fpx, а нужно %.1fpx — не отпускаю", moved, target)
+                return False
+            log.info("[Slider] ✔ Смещение %.1fpx (цель %.1fpx)", moved, target)
 
         # Отпускаем мышь
-        await base.evaluate(js_up, [await slider_input.element_handle()])
-        print("[Slider] 🖱 Ползунок отпущен")
+        await base.evaluate(JS_SLIDER_UP, [handle])
+        log.debug("[Slider] 🖱 Ползунок отпущен")
 
         return True
 
     except Exception as e:
-        print(f"[Slider] ❌ JS move ERROR: {e}")
+        log.error("[Slider] ❌ JS move ERROR: %s", e)
         return False
 
 
 
 
 # ----------------------------------------------------
-#   ВНУТРЕННЯЯ async-РЕАЛИЗАЦИЯ OAUTH + CAPTCHA
+#   LOGIN FLOW: МАШИНА СОСТОЯНИЙ ПО СОБЫТИЯМ СТРАНИЦЫ
 # ----------------------------------------------------
 
-async def _obtain_token_selenium_async(login, password, proxy=None, headless=False):
-    print("[*] Запуск VK OAuth через Playwright (async)…")
+class OAuthLoginFlow:
+    """
+    Логин на странице OAuth без фиксированных sleep'ов.
+
+    На каждом шаге ждём первое из ожидаемых событий:
+      manual   — кнопка "Ввести данные вручную";
+      login    — поле логина;
+      password — поле пароля;
+      captcha  — ответ captchaNotRobot.getContent;
+      redirect — переход на blank.html.
+    Обработанные шаги из ожидания убираются, у каждого состояния свой таймаут.
+    """
+
+    MANUAL_BUTTON = "span.vkuiButton__content"
+    MANUAL_BUTTON_TEXT = "Ввести данные вручную"
+    LOGIN_SELECTOR = "input[name='login'], input[type='text']"
+    PASSWORD_SELECTOR = "input[type='password']"
+
+    # Таймауты ожидания следующего события в каждом состоянии, сек
+    STEP_TIMEOUTS = {
+        "page": 30,
+        "login": 20,
+        "password": 20,
+        "submitted": 30,
+        "captcha_solved": 30,
+        "captcha_manual": 180,
+    }
 
-    # --- Proxy ---
-    proxy_config = None
-    if proxy:
+    # Приоритет, если одновременно сработало несколько событий.
+    # login раньше password: на общей форме видны оба поля, логин вводится первым
+    PRIORITY = ("redirect", "captcha", "login", "password", "manual")
+
+    def __init__(self, page, login: str, password: str, captcha_solver: RuCaptchaClient | CaptchaSolver | None = None,
+                 max_captcha_attempts: int = 2, local_solver: bool = True, local_min_confidence: float = 0.6,
+                 captcha_dump_dir: str | None = None):
+        self.page = page
+        self.login = login
+        self.password = password
+        self.captcha_solver = captcha_solver
+        self.max_captcha_attempts = max_captcha_attempts
+        # Сначала локальный решатель; при низкой уверенности — RuCaptcha
+        self.local_solver = local_solver and solve_slider_local is not None
+        self.local_min_confidence = local_min_confidence
+        # Куда складывать ответы getContent для оффлайн-оценки (vk_local_solver)
+        self.captcha_dump_dir = captcha_dump_dir
+
+        self.state = "page"
+        self.captcha_attempts = 0
+        self.opened = False
+
+        self._captchas: asyncio.Queue = asyncio.Queue()
+        self._redirect: asyncio.Future = asyncio.get_running_loop().create_future()
+        # Чтения тел getContent в полёте — снимаются в close()
+        self._reads: set[asyncio.Task] = set()
+
+    # ---------------- page events ----------------
+
+    def _on_response(self, response):
+        if "captchaNotRobot.getContent" in response.url:
+            task = asyncio.ensure_future(self._read_captcha(response))
+            self._reads.add(task)
+            task.add_done_callback(self._reads.discard)
+
+    async def _read_captcha(self, response):
         try:
-            proxy_config = parse_proxy(proxy)
-            print("[*] Прокси включён:", proxy)
+            data = await response.json()
         except Exception as e:
-            print("[!] Ошибка парсинга proxy, продолжаю без него:", e)
+            log.error("[!] Ошибка чтения captchaNotRobot.getContent: %s", e)
+            return
+        log.info("[*] Пойман ответ captchaNotRobot.getContent!")
+        self._captchas.put_nowait(data)
+
+    def _on_navigated(self, frame):
+        if frame == self.page.main_frame and REDIRECT_URI in (frame.url or "") and not self._redirect.done():
+            self._redirect.set_result(frame.url)
+
+    # ---------------- waiting ----------------
+
+    async def _visible(self, timeout: float, selector: str, has_text: str | None = None):
+        locator = self.page.locator(selector, has_text=has_text) if has_text else self.page.locator(selector)
+        locator = locator.first
+        await locator.wait_for(state="visible", timeout=timeout * 1000)
+        return locator
+
+    def _waiter(self, event: str, timeout: float):
+        if event == "redirect":
+            return asyncio.shield(self._redirect)
+        if event == "captcha":
+            return self._captchas.get()
+        if event == "manual":
+            return self._visible(timeout, self.MANUAL_BUTTON, self.MANUAL_BUTTON_TEXT)
+        if event == "login":
+            return self._visible(timeout, self.LOGIN_SELECTOR)
+        return self._visible(timeout, self.PASSWORD_SELECTOR)
+
+    async def _next_event(self, expected: set[str], timeout: float):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        tasks = {asyncio.ensure_future(self._waiter(event, timeout)): event for event in expected}
+        pending = set(tasks)
+        chosen = None
 
-    ua = random.choice(USER_AGENTS)
-    print("[*] User-Agent:", ua)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, deadline - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+
+                # Упавшие ожидания (таймаут Playwright и т.п.) пропускаем, ждём остальные
+                fired = {tasks[t]: t for t in done if not t.cancelled() and t.exception() is None}
+                for event in self.PRIORITY:
+                    if event in fired:
+                        chosen = fired[event]
+                        return event, chosen.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Капча, вынутая из очереди вместе с более приоритетным событием
+            # (или успевшая до отмены), возвращается — её обработает следующий шаг.
+            # redirect (shield) и видимость элементов при повторном ожидании не теряются.
+            for task, event in tasks.items():
+                if event == "captcha" and task is not chosen and not task.cancelled() and task.exception() is None:
+                    self._captchas.put_nowait(task.result())
+
+        return None, None
+
+    async def close(self):
+        for task in list(self._reads):
+            task.cancel()
+        await asyncio.gather(*self._reads, return_exceptions=True)
+
+    # ---------------- steps ----------------
+
+    async def _solve_captcha(self, captcha_data: dict) -> bool:
+        vk_captcha = parse_captcha_notrobot(captcha_data)
+        if not vk_captcha:
+            return False
 
-    async with async_playwright() as p:
-        launch_args = {"headless": headless}
-        if proxy_config:
-            launch_args["proxy"] = proxy_config
+        best_step = None
+        source = None
 
-        browser = await p.chromium.launch(**launch_args)
-        context = await browser.new_context(
-            user_agent=ua,
-            locale="ru",
-            viewport={"width": 600, "height": 800}
-        )
+        if self.local_solver:
+            with span("captcha.local") as local_span:
+                result = solve_slider_local(vk_captcha)
+                if result is not None and result.confidence >= self.local_min_confidence:
+                    log.info("[LocalSolver] ✔ best_step = %s (confidence %.2f, %.1f мс)",
+                             result.best_step, result.confidence, result.elapsed * 1000)
+                    best_step, source = result.best_step, "local"
+                else:
+                    local_span.set(outcome="rejected")
+                    if result is not None:
+                        log.info("[LocalSolver] Низкая уверенность %.2f → RuCaptcha", result.confidence)
 
-        page = await context.new_page()
+        if best_step is None:
+            best_step = await solve_captcha_rucaptcha_async(vk_captcha, self.captcha_solver)
+            source = "rucaptcha"
 
-        # ======================= Открываем OAuth =======================
-        print("[*] Открываю OAuth:", OAUTH_URL)
-        await page.goto(OAUTH_URL, timeout=60000)
+        self._dump_captcha(captcha_data, best_step, source)
 
-        # === VK popup: "Ввести данные вручную" ===
-        try:
-            await asyncio.sleep(2)
-            btn = page.locator("span.vkuiButton__content", has_text="Ввести данные вручную")
-            await btn.wait_for(timeout=2000)
-            await btn.click()
-            print("[VKUI] Нажал кнопку 'Ввести данные вручную'")
-        except Exception:
-            pass
-
-        # ---- Логин ----
-        try:
-            await asyncio.sleep(3)
-            login_input = page.locator("input[name='login'], input[type='text']")
-            await login_input.fill(login)
-            print("[*] Ввёл логин")
-        except Exception:
-            print("[!] Не нашёл поле логина")
-
-        await asyncio.sleep(2)
-        await page.keyboard.press("Enter")
-
-        # ---- Пароль ----
-        await asyncio.sleep(2)
-        try:
-            pwd_input = page.locator("input[type='password']")
-            await pwd_input.fill(password)
-            print("[*] Ввёл пароль")
-        except Exception:
-            print("[!] Не нашёл поле пароля")
+        if best_step is None:
+            return False
 
-        await asyncio.sleep(2)
-        await page.keyboard.press("Enter")
+        moved = await move_slider_by_best_step(self.page, best_step)
+        if moved:
+            log.info("[*] Слайдер успешно продвинут по best_step.")
+        else:
+            log.warning("[!] Не удалось подвигать слайдер по best_step.")
+        return moved
 
-        # --- Опционально ждём iframe капчи (чисто для логов) ---
-        print("[*] Ожидаю появления iframe капчи (если она есть)…")
+    def _dump_captcha(self, captcha_data: dict, best_step, source):
+        if not self.captcha_dump_dir:
+            return
         try:
-            await page.wait_for_selector(
-                "iframe[src*='captcha'], iframe[src*='is_robot'], iframe[src*='not_robot']",
-                timeout=15000
-            )
-            print("[*] iframe капчи найден")
-            has_iframe = True
-        except PlaywrightTimeoutError:
-            print("[*] iframe капчи не появился — возможно, капчи нет")
-            has_iframe = False
-
-        # === Корутина ожидания captchaNotRobot.getContent ===
-        async def wait_captcha_content():
-            if not has_iframe:
-                print("[*] Пропускаю ожидание captchaNotRobot.getContent (iframe не найден)")
-                return None
-
-            print("[*] Жду вызов captchaNotRobot.getContent")
-            try:
-                resp = await page.wait_for_event(
-                    "response",
-                    timeout=180000,
-                    predicate=lambda r: "captchaNotRobot.getContent" in r.url
-                )
-                print("\n[*] Пойман ответ captchaNotRobot.getContent!")
-                data = await resp.json()
-                # print(json.dumps(data, indent=2, ensure_ascii=False))
-                return data
-            except PlaywrightTimeoutError:
-                print("[!] captchaNotRobot.getContent не был вызван (таймаут wait_for_event)")
-                return None
-            except Exception as e:
-                print("[!] Ошибка при ожидании captchaNotRobot.getContent:", e)
-                return None
+            os.makedirs(self.captcha_dump_dir, exist_ok=True)
+            path = os.path.join(self.captcha_dump_dir, f"{int(time.time() * 1000)}_{random.randrange(1 << 16)}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"payload": captcha_data, "best_step": best_step, "source": source}, f)
+        except Exception as e:
+            log.warning("[!] Не удалось сохранить капчу: %s", e)
+
+    async def open(self):
+        """Загрузка OAuth-страницы (можно заранее, до run)."""
+        if self.opened:
+            return
+        self.page.on("response", self._on_response)
+        self.page.on("framenavigated", self._on_navigated)
+
+        log.info("[*] Открываю OAuth: %s", OAUTH_URL)
+        with span("browser.page_load"):
+            await self.page.goto(OAUTH_URL, timeout=60000, wait_until="domcontentloaded")
+        self.opened = True
+
+    async def run(self) -> str | None:
+        """Проходит логин; возвращает URL redirect'а (или текущий URL при неудаче)."""
+        await self.open()
+
+        expected = {"manual", "login", "password", "captcha", "redirect"}
+
+        while True:
+            timeout = self.STEP_TIMEOUTS[self.state]
+            # Сколько страница шла до события: в submitted — это ожидание getContent,
+            # в captcha_solved — redirect на blank.html
+            with span("browser.wait", state=self.state) as wait_span:
+                event, value = await self._next_event(expected, timeout)
+                wait_span.set(event=event or "timeout", outcome="ok" if event else "timeout")
+
+            if event is None:
+                log.warning("[!] Таймаут шага '%s' (%s сек)", self.state, timeout)
+                break
+
+            if event == "redirect":
+                return value
+
+            if event == "manual":
+                await value.click()
+                log.info("[VKUI] Нажал кнопку 'Ввести данные вручную'")
+                expected.discard("manual")
+                self.state = "login"
+
+            elif event == "login":
+                await value.fill(self.login)
+                log.info("[*] Ввёл логин")
+                # Общая форма с паролем — отправит шаг password, здесь Enter ушёл бы с пустым паролем
+                if not await self.page.locator(self.PASSWORD_SELECTOR).first.is_visible():
+                    await value.press("Enter")
+                expected -= {"manual", "login"}
+                self.state = "password"
+
+            elif event == "password":
+                await value.fill(self.password)
+                log.info("[*] Ввёл пароль")
+                await value.press("Enter")
+                expected -= {"manual", "login", "password"}
+                self.state = "submitted"
+
+            elif event == "captcha":
+                self.captcha_attempts += 1
+                if self.captcha_attempts > self.max_captcha_attempts:
+                    log.warning("[!] Капча не принята после %s попыток", self.max_captcha_attempts)
+                    expected.discard("captcha")
+                    self.state = "captcha_manual"
+                    continue
+
+                solved = await self._solve_captcha(value)
+                # Не решили автоматически — в headful-режиме можно дорешать руками
+                self.state = "captcha_solved" if solved else "captcha_manual"
+
+        return self._redirect.result() if self._redirect.done() else self.page.url
+
+
+# ----------------------------------------------------
+#   ВНУТРЕННЯЯ async-РЕАЛИЗАЦИЯ OAUTH + CAPTCHA
+# ----------------------------------------------------
+
+class BrowserLogin:
+    """
+    Один логин через Playwright в два шага:
+      open()  — слот пула, контекст с прокси аккаунта, загрузка OAuth-страницы;
+      run()   — сам flow (логин, капча) → token_data или None.
+    open() можно начать заранее — пока идёт password grant (см. vk_prewarm);
+    close() возвращает контекст в пул, использован он или нет.
+
+    С state_store контекст открывается с сохранённой сессией аккаунта
+    (и device_id): уже залогиненный аккаунт сразу уходит на blank.html.
+    После логина сессия пересохраняется; отклонённая VK (или без токена) — сразу удаляется.
+    Хранилище (SQLite + Fernet) вызывается в потоке, не на event loop.
+    """
 
-        # === Корутина ожидания redirect ===
-        async def wait_redirect():
-            print("[*] Жду redirect на blank.html…")
+    def __init__(self, login, password, proxy=None, headless=False, browser_pool=None,
+                 captcha_solver: RuCaptchaClient | CaptchaSolver | None = None, block_resources=True,
+                 state_store: BrowserStateStore | None = None, device_id: str | None = None, **flow_options):
+        self.login = login
+        self.password = password
+        self.proxy = proxy
+        self.headless = headless
+        self.browser_pool = browser_pool
+        self.captcha_solver = captcha_solver
+        self.block_resources = block_resources
+        self.state_store = state_store
+        self.device_id = device_id
+        self.flow_options = flow_options
+
+        self.flow: OAuthLoginFlow | None = None
+        self.context = None
+        self.state_loaded = False
+        self.blocker: ResourceBlocker | None = None
+        self._stack = contextlib.AsyncExitStack()
+        self._opening: asyncio.Task | None = None
+        self._context_ready = asyncio.Event()
+
+    def prepare(self):
+        """Начать open() в фоне, не дожидаясь."""
+        if self._opening is None:
+            self._opening = asyncio.ensure_future(self._open())
+
+    async def open(self):
+        # Идемпотентно: спекулятивный прогрев и run() ждут одну и ту же загрузку
+        self.prepare()
+        await asyncio.shield(self._opening)
+
+    async def _open(self):
+        log.info("[*] Запуск VK OAuth через Playwright (async)…")
+
+        pool = self.browser_pool or BrowserPool.default(self.headless)
+
+        # --- Proxy ---
+        proxy_config = None
+        if self.proxy:
             try:
-                await page.wait_for_url("**/blank.html*", timeout=180000)
-                return page.url
-            except PlaywrightTimeoutError:
-                print("[VKAuth] VK не сделал redirect вовремя.")
-                return None
+                proxy_config = parse_proxy(self.proxy)
+                log.info("[*] Прокси включён: %s", self.proxy)
             except Exception as e:
-                print("[VKAuth] Ошибка ожидания redirect:", e)
-                return None
-
-        # Запускаем оба ожидания ПАРАЛЛЕЛЬНО:
-        captcha_task = asyncio.create_task(wait_captcha_content())
-        redirect_task = asyncio.create_task(wait_redirect())
-
-        captcha_data = None
-        final_url = None
-
-        # Ждём, что сработает первым — капча или redirect
-        done, pending = await asyncio.wait(
-            {captcha_task, redirect_task},
-            return_when=asyncio.FIRST_COMPLETED,
-            timeout=180
-        )
-
-        # --- Если первой пришла капча ---
-        if captcha_task in done:
-            captcha_data = await captcha_task
-            if captcha_data:
-                vk_captcha = parse_captcha_notrobot(captcha_data)
-                if vk_captcha:
-                    best_step = solve_captcha_rucaptcha(vk_captcha)
-                    if best_step is not None:
-                        moved = await move_slider_by_best_step(page, best_step)
-                        if moved:
-                            print("[*] Слайдер успешно продвинут по best_step.")
-                        else:
-                            print("[!] Не удалось подвигать слайдер по best_step.")
-
-            # После капчи всё равно нужен redirect
-            if not redirect_task.done():
-                print("[*] После решения капчи жду redirect на blank.html…")
-                final_url = await redirect_task
-            else:
-                final_url = await redirect_task
-
-        # --- Если первым пришёл redirect (капчи не было) ---
-        elif redirect_task in done:
-            final_url = await redirect_task
-            if not captcha_task.done():
-                captcha_task.cancel()
-                try:
-                    await captcha_task
-                except Exception:
-                    pass
-        else:
-            print("[!] Ни капча, ни redirect не произошли за 180 сек.")
-            for t in pending:
-                t.cancel()
-            final_url = page.url
+                log.warning("[!] Ошибка парсинга proxy, продолжаю без него: %s", e)
+
+        ua = random.choice(USER_AGENTS)
+        log.debug("[*] User-Agent: %s", ua)
+
+        context_args = {}
+        storage_state = await self._load_state()
+        if storage_state is not None:
+            context_args["storage_state"] = storage_state
+            self.state_loaded = True
+            log.info("[*] Сохранённая сессия браузера загружена")
+
+        # Ожидание свободного слота пула + запуск Chromium, если браузер новый
+        context_started = time.perf_counter()
+        context = self.context = await self._stack.enter_async_context(pool.context(
+            proxy=proxy_config,
+            user_agent=ua,
+            locale="ru",
+            viewport={"width": 600, "height": 800},
+            **context_args
+        ))
+        self._context_ready.set()
+        observe("browser.context", time.perf_counter() - context_started)
+
+        # Режем картинки/шрифты/трекеры и считаем трафик через прокси
+        if self.block_resources:
+            self.blocker = ResourceBlocker()
+            await self.blocker.attach(context)
+
+        page = await context.new_page()
+
+        self.flow = OAuthLoginFlow(page, self.login, self.password, captcha_solver=self.captcha_solver,
+                                   **self.flow_options)
+        await self.flow.open()
+
+    async def run(self) -> dict | None:
+        await self.open()
+        final_url = await self.flow.run()
+
+        log.info("[*] Final URL: %s", final_url)
 
-        print("[*] Final URL:", final_url)
+        if self.blocker is not None:
+            await self.blocker.flush()
+            stats = self.blocker.stats()
+            log.info("[Traffic] %.1f KB, запросов %s, заблокировано %s",
+                     stats['bytes'] / 1024, stats['requests'], stats['blocked'])
 
         token_data = None
         if final_url and (REDIRECT_URI in final_url) and ("#access_token=" in final_url):
             token_data = parse_fragment(final_url)
-            print("[VKAuth] OAuth SUCCESS!")
+            log.info("[VKAuth] OAuth SUCCESS!")
         else:
-            print("[VKAuth] Токен не найден в URL")
+            log.warning("[VKAuth] Токен не найден в URL")
 
+        await self._update_state(token_data)
+        return token_data
+
+    async def _load_state(self) -> dict | None:
+        if self.state_store is None:
+            return None
         try:
-            await browser.close()
-        except Exception:
-            pass
+            return await asyncio.to_thread(self.state_store.load, self.login, self.device_id)
+        except Exception as e:
+            log.warning("[BrowserState] Ошибка чтения: %s", e)
+            return None
+
+    async def _update_state(self, token_data: dict | None):
+        if self.state_store is None:
+            return
+
+        # Пришлось вводить логин/пароль — VK сохранённую сессию не принял
+        rejected = self.state_loaded and self.flow.state != "page"
+        if rejected:
+            log.info("[BrowserState] Сохранённая сессия отклонена VK, удаляю")
 
+        # Отклонённую удаляем сразу: если сохранить новую не выйдет, старая не должна всплыть снова
+        try:
+            if rejected or (self.state_loaded and not token_data):
+                await asyncio.to_thread(self.state_store.delete, self.login)
+            if token_data:
+                storage_state = await self.context.storage_state()
+                await asyncio.to_thread(self.state_store.save, self.login, storage_state, self.device_id)
+        except Exception as e:
+            log.warning("[BrowserState] Ошибка записи: %s", e)
+
+    async def close(self):
+        opening = self._opening
+        if opening is not None and not opening.done():
+            # Запуск Chromium не прерываем (процесс браузера может остаться висеть) —
+            # ждём выдачи контекста, а загрузку страницы уже обрываем
+            ready = asyncio.ensure_future(self._context_ready.wait())
+            await asyncio.wait({opening, ready}, return_when=asyncio.FIRST_COMPLETED)
+            ready.cancel()
+            opening.cancel()
+            await asyncio.gather(opening, return_exceptions=True)
+        elif opening is not None and not opening.cancelled():
+            # Ошибку спекулятивной загрузки никто не ждал — забираем, чтобы asyncio не ругался
+            opening.exception()
+        if self.flow is not None:
+            await self.flow.close()
+        await self._stack.aclose()
+
+
+async def _obtain_token_selenium_async(login, password, proxy=None, headless=False, browser_pool=None,
+                                       captcha_solver: RuCaptchaClient | CaptchaSolver | None = None, block_resources=True,
+                                       prepared: BrowserLogin | None = None,
+                                       state_store: BrowserStateStore | None = None, device_id: str | None = None,
+                                       **flow_options):
+    """
+    prepared — заранее открытый BrowserLogin (после вызова закрывается здесь);
+    state_store/device_id — сохранённая сессия браузера аккаунта (см. BrowserLogin).
+    """
+    with span("browser.login", prewarmed="yes" if prepared is not None else "no") as login_span:
+        browser_login = prepared or BrowserLogin(login, password, proxy, headless, browser_pool, captcha_solver,
+                                                 block_resources, state_store, device_id, **flow_options)
+        try:
+            token_data = await browser_login.run()
+        finally:
+            await browser_login.close()
+        login_span.set(state="loaded" if browser_login.state_loaded else "none")
+        if token_data is None:
+            login_span.set(outcome="no_token")
         return token_data
 
 
@@ -517,5 +813,6 @@ def obtain_token_selenium(login, password, proxy=None, headless=False):
     """
     Снаружи — обычная синхронная функция с той же сигнатурой,
     внутри — async Playwright + правильный wait_for_event.
+    Выполняется в общем фоновом loop, поэтому браузеры пула переиспользуются.
     """
-    return asyncio.run(_obtain_token_selenium_async(login, password, proxy, headless))
\ No newline at end of file
+    return run_sync(_obtain_token_selenium_async(login, password, proxy, headless))
\ No newline at end of file
@@ -0,0 +1,127 @@
+import re
+import asyncio
+
+from libs.vk.vk_models import *
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_loop import spawn
+from libs.vk import vk_json
+
+__all__ = ['ExecuteBatcher', 'build_execute_code', 'EXECUTE_MAX_CALLS']
+
+# Лимит VK: не более 25 обращений к API внутри одного execute
+EXECUTE_MAX_CALLS = 25
+
+_METHOD_RE = re.compile(r'^[a-zA-Z]+\.[a-zA-Z]+$')
+
+
+def build_execute_code(calls: list[tuple[str, dict]]) -> str:
+    """[(method, params), ...] → VKScript вида `return [API.a.b({...}), ...];`"""
+    parts = []
+    for method, params in calls:
+        args = vk_json.dumps(params)
+        parts.append(f"API.{method}({args})")
+    return "return [" + ",".join(parts) + "];"
+
+
+class ExecuteBatcher:
+    """
+    Склеивает вызовы call_api одного access_token в один execute.
+
+    Первый вызов в пустой очереди заводит таймер на `linger` секунд;
+    очередь сбрасывается по таймеру или сразу при наборе `max_size` вызовов.
+    Результаты и ошибки отдельных вызовов раздаются обратно по future.
+    """
+
+    def __init__(self, send, linger: float = 0.005, max_size: int = EXECUTE_MAX_CALLS):
+        # send(endpoint, params, access_token) -> dict (полный JSON-ответ VK)
+        self._send = send
+        self.linger = linger
+        self.max_size = min(max_size, EXECUTE_MAX_CALLS)
+        self._queues: dict[str, list[tuple[str, dict, asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+
+    @staticmethod
+    def batchable(method: str) -> bool:
+        return method != 'execute' and bool(_METHOD_RE.match(method))
+
+    async def submit(self, method: str, params: dict, access_token: str):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        queue = self._queues.setdefault(access_token, [])
+        queue.append((method, params, future))
+
+        if len(queue) >= self.max_size:
+            self._flush(access_token)
+        elif access_token not in self._timers:
+            self._timers[access_token] = loop.call_later(self.linger, self._flush, access_token)
+
+        return await future
+
+    def _flush(self, access_token: str):
+        timer = self._timers.pop(access_token, None)
+        if timer is not None:
+            timer.cancel()
+
+        calls = self._queues.pop(access_token, None)
+        if calls:
+            spawn(self._run(calls, access_token))
+
+    async def _run(self, calls, access_token: str):
+        # Одиночный вызов нет смысла заворачивать в execute
+        if len(calls) == 1:
+            method, params, future = calls[0]
+            try:
+                json_data = await self._send(method, params, access_token)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                _set_exception(future, e)
+                return
+            if "error" in json_data:
+                _set_exception(future, VKExceptions.APIError(VKError(json_data["error"])))
+            else:
+                _set_result(future, json_data.get("response"))
+            return
+
+        code = build_execute_code([(method, params) for method, params, _ in calls])
+
+        try:
+            json_data = await self._send('execute', {'code': code}, access_token)
+        except asyncio.CancelledError:
+            for _, _, future in calls:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, _, future in calls:
+                _set_exception(future, e)
+            return
+
+        if "error" in json_data:
+            for _, _, future in calls:
+                _set_exception(future, VKExceptions.APIError(VKError(json_data["error"])))
+            return
+
+        results = json_data.get("response") or []
+        errors = list(json_data.get("execute_errors") or [])
+
+        for i, (method, _, future) in enumerate(calls):
+            result = results[i] if i < len(results) else False
+
+            # Неудачный вызов внутри execute возвращает false,
+            # а описание ошибки лежит в execute_errors в том же порядке
+            if result is False and errors:
+                _set_exception(future, VKExceptions.APIError(VKError(errors.pop(0))))
+            else:
+                _set_result(future, result)
+
+
+def _set_result(future: asyncio.Future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+def _set_exception(future: asyncio.Future, exc: Exception):
+    if not future.done():
+        future.set_exception(exc)
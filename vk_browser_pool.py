@@ -0,0 +1,138 @@
+import asyncio
+import weakref
+import logging
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+__all__ = ['BrowserPool']
+
+log = logging.getLogger(__name__)
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+        self.active = 0
+        self.retired = False
+
+    @property
+    def healthy(self) -> bool:
+        return not self.retired and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Долгоживущий пул Chromium для OAuth-flow.
+
+    - size браузеров запускаются лениво и переиспользуются между логинами;
+    - на каждый логин — свой изолированный BrowserContext (свои cookies и прокси);
+    - браузер, отработавший max_uses контекстов или потерявший соединение,
+      выводится из пула и перезапускается;
+    - одновременно открыто не более size * contexts_per_browser контекстов
+      (или max_contexts, если задан).
+    """
+
+    _pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[bool, BrowserPool]]" = \
+        weakref.WeakKeyDictionary()
+
+    def __init__(self, size: int = 2, max_uses: int = 50, contexts_per_browser: int = 4,
+                 headless: bool = False, launch_args: dict | None = None, max_contexts: int | None = None):
+        self.size = size
+        self.max_uses = max_uses
+        self.contexts_per_browser = contexts_per_browser
+        self.headless = headless
+        self.launch_args = launch_args or {}
+
+        self._playwright = None
+        self._browsers: list[_PooledBrowser] = []
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_contexts or size * contexts_per_browser)
+
+    @classmethod
+    def default(cls, headless: bool = False) -> "BrowserPool":
+        """Общий пул для текущего running loop (отдельный для headless / headful)."""
+        loop = asyncio.get_running_loop()
+        pools = cls._pools.setdefault(loop, {})
+        pool = pools.get(headless)
+        if pool is None:
+            pool = pools[headless] = cls(headless=headless)
+        return pool
+
+    async def _launch(self) -> _PooledBrowser:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        browser = await self._playwright.chromium.launch(headless=self.headless, **self.launch_args)
+        log.info("[BrowserPool] Запущен браузер (%s/%s)", len(self._browsers) + 1, self.size)
+        return _PooledBrowser(browser)
+
+    async def _close_browser(self, pooled: _PooledBrowser):
+        if pooled in self._browsers:
+            self._browsers.remove(pooled)
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+    async def _pick(self) -> _PooledBrowser:
+        async with self._lock:
+            # Health check: отвалившиеся браузеры выкидываем сразу
+            for pooled in list(self._browsers):
+                if not pooled.browser.is_connected():
+                    log.warning("[BrowserPool] Браузер потерял соединение — убираю из пула")
+                    self._browsers.remove(pooled)
+
+            candidates = [b for b in self._browsers if b.healthy and b.active < self.contexts_per_browser]
+            idle = [b for b in candidates if b.active == 0]
+
+            if idle:
+                pooled = idle[0]
+            elif candidates and len(self._browsers) >= self.size:
+                pooled = min(candidates, key=lambda b: b.active)
+            else:
+                # Свободных нет, а пул не заполнен (или браузеры ещё доживают max_uses)
+                pooled = await self._launch()
+                self._browsers.append(pooled)
+
+            pooled.uses += 1
+            pooled.active += 1
+            if pooled.uses >= self.max_uses:
+                pooled.retired = True
+            return pooled
+
+    async def _release(self, pooled: _PooledBrowser):
+        pooled.active -= 1
+        if pooled.retired and pooled.active == 0:
+            log.info("[BrowserPool] Браузер отработал %s контекстов — перезапуск", pooled.uses)
+            await self._close_browser(pooled)
+
+    @asynccontextmanager
+    async def context(self, proxy: dict | None = None, **context_args):
+        """
+        Выдаёт новый BrowserContext на одном из браузеров пула.
+        proxy — dict в формате Playwright (см. parse_proxy), задаётся на уровне контекста.
+        """
+        async with self._slots:
+            pooled = await self._pick()
+            context = None
+            try:
+                if proxy:
+                    context_args["proxy"] = proxy
+                context = await pooled.browser.new_context(**context_args)
+                yield context
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                await self._release(pooled)
+
+    async def close(self):
+        async with self._lock:
+            for pooled in list(self._browsers):
+                await self._close_browser(pooled)
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
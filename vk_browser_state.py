@@ -0,0 +1,149 @@
+import os
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlparse
+
+from libs.vk import vk_json
+
+__all__ = ['BrowserStateStore', 'compact_state']
+
+log = logging.getLogger(__name__)
+
+# Для OAuth нужны только cookies/localStorage VK; трекеры и CDN не храним
+VK_DOMAINS = ("vk.com", "vk.ru")
+
+
+def _is_vk_host(host: str | None) -> bool:
+    host = (host or "").lstrip(".").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in VK_DOMAINS)
+
+
+def compact_state(state: dict) -> dict:
+    """storage_state Playwright без чужих доменов и истёкших cookies (сессионные остаются)."""
+    now = time.time()
+    cookies = [
+        cookie for cookie in state.get("cookies") or ()
+        # expires -1 — сессионная cookie
+        if _is_vk_host(cookie.get("domain")) and not 0 < (cookie.get("expires") or -1) <= now
+    ]
+    origins = [
+        origin for origin in state.get("origins") or ()
+        if _is_vk_host(urlparse(origin.get("origin", "")).hostname)
+    ]
+    return {"cookies": cookies, "origins": origins}
+
+
+class BrowserStateStore:
+    """
+    Сохранённая сессия браузера (Playwright storage_state) по аккаунту:
+    с ней OAuth уже залогиненного аккаунта сразу уходит на blank.html,
+    без логина, пароля и капчи.
+
+    Хранится вместе с device_id, под которым была получена, — VK привязывает
+    сессию к устройству. В SQLite (WAL, как SQLiteTokenStore) лежит
+    zlib(JSON) под Fernet: cookies — это доступ к аккаунту.
+    Ключ задаёт вызывающий: key, переменная VK_BROWSER_STATE_KEY или файл
+    key_path (создаётся с правами 0600, если его нет). Рядом с базой ключ
+    сам не создаётся — иначе база и ключ к ней уходят вместе (бэкап, git add).
+    Записи старше max_age удаляются при чтении.
+    """
+
+    def __init__(self, path: str = 'vk_browser_state.sqlite3', key: str | bytes | None = None,
+                 key_path: str | None = None, max_age: float = 30 * 86400):
+        try:
+            from cryptography.fernet import Fernet, InvalidToken
+        except ImportError:
+            raise ImportError("BrowserStateStore требует пакет cryptography (pip install cryptography)") from None
+
+        self.path = path
+        self.max_age = max_age
+        key = key or os.environ.get("VK_BROWSER_STATE_KEY")
+        if not key:
+            if key_path is None:
+                raise ValueError("BrowserStateStore: нужен ключ шифрования — key, VK_BROWSER_STATE_KEY или key_path")
+            key = self._load_key(Fernet, key_path)
+        self._fernet = Fernet(key)
+        self._invalid_token = InvalidToken
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS browser_state ("
+                " username TEXT PRIMARY KEY,"
+                " device_id TEXT,"
+                " data BLOB NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def _load_key(fernet, key_path: str) -> bytes:
+        try:
+            with open(key_path, 'rb') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            pass
+
+        key = fernet.generate_key()
+        try:
+            fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            # Параллельный процесс успел создать ключ первым
+            with open(key_path, 'rb') as f:
+                return f.read().strip()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        log.info("[BrowserState] Создан ключ шифрования %s", key_path)
+        return key
+
+    def device_id(self, username: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT device_id FROM browser_state WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, username: str, device_id: str | None = None) -> dict | None:
+        """storage_state аккаунта; None — нет, устарел, не расшифровался или снят с другого device_id."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT device_id, data, updated_at FROM browser_state WHERE username = ?", (username,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        stored_device_id, data, updated_at = row
+        if device_id and stored_device_id and device_id != stored_device_id:
+            return None
+        if time.time() - updated_at > self.max_age:
+            self.delete(username)
+            return None
+
+        try:
+            return vk_json.loads(zlib.decompress(self._fernet.decrypt(data)))
+        except self._invalid_token:
+            # Скорее всего, процесс с другим ключом — чужую запись не трогаем
+            log.warning("[BrowserState] Сессия %s не расшифровывается (другой ключ?)", username)
+            return None
+        except (zlib.error, ValueError) as e:
+            log.warning("[BrowserState] Повреждённая запись %s: %s", username, e)
+            self.delete(username)
+            return None
+
+    def save(self, username: str, state: dict, device_id: str | None = None):
+        data = self._fernet.encrypt(zlib.compress(vk_json.dumps(compact_state(state)).encode(), 9))
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO browser_state (username, device_id, data, updated_at) VALUES (?, ?, ?, ?)",
+                (username, device_id, data, time.time())
+            )
+
+    def delete(self, username: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM browser_state WHERE username = ?", (username,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,259 @@
+import os
+import csv
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_async import AsyncVK
+from libs.vk.vk_browser_pool import BrowserPool
+from libs.vk.vk_rucaptcha import RuCaptchaClient
+from libs.vk.vk_captcha import CaptchaSolver
+from libs.vk.vk_token_store import SQLiteTokenStore
+from libs.vk.vk_proxy_pool import ProxyPool
+from libs.vk.vk_browser_state import BrowserStateStore
+
+__all__ = ['BulkAuth', 'read_accounts', 'read_done']
+
+log = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------
+#                         ВХОД / ВЫХОД
+# ----------------------------------------------------------------------------
+
+def read_accounts(path: str):
+    """
+    Аккаунты из CSV (login,password,proxy — с заголовком или без) или JSONL
+    ({"login": ..., "password": ..., "proxy": ...}). Читается лениво.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.endswith('.jsonl') or path.endswith('.json'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#'):
+                continue
+            if row[0].strip().lower() in ('login', 'username'):
+                continue
+            login, password, proxy = (row + ['', '', ''])[:3]
+            yield {"login": login.strip(), "password": password.strip(), "proxy": proxy.strip() or None}
+
+
+def read_done(path: str, retry_errors: bool = False) -> set[str]:
+    """Логины, уже записанные в выходной файл (для продолжения после падения)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Недописанная строка после падения
+                continue
+            if retry_errors and record.get("status") != "ok":
+                continue
+            done.add(record.get("login"))
+    return done
+
+
+def _ends_mid_line(path: str) -> bool:
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+# ----------------------------------------------------------------------------
+#                         ОРКЕСТРАТОР
+# ----------------------------------------------------------------------------
+
+class BulkAuth:
+    """
+    Массовая авторизация с раздельными лимитами:
+      grants   — одновременные password grant'ы (oauth.vk.com/token);
+      browsers — одновременные Playwright-контексты (captcha fallback);
+      captchas — одновременные задачи в RuCaptcha (на каждый сервис CaptchaSolver).
+
+    Результаты (токен или ошибка) дописываются в JSONL по мере готовности,
+    повторный запуск с тем же выходным файлом пропускает готовые логины.
+    """
+
+    def __init__(self, grants: int = 50, browsers: int = 4, captchas: int = 20, headless: bool = True,
+                 token_store=None, browser_pool: BrowserPool | None = None,
+                 captcha_solver: RuCaptchaClient | CaptchaSolver | None = None, proxy_pool: ProxyPool | None = None,
+                 browser_state: BrowserStateStore | None = None):
+        self.grants = grants
+        self.browsers = browsers
+        self.captchas = captchas
+        self.headless = headless
+        self.token_store = token_store
+        self.proxy_pool = proxy_pool
+        self.browser_state = browser_state
+
+        self._browser_pool = browser_pool
+        self._captcha_solver = captcha_solver
+        self._grant_limit: asyncio.Semaphore | None = None
+
+        self.stats = {"ok": 0, "no_token": 0, "error": 0, "skipped": 0}
+
+    def _setup(self):
+        self._grant_limit = asyncio.Semaphore(self.grants)
+        if self._browser_pool is None:
+            self._browser_pool = BrowserPool(
+                size=max(1, (self.browsers + 3) // 4),
+                contexts_per_browser=min(self.browsers, 4),
+                max_contexts=self.browsers,
+                headless=self.headless,
+            )
+        if self._captcha_solver is None:
+            self._captcha_solver = RuCaptchaClient(max_pending=self.captchas)
+
+    async def auth_one(self, account: dict) -> dict:
+        login = account.get("login") or account.get("username")
+        started = time.monotonic()
+
+        vk = AsyncVK(
+            token_store=self.token_store,
+            browser_pool=self._browser_pool,
+            captcha_solver=self._captcha_solver,
+            grant_limit=self._grant_limit,
+            browser_state=self.browser_state,
+            # Строки без своего прокси берут его из пула
+            proxy_pool=self.proxy_pool if not account.get("proxy") else None,
+        )
+        vk.set_proxy(account.get("proxy"))
+
+        record = {"login": login}
+        try:
+            auth_data = await vk.auth(login, account.get("password"))
+            if auth_data:
+                record |= {"status": "ok", "auth_data": auth_data | {"proxy": vk.proxy}}
+            else:
+                record |= {"status": "no_token"}
+        except VKExceptions.APIError as e:
+            record |= {"status": "error", "error": e.to_dict()["error"]}
+        except Exception as e:
+            record |= {"status": "error", "error": {"code": -1, "msg": f"{type(e).__name__}: {e}"}}
+
+        record["elapsed"] = round(time.monotonic() - started, 3)
+        return record
+
+    async def run(self, accounts, output_path: str, retry_errors: bool = False) -> dict:
+        self._setup()
+        done = read_done(output_path, retry_errors)
+
+        # Аккаунт держит grant-слот только на время POST, browser-слот — на время flow,
+        # поэтому воркеров столько, чтобы оба лимита могли быть заняты одновременно.
+        workers = self.grants + self.browsers
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+
+        with open(output_path, 'a', encoding='utf-8') as out:
+            if _ends_mid_line(output_path):
+                # Недописанная строка после падения — новые записи с новой строки, а не в её хвост
+                out.write("\n")
+
+            async def worker():
+                while True:
+                    account = await queue.get()
+                    try:
+                        if account is None:
+                            return
+                        record = await self.auth_one(account)
+                        self.stats[record["status"]] += 1
+                        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        out.flush()
+                        log.info("[Bulk] %s: %s (%s сек)", record['login'], record['status'], record['elapsed'])
+                    finally:
+                        queue.task_done()
+
+            tasks = [asyncio.ensure_future(worker()) for _ in range(workers)]
+            try:
+                for account in accounts:
+                    if (account.get("login") or account.get("username")) in done:
+                        self.stats["skipped"] += 1
+                        continue
+                    await queue.put(account)
+                for _ in tasks:
+                    await queue.put(None)
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        log.info("[Bulk] Готово: %s", self.stats)
+        return self.stats
+
+    async def close(self):
+        if self._browser_pool is not None:
+            await self._browser_pool.close()
+
+
+# ----------------------------------------------------------------------------
+#                         CLI
+# ----------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовая авторизация аккаунтов VK")
+    parser.add_argument("accounts", help="CSV (login,password,proxy) или JSONL")
+    parser.add_argument("output", help="JSONL с результатами (дописывается, можно продолжать)")
+    parser.add_argument("--grants", type=int, default=50, help="одновременных password grant'ов")
+    parser.add_argument("--browsers", type=int, default=4, help="одновременных браузерных логинов")
+    parser.add_argument("--captchas", type=int, default=20, help="одновременных задач RuCaptcha")
+    parser.add_argument("--headful", action="store_true", help="показывать окно браузера")
+    parser.add_argument("--retry-errors", action="store_true", help="повторить аккаунты с ошибками")
+    parser.add_argument("--token-store", help="путь к SQLite token store")
+    parser.add_argument("--browser-state", help="путь к SQLite с сессиями браузера (ключ — VK_BROWSER_STATE_KEY "
+                                                "или --browser-state-key)")
+    parser.add_argument("--browser-state-key", help="файл ключа сессий браузера (создаётся, если его нет); "
+                                                    "держите его отдельно от базы")
+    parser.add_argument("--captcha-provider", action="append", default=[], metavar="NAME=KEY[:COST]",
+                        help="сервис капчи (rucaptcha, 2captcha или base_url); можно несколько")
+    parser.add_argument("--captcha-race", action="store_true", help="задача сразу двум лучшим сервисам")
+    parser.add_argument("--captcha-max-cost", type=float, default=None, help="лимит цены задач на одну капчу")
+    args = parser.parse_args(argv)
+
+    captcha_solver = None
+    if args.captcha_provider:
+        keys, costs = {}, {}
+        for spec in args.captcha_provider:
+            name, _, key = spec.partition("=")
+            key, _, cost = key.partition(":")
+            keys[name] = key
+            if cost:
+                costs[name] = float(cost)
+        captcha_solver = CaptchaSolver.from_keys(keys, costs, client_options={"max_pending": args.captchas},
+                                                 race=args.captcha_race, max_cost=args.captcha_max_cost)
+
+    async def run():
+        bulk = BulkAuth(
+            grants=args.grants,
+            browsers=args.browsers,
+            captchas=args.captchas,
+            headless=not args.headful,
+            token_store=SQLiteTokenStore(args.token_store) if args.token_store else None,
+            browser_state=(BrowserStateStore(args.browser_state, key_path=args.browser_state_key)
+                           if args.browser_state else None),
+            captcha_solver=captcha_solver,
+        )
+        try:
+            return await bulk.run(read_accounts(args.accounts), args.output, args.retry_errors)
+        finally:
+            await bulk.close()
+
+    stats = asyncio.run(run())
+    return 0 if stats["error"] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
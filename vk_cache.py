@@ -0,0 +1,165 @@
+import time
+import asyncio
+import weakref
+from collections import OrderedDict
+
+__all__ = ['ResponseCache', 'DEFAULT_TTLS', 'SHARED_METHODS']
+
+# TTL по умолчанию (сек) для идемпотентных read-методов; остальные не кэшируются
+DEFAULT_TTLS = {
+    "users.get": 300,
+    "groups.getById": 600,
+    "utils.resolveScreenName": 3600,
+    "database.getCountries": 86400,
+    "database.getCities": 86400,
+    "database.getCitiesById": 86400,
+}
+
+# Ответ не зависит от того, чей токен: ключ без access_token, кэш общий для всех аккаунтов.
+# users.get / groups.getById сюда не входят — can_access_closed, is_member и т.п. зависят от смотрящего.
+SHARED_METHODS = frozenset({
+    "utils.resolveScreenName",
+    "database.getCountries",
+    "database.getCities",
+    "database.getCitiesById",
+})
+
+# Служебные параметры запроса — на ответ не влияют
+_IGNORED_PARAMS = frozenset({"v", "lang", "https", "device_id", "access_token"})
+
+
+class ResponseCache:
+    """
+    TTL + LRU кэш ответов call_api.
+
+    Ключ — метод + нормализованные параметры (+ токен, если метод не в shared).
+    Одновременные одинаковые запросы склеиваются: HTTP уходит один,
+    остальные ждут его future. Ошибки не кэшируются.
+    Отдаётся один и тот же объект ответа — менять его на месте нельзя.
+    Кэш привязан к event loop (из-за future склейки).
+    """
+
+    _defaults: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ResponseCache]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, ttls: dict[str, float] | None = None, max_size: int = 10000,
+                 shared_methods=SHARED_METHODS):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_size = max_size
+        self.shared_methods = frozenset(shared_methods)
+
+        self._entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expired = 0
+
+    @classmethod
+    def default(cls) -> "ResponseCache":
+        loop = asyncio.get_running_loop()
+        cache = cls._defaults.get(loop)
+        if cache is None:
+            cache = cls._defaults[loop] = cls()
+        return cache
+
+    def cacheable(self, method: str) -> bool:
+        return self.ttls.get(method, 0) > 0
+
+    def key(self, method: str, params: dict, access_token: str | None) -> tuple:
+        normalized = tuple(sorted(
+            (k, str(v)) for k, v in params.items() if v is not None and k not in _IGNORED_PARAMS
+        ))
+        scope = None if method in self.shared_methods else access_token
+        return method, normalized, scope
+
+    # ---------------- чтение / запись ----------------
+
+    def get(self, key: tuple):
+        """(True, value) при свежей записи, иначе (False, None)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            self.expired += 1
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: tuple, value):
+        ttl = self.ttls.get(key[0], 0)
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_call(self, key: tuple, call) -> tuple[object, str]:
+        """Ответ из кэша или из call() (с склейкой одновременных). Возвращает (value, hit|coalesced|miss)."""
+        while True:
+            found, value = self.get(key)
+            if found:
+                self.hits += 1
+                return value, "hit"
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+
+            try:
+                value = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Отменили не нас, а ведущий запрос — пробуем заново
+                if inflight.cancelled():
+                    continue
+                raise
+            self.coalesced += 1
+            return value, "coalesced"
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Никто не ждёт — не даём asyncio ругаться на необработанное исключение
+            future.exception()
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value, "miss"
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, method: str | None = None):
+        if method is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == method]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,213 @@
+import time
+import random
+import asyncio
+import logging
+
+from libs.vk.vk_rucaptcha import RuCaptchaClient, RUCAPTCHA_URL
+from libs.vk.vk_metrics import span
+try:
+    from libs.vk.vk_local_solver import solve_slider_local
+except ImportError:  # numpy / Pillow не установлены — только сервисы
+    solve_slider_local = None
+
+__all__ = ['CaptchaProvider', 'CaptchaSolver', 'CAPTCHA_SERVICES']
+
+log = logging.getLogger(__name__)
+
+# Сервисы с тем же протоколом createTask / getTaskResult и задачей VKCaptchaImageTask
+CAPTCHA_SERVICES = {
+    "rucaptcha": RUCAPTCHA_URL,
+    "2captcha": "https://api.2captcha.com",
+}
+
+
+class CaptchaProvider:
+    """
+    Один сервис решения (RuCaptchaClient со своими base_url и key) и его статистика:
+    EWMA времени решения и доли успехов. cost — цена задачи в любых единицах,
+    одинаковых у всех провайдеров.
+    """
+
+    def __init__(self, client: RuCaptchaClient, name: str | None = None, cost: float = 0.0,
+                 prior_latency: float = 20.0, alpha: float = 0.2):
+        self.client = client
+        self.name = name or client.base_url
+        self.cost = cost
+        self.alpha = alpha
+
+        self.latency = prior_latency
+        self.success = 1.0
+
+        self.submitted = 0
+        self.solved = 0
+        self.failed = 0
+        self.lost = 0
+
+    def expected_time(self) -> float:
+        """Ожидаемое время до решения: неудача — это ещё одна задача где-то ещё."""
+        return self.latency / max(self.success, 0.05)
+
+    def record(self, elapsed: float, solved: bool | None):
+        """solved=None — задачу сняли (проиграла гонку): известно лишь, что решение дольше elapsed."""
+        if solved is None:
+            self.lost += 1
+            if elapsed > self.latency:
+                self.latency += self.alpha * (elapsed - self.latency)
+            return
+
+        if solved:
+            self.solved += 1
+            self.latency += self.alpha * (elapsed - self.latency)
+        else:
+            self.failed += 1
+        self.success += self.alpha * ((1.0 if solved else 0.0) - self.success)
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "solved": self.solved,
+            "failed": self.failed,
+            "lost": self.lost,
+            "latency": round(self.latency, 2),
+            "success": round(self.success, 3),
+        }
+
+
+class CaptchaSolver:
+    """
+    Решение слайдер-капчи VK через несколько сервисов. Интерфейс тот же,
+    что у RuCaptchaClient (solve(captcha) → best_step), так что передаётся
+    как captcha_solver в AsyncVK / BrowserLogin / BulkAuth.
+
+    Провайдеры упорядочены по ожидаемому времени решения (ещё не пробованные —
+    первыми, и с вероятностью explore первым идёт случайный, чтобы оценки
+    остальных не застывали). Без race задача
+    уходит лучшему, при неудаче — следующему. С race=True — сразу race_width
+    лучшим, берётся первый best_step, остальные задачи снимаются (сервис их
+    уже принял — они оплачены). max_cost ограничивает суммарную цену задач
+    на одну капчу; первая задача уходит всегда.
+
+    local_min_confidence — сначала локальный решатель (если установлены
+    numpy / Pillow); браузерный flow делает это сам, там он не нужен.
+    """
+
+    def __init__(self, providers, race: bool = False, race_width: int = 2, max_cost: float | None = None,
+                 explore: float = 0.05, local_min_confidence: float | None = None):
+        self.providers = [
+            provider if isinstance(provider, CaptchaProvider) else CaptchaProvider(provider)
+            for provider in providers
+        ]
+        if not self.providers:
+            raise ValueError("CaptchaSolver: нужен хотя бы один провайдер")
+        self.race = race
+        self.race_width = max(1, race_width)
+        self.max_cost = max_cost
+        self.explore = explore
+        self.local = local_min_confidence is not None and solve_slider_local is not None
+        self.local_min_confidence = local_min_confidence
+
+        self.spent = 0.0
+        self.local_solved = 0
+
+    @classmethod
+    def from_keys(cls, keys: dict[str, str], costs: dict[str, float] | None = None,
+                  client_options: dict | None = None, **options) -> "CaptchaSolver":
+        """keys — {имя из CAPTCHA_SERVICES или base_url: ключ API}."""
+        providers = [
+            CaptchaProvider(
+                RuCaptchaClient(key=key, base_url=CAPTCHA_SERVICES.get(name, name), **(client_options or {})),
+                name=name,
+                cost=(costs or {}).get(name, 0.0),
+            )
+            for name, key in keys.items()
+        ]
+        return cls(providers, **options)
+
+    def ranked(self) -> list[CaptchaProvider]:
+        ranked = sorted(self.providers, key=lambda p: (p.solved + p.failed > 0, p.expected_time()))
+        if len(ranked) > 1 and random.random() < self.explore:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    async def solve(self, captcha: dict) -> int | None:
+        """VK slider captcha (parse_captcha_notrobot) → best_step."""
+        if self.local:
+            result = solve_slider_local(captcha)
+            if result is not None and result.confidence >= self.local_min_confidence:
+                self.local_solved += 1
+                log.info("[Captcha] ✔ local best_step = %s (confidence %.2f)", result.best_step, result.confidence)
+                return result.best_step
+
+        with span("captcha.solve", mode="race" if self.race else "single") as solve_span:
+            width = self.race_width if self.race else 1
+            remaining = self.ranked()
+            spent = 0.0
+
+            while remaining:
+                batch = []
+                for provider in remaining:
+                    if len(batch) == width:
+                        break
+                    # Гонка и повторы — в пределах max_cost, первая задача — всегда
+                    if self.max_cost is not None and (batch or spent) and spent + provider.cost > self.max_cost:
+                        continue
+                    batch.append(provider)
+                    spent += provider.cost
+                if not batch:
+                    log.warning("[Captcha] Лимит цены %.3f исчерпан", self.max_cost)
+                    break
+
+                remaining = [provider for provider in remaining if provider not in batch]
+                best_step = await self._race(captcha, batch)
+                if best_step is not None:
+                    return best_step
+
+            solve_span.set(outcome="failed")
+            return None
+
+    async def _race(self, captcha: dict, providers: list[CaptchaProvider]) -> int | None:
+        started = time.monotonic()
+        tasks = {}
+        for provider in providers:
+            provider.submitted += 1
+            self.spent += provider.cost
+            tasks[asyncio.ensure_future(provider.client.solve(captcha))] = provider
+
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                elapsed = time.monotonic() - started
+                # Сначала учитываем все завершившиеся (и забираем их исключения), потом — победителя
+                winner = None
+                for task in done:
+                    provider = tasks[task]
+                    best_step = None
+                    if task.cancelled():
+                        pass
+                    elif task.exception() is not None:
+                        log.error("[Captcha] ❌ %s: %s", provider.name, task.exception())
+                    else:
+                        best_step = task.result()
+                    provider.record(elapsed, best_step is not None)
+                    if best_step is not None and winner is None:
+                        winner = provider, best_step
+
+                if winner is not None:
+                    provider, best_step = winner
+                    for other in pending:
+                        tasks[other].record(elapsed, None)
+                    if len(providers) > 1:
+                        log.info("[Captcha] ✔ %s первым (%.1f сек)", provider.name, elapsed)
+                    return best_step
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "spent": round(self.spent, 4),
+            "local": self.local_solved,
+            "providers": {provider.name: provider.stats() for provider in self.providers},
+        }
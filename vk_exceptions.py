@@ -0,0 +1,21 @@
+from libs.vk.vk_models import *
+
+__all__ = ['VKExceptions']
+
+
+class VKExceptions:
+    class APIError(Exception):
+        code: int
+        msg: str
+
+        def __init__(self, error: VKError):
+            self.code = error.code
+            self.msg = error.msg
+
+        def to_dict(self):
+            return {
+                "error": {
+                    "code": self.code,
+                    "msg": self.msg
+                }
+            }
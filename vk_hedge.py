@@ -0,0 +1,153 @@
+import time
+import asyncio
+from collections import deque
+
+__all__ = ['Hedger', 'HEDGE_METHODS']
+
+# Идемпотентные read-методы: повтор запроса ничего не меняет на стороне VK
+HEDGE_METHODS = frozenset({
+    "users.get",
+    "users.getFollowers",
+    "groups.getById",
+    "groups.get",
+    "groups.getMembers",
+    "friends.get",
+    "wall.get",
+    "wall.getById",
+    "photos.get",
+    "utils.resolveScreenName",
+    "utils.getServerTime",
+    "database.getCountries",
+    "database.getCities",
+    "database.getCitiesById",
+})
+
+
+class Hedger:
+    """
+    Hedged-запросы для read-методов: если ответа нет дольше delay(method)
+    (percentile латентности метода, в пределах min_delay..max_delay),
+    тот же запрос уходит ещё раз — через другой прокси пула или другое
+    соединение. Берётся первый успешный ответ, второй запрос отменяется.
+
+    Бюджет: каждый запрос добавляет budget «кредита» (не больше burst),
+    дубль тратит 1 — дублей не больше ~budget от общего числа запросов.
+    """
+
+    _default: "Hedger | None" = None
+
+    def __init__(self, methods=HEDGE_METHODS, percentile: float = 95, min_delay: float = 0.05,
+                 max_delay: float = 5.0, initial_delay: float = 1.0, min_samples: int = 20, window: int = 500,
+                 budget: float = 0.05, burst: float = 10):
+        self.methods = frozenset(methods)
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.budget = budget
+        self.burst = burst
+
+        self._latencies: dict[str, deque] = {}
+        self._delays: dict[str, float] = {}
+        self._observed: dict[str, int] = {}
+        self._credit = burst
+
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.denied = 0
+
+    @classmethod
+    def default(cls) -> "Hedger":
+        """Общий на процесс: латентности методов одинаковы для всех AsyncVK."""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def hedgeable(self, method: str) -> bool:
+        return method in self.methods
+
+    # ---------------- задержка ----------------
+
+    def delay(self, method: str) -> float:
+        return self._delays.get(method, self.initial_delay)
+
+    def _observe(self, method: str, latency: float):
+        samples = self._latencies.get(method)
+        if samples is None:
+            samples = self._latencies[method] = deque(maxlen=self.window)
+        samples.append(latency)
+        observed = self._observed[method] = self._observed.get(method, 0) + 1
+
+        # Перцентиль пересчитывается раз в несколько ответов, а не на каждый
+        if observed == self.min_samples or observed > self.min_samples and observed % 16 == 0:
+            ordered = sorted(samples)
+            value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+            self._delays[method] = min(self.max_delay, max(self.min_delay, value))
+
+    # ---------------- запрос ----------------
+
+    async def run(self, method: str, primary, backup):
+        """primary() / backup() — фабрики корутин одного и того же запроса."""
+        self.requests += 1
+        self._credit = min(self.burst, self._credit + self.budget)
+
+        started = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.delay(method))
+            if done:
+                result = first.result()
+                self._observe(method, time.monotonic() - started)
+                return result
+
+            if self._credit < 1:
+                self.denied += 1
+                result = await first
+                self._observe(method, time.monotonic() - started)
+                return result
+
+            self._credit -= 1
+            self.hedged += 1
+            hedge_started = time.monotonic()
+            second = asyncio.ensure_future(backup())
+            pending.add(second)
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Если оба ответили в одной итерации — предпочитаем исходный
+                for task in sorted(done, key=lambda t: t is not first):
+                    if task.cancelled():
+                        continue
+                    task_error = task.exception()
+                    if task_error is not None:
+                        if task is first or error is None:
+                            error = task_error
+                        continue
+
+                    if task is second:
+                        self.wins += 1
+                        self._observe(method, time.monotonic() - hedge_started)
+                    else:
+                        self._observe(method, time.monotonic() - started)
+                    return task.result()
+
+            raise error or asyncio.CancelledError()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "wins": self.wins,
+            "denied": self.denied,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else None,
+            "win_rate": round(self.wins / self.hedged, 3) if self.hedged else None,
+            "delays": {method: round(delay, 4) for method, delay in sorted(self._delays.items())},
+        }
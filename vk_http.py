@@ -0,0 +1,86 @@
+import asyncio
+import weakref
+import aiohttp
+
+__all__ = ['HTTPPool', 'encode_params', 'normalize_proxy']
+
+
+def normalize_proxy(proxy):
+    """https://-прокси на деле HTTP CONNECT-прокси — ходим к нему по http://."""
+    if proxy and proxy.startswith('https://'):
+        return proxy.replace('https://', 'http://', 1)
+    return proxy
+
+
+def encode_params(params: dict) -> dict:
+    """Как requests: None-значения выкидываем, остальное приводим к str."""
+    return {k: str(v) for k, v in params.items() if v is not None}
+
+
+class HTTPPool:
+    """
+    Пул aiohttp-сессий: на каждый прокси — своя сессия со своим
+    keep-alive пулом соединений. Пул привязан к event loop, в котором создан.
+    """
+
+    _pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HTTPPool]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, limit_per_proxy: int = 100, keepalive_timeout: float = 30.0):
+        self.limit_per_proxy = limit_per_proxy
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions: dict[str | None, aiohttp.ClientSession] = {}
+
+    @classmethod
+    def default(cls) -> "HTTPPool":
+        """Пул по умолчанию для текущего running loop."""
+        loop = asyncio.get_running_loop()
+        pool = cls._pools.get(loop)
+        if pool is None:
+            pool = cls._pools[loop] = cls()
+        return pool
+
+    def session(self, proxy: str | None) -> aiohttp.ClientSession:
+        session = self._sessions.get(proxy)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit_per_proxy,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[proxy] = session
+        return session
+
+    async def post(self, url: str, proxy: str | None = None, data=None, json=None,
+                   headers=None, timeout: float = 30) -> tuple[int, bytes]:
+        session = self.session(proxy)
+        async with session.post(
+            url,
+            data=data,
+            json=json,
+            headers=headers,
+            proxy=proxy,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            return response.status, await response.read()
+
+    async def get(self, url: str, proxy: str | None = None, params=None, headers=None,
+                  timeout: float = 30) -> tuple[int, bytes]:
+        session = self.session(proxy)
+        async with session.get(
+            url,
+            params=encode_params(params or {}),
+            headers=headers,
+            proxy=proxy,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            return response.status, await response.read()
+
+    async def close(self):
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception:
+                pass
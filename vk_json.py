@@ -0,0 +1,73 @@
+import json
+
+__all__ = ['loads', 'dumps', 'set_backend', 'backend', 'peek_error']
+
+# ----------------------------------------------------------------------------
+#   JSON-бэкенд: orjson, если установлен, иначе stdlib json.
+#   dumps всегда компактный и без \u-экранирования (как ждёт VKScript).
+# ----------------------------------------------------------------------------
+
+_BACKENDS = {}
+
+
+def _stdlib():
+    def dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    return json.loads, dumps
+
+
+def _orjson():
+    import orjson
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+    return orjson.loads, dumps
+
+
+_BACKENDS["json"] = _stdlib
+_BACKENDS["orjson"] = _orjson
+
+loads = None
+dumps = None
+backend = None
+
+
+def set_backend(name: str | None = None) -> str:
+    """
+    Переключает JSON-бэкенд модуля ("orjson" / "json"; None — лучший доступный).
+    Модули клиента вызывают vk_json.loads/dumps через атрибут модуля,
+    поэтому переключение действует сразу везде.
+    """
+    global loads, dumps, backend
+
+    names = [name] if name else ["orjson", "json"]
+    for candidate in names:
+        try:
+            loads, dumps = _BACKENDS[candidate]()
+        except ImportError:
+            if name:
+                raise
+            continue
+        backend = candidate
+        return backend
+
+    raise ValueError(f"Неизвестный JSON-бэкенд: {name}")
+
+
+set_backend()
+
+
+def peek_error(body: bytes) -> dict | None:
+    """
+    Ошибка VK из конверта без разбора всего ответа.
+    Успешный ответ VK начинается с {"response": — его не трогаем;
+    {"error": ...} короткий и разбирается целиком. Нестандартное начало
+    (пробелы, другой порядок ключей) — полный разбор как запасной путь.
+    """
+    head = body[:16].lstrip()
+    if head.startswith(b'{"response"'):
+        return None
+    if head.startswith(b'{"error"'):
+        return loads(body).get("error")
+    data = loads(body)
+    return data.get("error") if isinstance(data, dict) else None
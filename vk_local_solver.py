@@ -0,0 +1,231 @@
+import io
+import os
+import sys
+import json
+import math
+import time
+import base64
+import argparse
+import logging
+
+import numpy as np
+from PIL import Image
+
+__all__ = ['LocalSolveResult', 'solve_slider_local', 'layouts_from_steps', 'evaluate_payloads']
+
+log = logging.getLogger(__name__)
+
+
+class LocalSolveResult:
+    __slots__ = ('best_step', 'confidence', 'elapsed', 'scores')
+
+    def __init__(self, best_step: int, confidence: float, elapsed: float, scores: np.ndarray):
+        self.best_step = best_step
+        self.confidence = confidence
+        self.elapsed = elapsed
+        self.scores = scores
+
+    def __repr__(self):
+        return f"LocalSolveResult(best_step={self.best_step}, confidence={self.confidence:.3f}, " \
+               f"elapsed={self.elapsed * 1000:.1f}ms)"
+
+
+# ----------------------------------------------------------------------------
+#                         МОДЕЛЬ КАПЧИ
+# ----------------------------------------------------------------------------
+#
+# Картинка captchaNotRobot — сетка grid x grid перемешанных плиток.
+# steps — плоский список индексов плиток, попарно: (a0, b0, a1, b1, ...).
+# Положение слайдера k = применены первые k перестановок пар.
+# Правильное k — то, при котором картинка непрерывна на стыках плиток.
+
+def layouts_from_steps(steps: list[int], tiles: int) -> np.ndarray:
+    """(K+1, tiles): для каждого положения слайдера — какая плитка в какой позиции."""
+    pairs = len(steps) // 2
+    layouts = np.empty((pairs + 1, tiles), dtype=np.int32)
+    layout = np.arange(tiles, dtype=np.int32)
+    layouts[0] = layout
+
+    for k in range(pairs):
+        a, b = steps[2 * k], steps[2 * k + 1]
+        layout[a], layout[b] = layout[b], layout[a]
+        layouts[k + 1] = layout
+
+    return layouts
+
+
+def _decode(image_b64: str) -> np.ndarray:
+    if "," in image_b64[:64]:
+        # data:image/...;base64,
+        image_b64 = image_b64.split(",", 1)[1]
+    raw = base64.b64decode(image_b64)
+    return np.asarray(Image.open(io.BytesIO(raw)).convert("RGB"), dtype=np.float32)
+
+
+def _edge_costs(img: np.ndarray, grid: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Матрицы стоимости стыков (tiles x tiles):
+      horiz[i, j] — правый край плитки i против левого края j;
+      vert[i, j]  — нижний край i против верхнего края j.
+    Стоимость — средний модуль разности пикселей вдоль стыка.
+    """
+    th, tw = img.shape[0] // grid, img.shape[1] // grid
+    img = img[:th * grid, :tw * grid]
+
+    # (grid, th, grid, tw, 3) → (tiles, th, tw, 3)
+    tiles = img.reshape(grid, th, grid, tw, 3).transpose(0, 2, 1, 3, 4).reshape(grid * grid, th, tw, 3)
+
+    right, left = tiles[:, :, -1], tiles[:, :, 0]
+    bottom, top = tiles[:, -1], tiles[:, 0]
+
+    horiz = np.abs(right[:, None] - left[None, :]).mean(axis=(2, 3))
+    vert = np.abs(bottom[:, None] - top[None, :]).mean(axis=(2, 3))
+    return horiz, vert
+
+
+def _neighbours(grid: int):
+    pos = np.arange(grid * grid).reshape(grid, grid)
+    return (pos[:, :-1].ravel(), pos[:, 1:].ravel()), (pos[:-1, :].ravel(), pos[1:, :].ravel())
+
+
+def solve_slider_local(captcha: dict, grid: int | None = None) -> LocalSolveResult | None:
+    """
+    Локальное решение слайдер-капчи VK (данные из parse_captcha_notrobot).
+    Перебирает все положения слайдера и выбирает самое «гладкое» по стыкам плиток.
+    confidence ∈ [0, 1] — насколько лучший вариант отрывается от остальных.
+    """
+    started = time.perf_counter()
+
+    image_b64 = captcha.get("image")
+    try:
+        steps = [int(x) for x in captcha.get("steps") or []]
+    except (TypeError, ValueError):
+        return None
+    if not image_b64 or len(steps) < 2:
+        return None
+
+    tiles = max(steps) + 1
+    if grid is None:
+        grid = math.isqrt(tiles)
+        if grid * grid < tiles:
+            grid += 1
+    tiles = grid * grid
+
+    try:
+        img = _decode(image_b64)
+    except Exception as e:
+        log.warning("[LocalSolver] ❌ Не удалось декодировать картинку: %s", e)
+        return None
+
+    horiz, vert = _edge_costs(img, grid)
+    layouts = layouts_from_steps(steps, tiles)
+    (ha, hb), (va, vb) = _neighbours(grid)
+
+    # Векторно для всех положений слайдера сразу
+    scores = horiz[layouts[:, ha], layouts[:, hb]].sum(axis=1) + vert[layouts[:, va], layouts[:, vb]].sum(axis=1)
+
+    best = int(np.argmin(scores))
+
+    # Второе место — лучший среди положений с ДРУГОЙ раскладкой
+    # (пустые/повторные перестановки дают ту же картинку и не считаются)
+    differs = (layouts != layouts[best]).any(axis=1)
+    if differs.any():
+        gap = float(scores[differs].min() - scores[best])
+        seams = len(ha) + len(va)
+        best_seam = float(scores[best]) / seams
+        random_seam = float(horiz.mean() + vert.mean()) / 2
+        # Одна лишняя перестановка портит порядка 4 стыков
+        expected_gap = 4 * (random_seam - best_seam)
+        confidence = gap / expected_gap if expected_gap > 0 else 0.0
+        confidence = max(0.0, min(1.0, confidence))
+    else:
+        confidence = 0.0
+
+    return LocalSolveResult(best, confidence, time.perf_counter() - started, scores)
+
+
+# ----------------------------------------------------------------------------
+#                         ОФФЛАЙН-ОЦЕНКА
+# ----------------------------------------------------------------------------
+
+def _load_payload(path: str) -> tuple[dict | None, int | None]:
+    """
+    Файл — либо сырой ответ captchaNotRobot.getContent, либо
+    {"payload": <ответ>, "best_step": <эталон>, "source": ...} (так сохраняет OAuthLoginFlow).
+    Ответы самого локального решателя эталоном не считаются.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if "payload" in data:
+        expected = data.get("best_step") if data.get("source") != "local" else None
+        return data["payload"], expected
+    return data, None
+
+
+def _same_layout(steps, a: int, b: int) -> bool:
+    """Разные положения слайдера с одинаковой картинкой считаем одним ответом."""
+    steps = [int(x) for x in steps]
+    layouts = layouts_from_steps(steps, max(steps) + 1)
+    if max(a, b) >= len(layouts):
+        return a == b
+    return bool(np.array_equal(layouts[a], layouts[b]))
+
+
+def evaluate_payloads(directory: str, grid: int | None = None, min_confidence: float = 0.0) -> dict:
+    response_keys = ("status", "extension", "steps", "image")
+    times, confidences = [], []
+    total = labelled = correct = accepted = accepted_labelled = accepted_correct = 0
+
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        payload, expected = _load_payload(os.path.join(directory, name))
+        resp = (payload or {}).get("response") or {}
+        captcha = {key: resp.get(key) for key in response_keys}
+
+        result = solve_slider_local(captcha, grid)
+        if result is None:
+            continue
+
+        total += 1
+        times.append(result.elapsed)
+        confidences.append(result.confidence)
+
+        is_accepted = result.confidence >= min_confidence
+        accepted += is_accepted
+
+        if expected is not None:
+            labelled += 1
+            hit = _same_layout(captcha["steps"], result.best_step, int(expected))
+            correct += hit
+            accepted_labelled += is_accepted
+            accepted_correct += hit and is_accepted
+
+    times_ms = np.array(times) * 1000 if times else np.zeros(1)
+    return {
+        "total": total,
+        "labelled": labelled,
+        "accuracy": correct / labelled if labelled else None,
+        "accepted": accepted,
+        "accepted_labelled": accepted_labelled,
+        # Точность — только по размеченным: у неразмеченных правильность неизвестна
+        "accepted_accuracy": accepted_correct / accepted_labelled if accepted_labelled else None,
+        "time_ms_mean": float(times_ms.mean()),
+        "time_ms_p95": float(np.percentile(times_ms, 95)),
+        "confidence_mean": float(np.mean(confidences)) if confidences else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Оффлайн-оценка локального решателя слайдер-капчи VK")
+    parser.add_argument("directory", help="папка с сохранёнными ответами captchaNotRobot.getContent (*.json)")
+    parser.add_argument("--grid", type=int, default=None, help="размер сетки плиток (по умолчанию — из steps)")
+    parser.add_argument("--min-confidence", type=float, default=0.6, help="порог, ниже которого — RuCaptcha")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(evaluate_payloads(args.directory, args.grid, args.min_confidence), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import asyncio
+import inspect
+import logging
+
+from libs.vk.vk_models import *
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_http import HTTPPool
+from libs.vk import vk_json
+
+__all__ = ['LongPoll', 'LongPollHub', 'LP_MODE', 'LP_VERSION', 'LP_FATAL_CODES']
+
+log = logging.getLogger(__name__)
+
+# 2 — вложения, 8 — расширенные события, 32 — pts (для догрузки пропущенного), 128 — random_id
+LP_MODE = 2 | 8 | 32 | 128
+LP_VERSION = 3
+# Ошибки API, после которых опрос не возобновить: токен отозван
+LP_FATAL_CODES = (5,)
+
+
+class LongPoll:
+    """
+    Поток событий User Long Poll (messages.getLongPollServer) или,
+    если задан group_id, Bots Long Poll (groups.getLongPollServer) одного аккаунта.
+
+        async for update in vk.longpoll():
+            ...
+
+    События отдаются как пришли от VK (массив [code, ...] / dict с type).
+    failed 2/3 — ключ (и ts) перезапрашиваются сами; failed 1 и 3 в User
+    Long Poll догружаются через messages.getLongPollHistory по pts,
+    так что события не теряются. Ошибки сети и API (в том числе при
+    перезапросе ключа) — повтор с растущей паузой; поток завершается
+    APIError только на LP_FATAL_CODES и неизвестном failed.
+    """
+
+    def __init__(self, vk, group_id: int | None = None, wait: int = 25, mode: int = LP_MODE,
+                 version: int = LP_VERSION, pool: HTTPPool | None = None, retry_delay: float = 1.0,
+                 max_retry_delay: float = 60.0):
+        self.vk = vk
+        self.group_id = group_id
+        self.wait = wait
+        self.mode = mode
+        self.version = version
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._pool = pool
+
+        self.server = None
+        self.key = None
+        self.ts = None
+        self.pts = None
+
+        self.stats = {"polls": 0, "updates": 0, "resyncs": 0, "key_refreshes": 0, "errors": 0}
+
+    @property
+    def pool(self) -> HTTPPool:
+        return self._pool or HTTPPool.default()
+
+    # ---------------- сервер ----------------
+
+    async def _refresh(self, reset_ts: bool):
+        if self.group_id is not None:
+            response = await self.vk.call_api("groups.getLongPollServer", {"group_id": self.group_id})
+        else:
+            response = await self.vk.call_api("messages.getLongPollServer", {
+                "lp_version": self.version, "need_pts": 1,
+            })
+
+        server = response["server"]
+        # User Long Poll отдаёт адрес без схемы, Bots Long Poll — полный URL
+        self.server = server if "://" in server else f"https://{server}"
+        self.key = response["key"]
+        if reset_ts or self.ts is None:
+            self.ts = response["ts"]
+        if self.pts is None:
+            self.pts = response.get("pts")
+
+    async def _check(self) -> dict:
+        params = {"act": "a_check", "key": self.key, "ts": self.ts, "wait": self.wait}
+        if self.group_id is None:
+            params |= {"mode": self.mode, "version": self.version}
+
+        try:
+            status, body = await self.pool.get(
+                self.server,
+                proxy=self.vk.request_proxy(),
+                params=params,
+                timeout=self.wait + 10,
+            )
+        except Exception as e:
+            raise VKExceptions.APIError(VKError({'error_code': -1, 'error_msg': str(e) or type(e).__name__}))
+
+        try:
+            return vk_json.loads(body)
+        except ValueError:
+            raise VKExceptions.APIError(VKError({"error_code": -999, "error_msg": f"Invalid JSON (HTTP {status})"}))
+
+    async def _history(self) -> list:
+        """События, пропущенные с (ts, pts), — только User Long Poll с pts."""
+        if self.group_id is not None or self.pts is None:
+            return []
+
+        self.stats["resyncs"] += 1
+        try:
+            response = await self.vk.call_api("messages.getLongPollHistory", {
+                "ts": self.ts, "pts": self.pts, "lp_version": self.version,
+            })
+        except VKExceptions.APIError as e:
+            log.warning("[VKLongPoll] Не удалось догрузить историю (%s: %s), события могут потеряться", e.code, e.msg)
+            return []
+
+        self.pts = response.get("new_pts", self.pts)
+        return response.get("history") or []
+
+    # ---------------- поток ----------------
+
+    async def events(self):
+        refresh, reset_ts = True, True
+        failures = 0
+
+        while True:
+            try:
+                if refresh:
+                    await self._refresh(reset_ts)
+                    refresh = False
+                data = await self._check()
+            except VKExceptions.APIError as e:
+                if e.code in LP_FATAL_CODES:
+                    raise
+                failures += 1
+                self.stats["errors"] += 1
+                delay = min(self.max_retry_delay, self.retry_delay * 2 ** (failures - 1))
+                log.warning("[VKLongPoll] Ошибка опроса (%s), повтор через %.1f сек", e.msg, delay)
+                await asyncio.sleep(delay)
+                # Несколько ошибок подряд — возможно, сервер сменился
+                if failures % 3 == 0 and not refresh:
+                    refresh, reset_ts = True, False
+                continue
+
+            failures = 0
+            self.stats["polls"] += 1
+            failed = data.get("failed")
+
+            if failed is None:
+                self.ts = data["ts"]
+                self.pts = data.get("pts", self.pts)
+                updates = data.get("updates") or ()
+                self.stats["updates"] += len(updates)
+                for update in updates:
+                    yield update
+                continue
+
+            if failed == 1:
+                # История устарела: догружаем пропущенное и продолжаем с новым ts
+                log.info("[VKLongPoll] История устарела, догружаю пропущенное")
+                for update in await self._history():
+                    yield update
+                self.ts = data["ts"]
+            elif failed in (2, 3):
+                self.stats["key_refreshes"] += 1
+                history = await self._history() if failed == 3 else []
+                # Ключ — на следующем круге, под тем же повтором с паузой
+                refresh, reset_ts = True, failed == 3
+                for update in history:
+                    yield update
+            else:
+                raise VKExceptions.APIError(VKError({
+                    "error_code": -1, "error_msg": f"Long Poll failed={failed} (version {self.version})",
+                }))
+
+    def __aiter__(self):
+        return self.events()
+
+
+class LongPollHub:
+    """
+    Long Poll многих аккаунтов одновременно: по задаче на аккаунт,
+    события сливаются в общий поток (name, update) — через async for и/или
+    колбэки on(callback). Свой HTTPPool: долгие соединения не занимают
+    лимит соединений обычных call_api на тех же прокси.
+    Если события не успевают разбирать, опрос притормаживает (очередь ограничена).
+    """
+
+    def __init__(self, pool: HTTPPool | None = None, limit_per_proxy: int = 1000, queue_size: int = 10000,
+                 **options):
+        self.pool = pool or HTTPPool(limit_per_proxy=limit_per_proxy, keepalive_timeout=60)
+        self.options = options
+        self.queue_size = queue_size
+
+        self.polls: dict[str, LongPoll] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._callbacks = []
+        self._queue: asyncio.Queue | None = None
+
+    def on(self, callback):
+        """callback(name, update) — обычная функция или корутина."""
+        self._callbacks.append(callback)
+        return callback
+
+    def add(self, vk, group_id: int | None = None, name: str | None = None, **options) -> LongPoll:
+        name = name or vk._account_key() or str(group_id)
+        if name in self._tasks:
+            raise ValueError(f"Long Poll {name} уже запущен")
+
+        poll = LongPoll(vk, group_id, pool=self.pool, **(self.options | options))
+        self.polls[name] = poll
+        self._tasks[name] = asyncio.create_task(self._run(name, poll), name=f"vk-longpoll-{name}")
+        return poll
+
+    async def remove(self, name: str):
+        task = self._tasks.pop(name, None)
+        self.polls.pop(name, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self, name: str, poll: LongPoll):
+        try:
+            async for update in poll:
+                await self._dispatch(name, update)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Например, токен отозван (5) — остальные аккаунты продолжают
+            log.error("[VKLongPoll] %s остановлен: %s", name, getattr(e, "msg", None) or e)
+        finally:
+            self._tasks.pop(name, None)
+
+    async def _dispatch(self, name: str, update):
+        for callback in self._callbacks:
+            try:
+                result = callback(name, update)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                log.exception("[VKLongPoll] Ошибка в колбэке")
+
+        if self._queue is not None:
+            await self._queue.put((name, update))
+
+    async def events(self):
+        """Общий поток (name, update) всех аккаунтов."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.queue_size)
+        while True:
+            yield await self._queue.get()
+
+    def __aiter__(self):
+        return self.events()
+
+    @property
+    def running(self) -> list[str]:
+        return list(self._tasks)
+
+    def stats(self) -> dict:
+        return {name: dict(poll.stats) for name, poll in self.polls.items()}
+
+    async def close(self):
+        for name in list(self._tasks):
+            await self.remove(name)
+        await self.pool.close()
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+__all__ = ['get_loop', 'run_sync', 'spawn']
+
+# ----------------------------------------------------------------------------
+#   Общий фоновый event loop для синхронных обёрток (VK, obtain_token_selenium)
+# ----------------------------------------------------------------------------
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+# Фоновые задачи без владельца — ссылки, чтобы их не собрал GC до завершения
+_background: set[asyncio.Task] = set()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Возвращает фоновый loop (поднимается лениво в daemon-потоке).
+    Все синхронные вызовы из любых потоков выполняются в нём, поэтому
+    пулы соединений и браузеров, привязанные к loop, переиспользуются.
+    """
+    global _loop
+
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="vk-loop", daemon=True)
+            thread.start()
+
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Выполняет корутину в фоновом loop и блокирует текущий поток до результата."""
+    loop = get_loop()
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync вызван изнутри фонового loop — используйте await")
+
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def spawn(coro) -> asyncio.Task:
+    """Задача «запустил и забыл» в текущем loop; ссылка держится до её завершения."""
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
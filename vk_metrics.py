@@ -0,0 +1,189 @@
+import time
+import asyncio
+import logging
+import threading
+
+__all__ = ['Metrics', 'Histogram', 'Span', 'span', 'observe', 'DEFAULT_BUCKETS']
+
+log = logging.getLogger(__name__)
+
+# Секунды: от миллисекунд вызова API до минут браузерного логина с капчей
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        total, out = 0, []
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            out.append((bound, total))
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": {str(bound): n for bound, n in self.cumulative()},
+        }
+
+
+class Span:
+    """
+    Замер одной фазы. Используется как контекстный менеджер (в том числе
+    внутри корутин); метки можно дополнить по ходу через set().
+    Исход (outcome) по умолчанию: ok / cancelled / error_<code> для APIError / error.
+    """
+
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics: "Metrics", name: str, labels: dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.started = None
+
+    def set(self, **labels):
+        self.labels.update(labels)
+        return self
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if "outcome" not in self.labels:
+            if exc is None:
+                self.labels["outcome"] = "ok"
+            elif isinstance(exc, asyncio.CancelledError):
+                self.labels["outcome"] = "cancelled"
+            elif getattr(exc, "code", None) is not None:
+                self.labels["outcome"] = f"error_{exc.code}"
+            else:
+                self.labels["outcome"] = "error"
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Metrics:
+    """
+    Гистограммы длительностей по фазам (auth.*, browser.*, rucaptcha.*,
+    slider.*, api.call) с метками. Экспорт — prometheus() в текстовом
+    формате или хуки hook(name, seconds, labels) на каждый замер.
+    """
+
+    _default: "Metrics | None" = None
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix: str = "vk"):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._histograms: dict[tuple, Histogram] = {}
+        self._hooks: list = []
+        # Замеры приходят и из фонового loop, и из потоков синхронного кода
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "Metrics":
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    # ---------------- запись ----------------
+
+    def span(self, name: str, **labels) -> Span:
+        return Span(self, name, labels)
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+        log.debug("%s %s %.3f сек", name, labels, seconds)
+
+        for hook in self._hooks:
+            try:
+                hook(name, seconds, labels)
+            except Exception as e:
+                log.warning("Ошибка metrics-хука %r: %s", hook, e)
+
+    def add_hook(self, hook):
+        """hook(name, seconds, labels) — например, отправка в StatsD/OpenTelemetry."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    # ---------------- чтение ----------------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = [(key, h.to_dict()) for key, h in self._histograms.items()]
+        out: dict[str, list] = {}
+        for (name, labels), data in sorted(items):
+            out.setdefault(name, []).append({"labels": dict(labels)} | data)
+        return out
+
+    def _metric_name(self, name: str) -> str:
+        return f"{self.prefix}_{name.replace('.', '_')}_seconds"
+
+    def prometheus(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)."""
+        with self._lock:
+            items = sorted(
+                (key, h.cumulative(), h.count, h.sum) for key, h in self._histograms.items()
+            )
+
+        lines = []
+        seen = set()
+        for (name, labels), cumulative, count, total in items:
+            metric = self._metric_name(name)
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+
+            label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            prefix = label_str + "," if label_str else ""
+
+            for bound, n in cumulative:
+                lines.append(f'{metric}_bucket{{{prefix}le="{bound:g}"}} {n}')
+            lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{metric}_sum{{{label_str}}} {total:.6f}" if label_str else f"{metric}_sum {total:.6f}")
+            lines.append(f"{metric}_count{{{label_str}}} {count}" if label_str else f"{metric}_count {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def span(name: str, **labels) -> Span:
+    """Замер фазы в реестре по умолчанию."""
+    return Metrics.default().span(name, **labels)
+
+
+def observe(name: str, seconds: float, **labels):
+    Metrics.default().observe(name, seconds, **labels)
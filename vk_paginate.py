@@ -0,0 +1,166 @@
+import asyncio
+from collections import deque
+
+from libs.vk.vk_models import *
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_batch import build_execute_code, EXECUTE_MAX_CALLS
+
+__all__ = ['Paginator', 'PAGE_LIMITS', 'DEFAULT_PAGE_SIZE']
+
+# Максимальный count за один запрос у популярных offset/count-методов
+PAGE_LIMITS = {
+    "friends.get": 5000,
+    "friends.getRequests": 1000,
+    "followers.get": 1000,
+    "users.getFollowers": 1000,
+    "groups.get": 1000,
+    "groups.getMembers": 1000,
+    "wall.get": 100,
+    "wall.getComments": 100,
+    "wall.getReposts": 1000,
+    "likes.getList": 1000,
+    "photos.get": 1000,
+    "photos.getAll": 200,
+    "video.get": 200,
+    "messages.getHistory": 200,
+    "messages.getConversations": 200,
+    "newsfeed.search": 200,
+}
+
+DEFAULT_PAGE_SIZE = 100
+
+
+class Paginator:
+    """
+    Постраничный обход offset/count-метода.
+
+    Первая страница запрашивается сразу и даёт общий count; дальше
+    до `prefetch` следующих запросов летят параллельно, пока текущая
+    страница отдаётся потребителю (prefetch=0 — строго по очереди).
+    pages_per_call > 1 — несколько страниц за один execute (до 25).
+    Порядок страниц сохраняется, в памяти — не больше
+    (prefetch + 1) * pages_per_call страниц. Обход останавливается,
+    когда offset дошёл до count (или набрано max_items), и на пустой
+    странице. Короткие страницы в середине (удалённые и скрытые записи
+    у wall.get, groups.getMembers и т.п.) обход не обрывают.
+    page_size больше лимита метода (PAGE_LIMITS) урезается до него —
+    иначе VK молча отдал бы меньше, и смещения разошлись бы.
+    """
+
+    def __init__(self, call_api, send, method: str, params: dict | None = None, page_size: int | None = None,
+                 prefetch: int = 1, pages_per_call: int = 1, max_items: int | None = None,
+                 items_key: str = "items"):
+        # call_api(method, params) -> response; send(method, params) -> полный JSON (для execute_errors)
+        self._call_api = call_api
+        self._send = send
+        self.method = method
+        self.params = dict(params or {})
+        self.page_size = page_size or PAGE_LIMITS.get(method, DEFAULT_PAGE_SIZE)
+        if method in PAGE_LIMITS:
+            self.page_size = min(self.page_size, PAGE_LIMITS[method])
+        self.prefetch = max(0, prefetch)
+        self.pages_per_call = max(1, min(pages_per_call, EXECUTE_MAX_CALLS))
+        self.max_items = max_items
+        self.items_key = items_key
+
+        self.total: int | None = None
+
+    def _page_params(self, offset: int) -> dict:
+        return self.params | {"offset": offset, "count": self.page_size}
+
+    def _split(self, response) -> tuple[list, int | None]:
+        """response → (items, count). Методы без обёртки {count, items} — одна страница целиком."""
+        if isinstance(response, dict):
+            return response.get(self.items_key) or [], response.get("count")
+        return list(response or []), None
+
+    async def _fetch(self, offset: int, end: int) -> list:
+        """Один запрос: страница по offset (или pages_per_call страниц через execute)."""
+        if self.pages_per_call == 1:
+            items, _ = self._split(await self._call_api(self.method, self._page_params(offset)))
+            return [items]
+
+        offsets = [o for o in range(offset, offset + self.page_size * self.pages_per_call, self.page_size) if o < end]
+
+        code = build_execute_code([(self.method, self._page_params(o)) for o in offsets])
+        json_data = await self._send("execute", {"code": code})
+
+        if "error" in json_data:
+            raise VKExceptions.APIError(VKError(json_data["error"]))
+
+        errors = list(json_data.get("execute_errors") or [])
+        pages = []
+        for response in json_data.get("response") or []:
+            if response is False:
+                raise VKExceptions.APIError(VKError(errors.pop(0) if errors else {
+                    "error_code": -2, "error_msg": "execute: page request failed"
+                }))
+            pages.append(self._split(response)[0])
+        return pages
+
+    def _limit(self) -> int | None:
+        if self.total is None:
+            return self.max_items
+        if self.max_items is None:
+            return self.total
+        return min(self.total, self.max_items)
+
+    async def pages(self):
+        """Асинхронный генератор страниц (списков элементов)."""
+        offset = self.params.get("offset", 0)
+        first = await self._call_api(self.method, self._page_params(offset))
+        items, total = self._split(first)
+        self.total = int(total) if total is not None else None
+
+        limit = self._limit()
+        yielded = 0
+
+        def clip(page: list) -> list:
+            return page if limit is None else page[:max(0, limit - yielded)]
+
+        # Без count (метод без пагинации) или пустая коллекция — продолжать нечего
+        if self.total is None or not items or offset + self.page_size >= self.total:
+            yield clip(items)
+            return
+
+        step = self.page_size * self.pages_per_call
+        end = self.total if limit is None else min(self.total, offset + limit)
+        next_offset = offset + self.page_size
+        inflight: deque[asyncio.Task] = deque()
+
+        def schedule(depth: int):
+            nonlocal next_offset
+            while next_offset < end and len(inflight) < depth:
+                inflight.append(asyncio.ensure_future(self._fetch(next_offset, end)))
+                next_offset += step
+
+        try:
+            # Следующие запросы уходят, пока потребитель разбирает текущую страницу
+            schedule(self.prefetch)
+            pages = [items]
+
+            while True:
+                for items in pages:
+                    page = clip(items)
+                    if page:
+                        yield page
+                        yielded += len(page)
+                    # Пустая страница — коллекция кончилась раньше count (удаления по ходу обхода)
+                    if not items or (limit is not None and yielded >= limit):
+                        return
+
+                schedule(max(1, self.prefetch))
+                if not inflight:
+                    return
+                pages = await inflight.popleft()
+                schedule(self.prefetch)
+        finally:
+            for task in inflight:
+                task.cancel()
+            if inflight:
+                await asyncio.gather(*inflight, return_exceptions=True)
+
+    async def items(self):
+        async for page in self.pages():
+            for item in page:
+                yield item
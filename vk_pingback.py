@@ -0,0 +1,124 @@
+import json
+import asyncio
+import logging
+from aiohttp import web
+
+__all__ = ['PingbackServer', 'parse_pingback']
+
+log = logging.getLogger(__name__)
+
+
+def parse_pingback(payload: dict) -> tuple[str | None, dict | None]:
+    """
+    RuCaptcha присылает результат либо формой (id=TASK_ID&code=SOLUTION),
+    либо JSON (taskId + solution). code бывает JSON-строкой или числом.
+    Возвращает (task_id, solution).
+    """
+    task_id = payload.get("taskId") or payload.get("id")
+    solution = payload.get("solution")
+
+    if solution is None and "code" in payload:
+        code = payload["code"]
+        if isinstance(code, str):
+            try:
+                code = json.loads(code)
+            except ValueError:
+                pass
+        if isinstance(code, dict):
+            solution = code
+        elif isinstance(code, (int, str)) and str(code).lstrip('-').isdigit():
+            solution = {"best_step": int(code)}
+        else:
+            solution = {"code": code}
+
+    return (str(task_id) if task_id is not None else None), solution
+
+
+class PingbackServer:
+    """
+    Встроенный HTTP-приёмник pingback'ов RuCaptcha.
+
+    public_url — адрес, по которому RuCaptcha достучится до приёмника
+    (домен/IP должен быть добавлен в настройках pingback аккаунта).
+    RuCaptchaClient(pingback=server) передаёт его в createTask как
+    callbackUrl и будит ожидающего сразу после прихода результата.
+    """
+
+    def __init__(self, public_url: str, host: str = "0.0.0.0", port: int = 8088,
+                 path: str = "/rucaptcha/pingback"):
+        self.public_url = public_url.rstrip('/')
+        self.host = host
+        self.port = port
+        self.path = path
+
+        self._runner: web.AppRunner | None = None
+        self._start_lock = asyncio.Lock()
+        self._waiters: dict[str, asyncio.Future] = {}
+        # Pingback может прийти раньше, чем мы зарегистрировали waiter
+        self._early: dict[str, dict] = {}
+
+        self.received = 0
+
+    @property
+    def url(self) -> str:
+        return self.public_url + self.path
+
+    async def start(self):
+        async with self._start_lock:
+            if self._runner is not None:
+                return
+            app = web.Application()
+            app.router.add_post(self.path, self._handle)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, self.port).start()
+            self._runner = runner
+            log.info("[Pingback] Слушаю %s:%s%s → %s", self.host, self.port, self.path, self.url)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        for future in self._waiters.values():
+            future.cancel()
+        self._waiters.clear()
+        self._early.clear()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        try:
+            if request.content_type == "application/json":
+                payload = await request.json()
+            else:
+                payload = dict(await request.post())
+        except Exception:
+            return web.Response(status=400, text="bad payload")
+
+        task_id, solution = parse_pingback(payload)
+        if task_id is None or solution is None:
+            return web.Response(status=400, text="no id")
+
+        self.received += 1
+        future = self._waiters.pop(task_id, None)
+        if future is not None and not future.done():
+            future.set_result(solution)
+        else:
+            if len(self._early) >= 1000:
+                self._early.pop(next(iter(self._early)))
+            self._early[task_id] = solution
+
+        return web.Response(text="OK")
+
+    def register(self, task_id) -> asyncio.Future:
+        task_id = str(task_id)
+        future = asyncio.get_running_loop().create_future()
+        if task_id in self._early:
+            future.set_result(self._early.pop(task_id))
+        else:
+            self._waiters[task_id] = future
+        return future
+
+    def discard(self, task_id):
+        future = self._waiters.pop(str(task_id), None)
+        if future is not None:
+            future.cancel()
+        self._early.pop(str(task_id), None)
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+__all__ = ['PrewarmPolicy']
+
+
+class PrewarmPolicy:
+    """
+    Стоит ли заранее открывать браузер на время password grant'а.
+
+    По каждому аккаунту — EWMA исходов grant'а (1 — need_captcha, 0 — нет);
+    для аккаунта без истории — общая доля капчи по всем. Прогреваем, если
+    оценка не ниже threshold: иначе слот браузера и трафик прокси
+    тратятся впустую чаще, чем экономят запуск Chromium и загрузку страницы.
+    """
+
+    _default: "PrewarmPolicy | None" = None
+
+    def __init__(self, threshold: float = 0.3, alpha: float = 0.5, global_alpha: float = 0.05,
+                 prior: float = 0.0, max_accounts: int = 100000):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.global_alpha = global_alpha
+        self.max_accounts = max_accounts
+
+        self._rates: OrderedDict[str, float] = OrderedDict()
+        self._global = prior
+
+        self.prewarmed = 0
+        self.used = 0
+        self.wasted = 0
+        self.missed = 0
+
+    @classmethod
+    def default(cls) -> "PrewarmPolicy":
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def captcha_rate(self, account: str) -> float:
+        return self._rates.get(account, self._global)
+
+    def should_prewarm(self, account: str) -> bool:
+        return self.captcha_rate(account) >= self.threshold
+
+    def record(self, account: str, captcha: bool, prewarmed: bool):
+        """Исход grant'а: была ли капча и был ли прогрет браузер."""
+        value = 1.0 if captcha else 0.0
+        rate = self._rates.pop(account, self._global)
+        self._rates[account] = rate + self.alpha * (value - rate)
+        self._global += self.global_alpha * (value - self._global)
+        if len(self._rates) > self.max_accounts:
+            self._rates.popitem(last=False)
+
+        if prewarmed:
+            self.prewarmed += 1
+            if captcha:
+                self.used += 1
+            else:
+                self.wasted += 1
+        elif captcha:
+            self.missed += 1
+
+    def stats(self) -> dict:
+        return {
+            "prewarmed": self.prewarmed,
+            "used": self.used,
+            "wasted": self.wasted,
+            "missed": self.missed,
+            "global_captcha_rate": round(self._global, 3),
+            "accounts": len(self._rates),
+        }
@@ -0,0 +1,227 @@
+import time
+import asyncio
+import logging
+
+from libs.vk.vk_http import HTTPPool, normalize_proxy
+
+__all__ = ['ProxyPool', 'ProxyStats']
+
+log = logging.getLogger(__name__)
+
+
+class ProxyStats:
+    """EWMA латентности и доли ошибок одного прокси + состояние вытеснения."""
+
+    def __init__(self, proxy: str, alpha: float):
+        self.proxy = proxy
+        self.alpha = alpha
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.timeouts_in_row = 0
+        self.requests = 0
+        self.evicted_until = 0.0
+        self.assigned = 0
+
+    @property
+    def evicted(self) -> bool:
+        return self.evicted_until > time.monotonic()
+
+    def score(self) -> float:
+        """Меньше — лучше. Неизмеренный прокси считается средним (1 сек)."""
+        latency = self.latency if self.latency is not None else 1.0
+        return latency * (1 + 4 * self.error_rate)
+
+    def observe(self, latency: float | None, ok: bool):
+        self.requests += 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else \
+                self.latency * (1 - self.alpha) + latency * self.alpha
+        self.error_rate = self.error_rate * (1 - self.alpha) + (0.0 if ok else 1.0) * self.alpha
+
+    def to_dict(self) -> dict:
+        return {
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "assigned": self.assigned,
+            "evicted": self.evicted,
+        }
+
+
+class ProxyPool:
+    """
+    Общий пул прокси для VK.call_api, VK.auth и Playwright-flow.
+
+    - каждому аккаунту закрепляется прокси (sticky), пока тот жив;
+    - по каждому прокси ведётся EWMA латентности и доли ошибок;
+    - прокси, max_timeouts раз подряд упавший по таймауту/соединению,
+      вытесняется на eviction_time сек, его аккаунты переезжают на другие;
+    - фоновые пробы (start()) проверяют все прокси и возвращают вытесненные.
+    """
+
+    PROBE_URL = "https://api.vk.com/method/utils.getServerTime"
+
+    def __init__(self, proxies, alpha: float = 0.2, max_timeouts: int = 3, eviction_time: float = 300,
+                 probe_interval: float = 60, probe_timeout: float = 10, probe_url: str | None = None,
+                 pool: HTTPPool | None = None):
+        self.alpha = alpha
+        self.max_timeouts = max_timeouts
+        self.eviction_time = eviction_time
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.probe_url = probe_url or self.PROBE_URL
+        self._pool = pool
+
+        self._stats: dict[str, ProxyStats] = {}
+        self._assigned: dict[str, str] = {}
+        self._task: asyncio.Task | None = None
+
+        for proxy in proxies:
+            self.add(proxy)
+
+    @property
+    def pool(self) -> HTTPPool:
+        return self._pool or HTTPPool.default()
+
+    def add(self, proxy: str):
+        if proxy and proxy not in self._stats:
+            self._stats[proxy] = ProxyStats(proxy, self.alpha)
+
+    def remove(self, proxy: str):
+        self._stats.pop(proxy, None)
+        for key, assigned in list(self._assigned.items()):
+            if assigned == proxy:
+                del self._assigned[key]
+
+    def __len__(self):
+        return len(self._stats)
+
+    # ---------------- selection ----------------
+
+    def _live(self, exclude=()) -> list[ProxyStats]:
+        live = [s for s in self._stats.values() if not s.evicted and s.proxy not in exclude]
+        # Если вытеснено всё — лучше плохой прокси, чем никакого
+        return live or [s for s in self._stats.values() if s.proxy not in exclude] or list(self._stats.values())
+
+    def best(self, exclude=()) -> str | None:
+        """
+        Прокси для нового аккаунта: среди живых с score не хуже 2x лучшего
+        берём наименее нагруженный — так аккаунты не сбиваются на одном прокси.
+        """
+        live = self._live(exclude)
+        if not live:
+            return None
+        best_score = min(s.score() for s in live)
+        good = [s for s in live if s.score() <= best_score * 2]
+        return min(good, key=lambda s: (s.assigned, s.score())).proxy
+
+    def assign(self, account: str) -> str | None:
+        """Закреплённый за аккаунтом прокси (с переездом, если старый вытеснен)."""
+        proxy = self._assigned.get(account)
+        stats = self._stats.get(proxy) if proxy else None
+
+        if stats is not None and not stats.evicted:
+            return proxy
+
+        return self._reassign(account, exclude=(proxy,) if proxy else ())
+
+    def failover(self, account: str) -> str | None:
+        """Принудительно переносит аккаунт на другой прокси."""
+        current = self._assigned.get(account)
+        return self._reassign(account, exclude=(current,) if current else ())
+
+    def _reassign(self, account: str, exclude=()) -> str | None:
+        old = self._assigned.pop(account, None)
+        if old in self._stats:
+            self._stats[old].assigned -= 1
+
+        proxy = self.best(exclude)
+        if proxy is not None:
+            self._assigned[account] = proxy
+            self._stats[proxy].assigned += 1
+            if old and old != proxy:
+                log.info("[ProxyPool] %s: %s → %s", account, _mask(old), _mask(proxy))
+        return proxy
+
+    # ---------------- feedback ----------------
+
+    def report(self, proxy: str | None, latency: float | None, ok: bool, timeout: bool = False):
+        stats = self._stats.get(proxy) if proxy else None
+        if stats is None:
+            return
+
+        stats.observe(latency, ok)
+
+        if timeout:
+            stats.timeouts_in_row += 1
+            if stats.timeouts_in_row >= self.max_timeouts and not stats.evicted:
+                stats.evicted_until = time.monotonic() + self.eviction_time
+                log.warning("[ProxyPool] ❌ %s вытеснен на %.0f сек (%s таймаутов подряд)",
+                            _mask(proxy), self.eviction_time, stats.timeouts_in_row)
+        elif ok:
+            stats.timeouts_in_row = 0
+
+    # ---------------- health probes ----------------
+
+    async def probe(self, proxy: str) -> bool:
+        started = time.monotonic()
+        try:
+            status, _ = await self.pool.post(self.probe_url, proxy=normalize_proxy(proxy), data={"v": "5.199"},
+                                             timeout=self.probe_timeout)
+        except asyncio.TimeoutError:
+            self.report(proxy, None, ok=False, timeout=True)
+            return False
+        except Exception as e:
+            # Отказ в соединении, TLS и т.п. — ошибка прокси, а не медленный ответ
+            log.debug("[ProxyPool] Проба %s: %s", _mask(proxy), e)
+            self.report(proxy, None, ok=False)
+            return False
+
+        if status >= 400:
+            # 407 — прокси не принял авторизацию
+            log.debug("[ProxyPool] Проба %s: HTTP %s", _mask(proxy), status)
+            self.report(proxy, None, ok=False)
+            return False
+
+        stats = self._stats.get(proxy)
+        self.report(proxy, time.monotonic() - started, ok=True)
+        if stats is not None and stats.evicted:
+            stats.evicted_until = 0.0
+            log.info("[ProxyPool] ✔ %s снова в строю", _mask(proxy))
+        return True
+
+    async def probe_all(self) -> dict:
+        proxies = list(self._stats)
+        results = await asyncio.gather(*(self.probe(proxy) for proxy in proxies))
+        return dict(zip(proxies, results))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("[ProxyPool] Ошибка проб: %s", e)
+            await asyncio.sleep(self.probe_interval)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {_mask(proxy): stats.to_dict() for proxy, stats in self._stats.items()}
+
+
+def _mask(proxy: str) -> str:
+    return proxy.rsplit('@', 1)[-1] if proxy else ''
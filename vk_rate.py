@@ -0,0 +1,167 @@
+import time
+import asyncio
+
+__all__ = ['TokenBucket', 'RateScheduler', 'THROTTLE_ERROR_CODES', 'TOKEN_RATES']
+
+# 6 — Too many requests per second, 9 — Flood control
+THROTTLE_ERROR_CODES = (6, 9)
+
+# Лимиты VK API по типу ключа доступа, запросов/сек
+TOKEN_RATES = {"user": 3.0, "group": 20.0, "service": 20.0}
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием: acquire() сразу списывает токен
+    (баланс может уйти в минус) и спит ровно столько, сколько нужно
+    до его появления. Так ожидающие обслуживаются строго по очереди.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float = 0.2):
+        self.base_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.waiting = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Списывает токен и возвращает, сколько секунд надо подождать."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def slow_down(self, factor: float):
+        self._refill(time.monotonic())
+        self.rate = max(self.min_rate, self.rate * factor)
+
+    def speed_up(self, step: float):
+        if self.rate < self.base_rate:
+            self._refill(time.monotonic())
+            self.rate = min(self.base_rate, self.rate + step)
+
+
+class RateScheduler:
+    """
+    Планировщик запросов к VK API: bucket на каждый access_token
+    и опционально на каждый прокси. Скорость токена — token_rate, если
+    задан, иначе лимит VK для его типа (TOKEN_RATES: ключ пользователя — 3
+    запроса/сек, сообщества и сервисный — 20). Лишние вызовы не падают, а ждут
+    своей очереди. При ошибках 6/9 скорость токена снижается
+    (backoff), на успешных ответах — плавно восстанавливается.
+    """
+
+    _default: "RateScheduler | None" = None
+
+    def __init__(self, token_rate: float | None = None, token_burst: float | None = None,
+                 proxy_rate: float | None = None,
+                 proxy_burst: float | None = None, backoff: float = 0.5, recovery: float = 0.05,
+                 min_rate: float = 0.2):
+        self.token_rate = token_rate
+        self.token_burst = token_burst
+        self.proxy_rate = proxy_rate
+        self.proxy_burst = proxy_burst if proxy_burst is not None else proxy_rate
+        self.backoff = backoff
+        self.recovery = recovery
+        self.min_rate = min_rate
+
+        self._tokens: dict[str, TokenBucket] = {}
+        self._proxies: dict[str, TokenBucket] = {}
+
+        self.total_requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+
+    @classmethod
+    def default(cls) -> "RateScheduler":
+        """Общий планировщик процесса: один токен — один bucket на все AsyncVK."""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def _token_bucket(self, token: str, token_type: str = "user") -> TokenBucket:
+        bucket = self._tokens.get(token)
+        if bucket is None:
+            rate = self.token_rate or TOKEN_RATES.get(token_type, TOKEN_RATES["user"])
+            burst = self.token_burst or rate
+            bucket = self._tokens[token] = TokenBucket(rate, burst, self.min_rate)
+        return bucket
+
+    def _proxy_bucket(self, proxy: str | None) -> TokenBucket | None:
+        if not proxy or not self.proxy_rate:
+            return None
+        bucket = self._proxies.get(proxy)
+        if bucket is None:
+            bucket = self._proxies[proxy] = TokenBucket(self.proxy_rate, self.proxy_burst, self.min_rate)
+        return bucket
+
+    async def acquire(self, token: str | None, proxy: str | None = None, token_type: str = "user") -> float:
+        """Ждёт слот для запроса; возвращает время ожидания в секундах."""
+        buckets = [self._token_bucket(token or '', token_type)]
+        proxy_bucket = self._proxy_bucket(proxy)
+        if proxy_bucket is not None:
+            buckets.append(proxy_bucket)
+
+        delay = max(bucket.reserve() for bucket in buckets)
+
+        self.total_requests += 1
+        if delay > 0:
+            for bucket in buckets:
+                bucket.waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                for bucket in buckets:
+                    bucket.waiting -= 1
+
+        self.total_wait += delay
+        self.max_wait = max(self.max_wait, delay)
+        return delay
+
+    def on_success(self, token: str | None):
+        bucket = self._tokens.get(token or '')
+        if bucket is not None:
+            bucket.speed_up(self.recovery)
+
+    def on_throttled(self, token: str | None, proxy: str | None = None, token_type: str = "user"):
+        self.throttled += 1
+        self._token_bucket(token or '', token_type).slow_down(self.backoff)
+        proxy_bucket = self._proxy_bucket(proxy)
+        if proxy_bucket is not None:
+            proxy_bucket.slow_down(self.backoff)
+
+    def queue_depth(self, token: str | None = None) -> int:
+        if token is not None:
+            bucket = self._tokens.get(token)
+            return bucket.waiting if bucket else 0
+        return sum(bucket.waiting for bucket in self._tokens.values())
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.total_requests,
+            "throttled": self.throttled,
+            "queued": self.queue_depth(),
+            "wait_avg": self.total_wait / self.total_requests if self.total_requests else 0.0,
+            "wait_max": self.max_wait,
+            "tokens": {
+                _mask(token): {"rate": bucket.rate, "queued": bucket.waiting}
+                for token, bucket in self._tokens.items()
+            },
+            "proxies": {
+                proxy.rsplit('@', 1)[-1]: {"rate": bucket.rate, "queued": bucket.waiting}
+                for proxy, bucket in self._proxies.items()
+            },
+        }
+
+
+def _mask(token: str) -> str:
+    return token[:8] + '…' if token else ''
@@ -0,0 +1,105 @@
+import logging
+
+from libs.vk.vk_async import AsyncVK, Session
+from libs.vk.vk_token_store import TokenStore, is_token_fresh
+
+__all__ = ['AccountRegistry']
+
+log = logging.getLogger(__name__)
+
+
+class AccountRegistry:
+    """
+    Десятки тысяч залогиненных аккаунтов в одном процессе.
+
+    На аккаунт хранится только Session на __slots__; одинаковые строки
+    (user_agent у всех, прокси у многих аккаунтов) — один объект на всех.
+    AsyncVK создаётся на время вызова поверх записи и пишет в неё же
+    (новый токен после auth, прокси после failover). Соединения — общий
+    HTTPPool: одна keep-alive сессия на прокси для всех его аккаунтов.
+
+    client_options — аргументы AsyncVK (scheduler, proxy_pool, cache...).
+    batch=True здесь не склеивает вызовы разных обращений: клиент живёт один вызов.
+    """
+
+    def __init__(self, **client_options):
+        self.client_options = client_options
+        self._sessions: dict[str, Session] = {}
+        self._strings: dict[str, str] = {}
+
+    def _shared(self, value):
+        if not isinstance(value, str):
+            return value
+        return self._strings.setdefault(value, value)
+
+    # ---------------- записи ----------------
+
+    def add(self, login: str, auth_data: dict) -> Session:
+        """Добавляет (или обновляет) аккаунт из auth_data — как AsyncVK.set_session."""
+        session = self._sessions.get(login)
+        if session is None:
+            session = self._sessions[login] = Session(login)
+        session.access_token = auth_data.get('access_token')
+        session.user_id = auth_data.get('user_id')
+        session.user_agent = self._shared(auth_data.get('user_agent'))
+        session.device_id = auth_data.get('device_id')
+        session.proxy = self._shared(auth_data.get('proxy'))
+        return session
+
+    def load(self, token_store: TokenStore, margin: float = 0) -> int:
+        """Все живые токены из хранилища; возвращает, сколько загружено."""
+        loaded = 0
+        for login, auth_data in token_store.items():
+            if is_token_fresh(auth_data, margin):
+                self.add(login, auth_data)
+                loaded += 1
+        log.info("[VKRegistry] Загружено аккаунтов: %d", loaded)
+        return loaded
+
+    def get(self, login: str) -> Session | None:
+        return self._sessions.get(login)
+
+    def remove(self, login: str):
+        self._sessions.pop(login, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, login: str):
+        return login in self._sessions
+
+    def __iter__(self):
+        return iter(self._sessions)
+
+    # ---------------- вызовы ----------------
+
+    def client(self, login: str) -> AsyncVK:
+        """AsyncVK поверх записи аккаунта (запись создаётся, если её нет)."""
+        session = self._sessions.get(login)
+        if session is None:
+            session = self._sessions[login] = Session(login)
+        return AsyncVK(session=session, **self.client_options)
+
+    async def auth(self, login: str, password: str, proxy=None, force: bool = False):
+        vk = self.client(login)
+        if proxy:
+            vk.set_proxy(self._shared(proxy))
+        auth_data = await vk.auth(login, password, force=force)
+        # Строки свежей сессии — тоже общие
+        vk.session.user_agent = self._shared(vk.session.user_agent)
+        vk.session.proxy = self._shared(vk.session.proxy)
+        return auth_data
+
+    async def call_api(self, login: str, endpoint: str, params=None, **options):
+        session = self._sessions.get(login)
+        if session is None:
+            raise KeyError(login)
+        return await AsyncVK(session=session, **self.client_options).call_api(endpoint, params, **options)
+
+    def stats(self) -> dict:
+        sessions = self._sessions.values()
+        return {
+            "accounts": len(self._sessions),
+            "proxies": len({s.proxy for s in sessions if s.proxy}),
+            "shared_strings": len(self._strings),
+        }
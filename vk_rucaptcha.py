@@ -0,0 +1,259 @@
+import time
+import asyncio
+import logging
+
+from libs.vk.vk_http import HTTPPool
+from libs.vk.vk_pingback import PingbackServer
+from libs.vk.vk_metrics import span, observe
+from libs.vk import vk_json
+
+__all__ = [
+    'RuCaptchaClient',
+    'RUCAPTCHA_KEY',
+    'RUCAPTCHA_URL',
+    'RUCAPTCHA_CREATE_TASK_URL',
+    'RUCAPTCHA_GET_RESULT_URL',
+]
+
+# RuCaptcha
+RUCAPTCHA_KEY = "d4a0f283579c2aecc0d5b47211bf312d"
+RUCAPTCHA_URL = "https://api.rucaptcha.com"
+RUCAPTCHA_CREATE_TASK_URL = f"{RUCAPTCHA_URL}/createTask"
+RUCAPTCHA_GET_RESULT_URL = f"{RUCAPTCHA_URL}/getTaskResult"
+
+log = logging.getLogger(__name__)
+
+
+class RuCaptchaClient:
+    """
+    Неблокирующий клиент RuCaptcha (createTask / getTaskResult).
+
+    Запросы идут через общий HTTPPool (keep-alive). Первый опрос
+    откладывается на ~80% от среднего наблюдаемого времени решения
+    (EWMA), дальше интервал растёт от min_interval до max_interval.
+    solve() можно отменить обычным task.cancel() — ожидание прервётся сразу.
+
+    С pingback=PingbackServer(...) задача создаётся с callbackUrl, и результат
+    забирается в момент прихода pingback'а; getTaskResult опрашивается лишь
+    раз в pingback_fallback секунд на случай потерянного callback'а.
+    """
+
+    _default: "RuCaptchaClient | None" = None
+
+    def __init__(self, key: str = RUCAPTCHA_KEY, base_url: str = RUCAPTCHA_URL, timeout: float = 180,
+                 initial_delay: float = 5.0, min_interval: float = 1.0, max_interval: float = 5.0,
+                 max_pending: int | None = None, pool: HTTPPool | None = None,
+                 pingback: PingbackServer | None = None, pingback_fallback: float = 10.0):
+        self.key = key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._pool = pool
+        self._pending = asyncio.Semaphore(max_pending) if max_pending else None
+        self.pingback = pingback
+        self.pingback_fallback = pingback_fallback
+
+        # Экспоненциальное среднее времени решения, сек
+        self.solve_ewma: float | None = None
+
+    @classmethod
+    def default(cls) -> "RuCaptchaClient":
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @property
+    def pool(self) -> HTTPPool:
+        return self._pool or HTTPPool.default()
+
+    def _first_delay(self) -> float:
+        if self.solve_ewma is None:
+            return self.initial_delay
+        return max(self.min_interval, self.solve_ewma * 0.8)
+
+    def _observe(self, elapsed: float):
+        if self.solve_ewma is None:
+            self.solve_ewma = elapsed
+        else:
+            self.solve_ewma = self.solve_ewma * 0.8 + elapsed * 0.2
+
+    async def _post(self, method: str, payload: dict, timeout: float) -> dict:
+        status, body = await self.pool.post(f"{self.base_url}/{method}", json=payload, timeout=timeout)
+        return vk_json.loads(body)
+
+    async def create_task(self, task: dict, **extra) -> int | None:
+        log.debug("[RuCaptcha] → createTask...")
+        with span("rucaptcha.create_task") as create_span:
+            try:
+                resp = await self._post("createTask", {"clientKey": self.key, "task": task, **extra}, timeout=20)
+            except Exception as e:
+                log.error("[RuCaptcha] ❌ Ошибка запроса createTask: %s", e)
+                create_span.set(outcome="error")
+                return None
+
+            if resp.get("errorId") != 0:
+                log.error("[RuCaptcha] ❌ errorId != 0: %s", resp)
+                create_span.set(outcome=str(resp.get("errorCode") or "error"))
+                return None
+
+            task_id = resp.get("taskId")
+            if not task_id:
+                log.error("[RuCaptcha] ❌ Нет taskId в ответе")
+                create_span.set(outcome="error")
+                return None
+
+        log.info("[RuCaptcha] ✔ taskId = %s", task_id)
+        return task_id
+
+    async def get_result(self, task_id) -> dict:
+        return await self._post("getTaskResult", {"clientKey": self.key, "taskId": task_id}, timeout=15)
+
+    async def wait_result(self, task_id, started: float) -> dict | None:
+        """
+        Опрашивает getTaskResult до готовности; возвращает solution или None.
+        Сбои сети и битый JSON — повтор до общего таймаута (задача уже оплачена),
+        сдаёмся только на ошибке RuCaptcha (errorId).
+        """
+        log.debug("[RuCaptcha] ⏳ Жду решение...")
+
+        delay = self._first_delay()
+        interval = self.min_interval
+
+        while True:
+            remaining = self.timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                log.error("[RuCaptcha] ❌ Таймаут ожидания решения (>%.0f сек)", self.timeout)
+                return None
+
+            await asyncio.sleep(min(delay, remaining))
+            delay = interval
+            interval = min(self.max_interval, interval * 1.5)
+
+            try:
+                rd = await self.get_result(task_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("[RuCaptcha] Ошибка getTaskResult, повторю: %s", e)
+                continue
+
+            if rd.get("errorId"):
+                log.error("[RuCaptcha] ❌ errorId != 0: %s", rd)
+                return None
+
+            if rd.get("status") == "ready":
+                log.info("[RuCaptcha] 🎉 Решение готово!")
+                self._observe(time.monotonic() - started)
+                return rd.get("solution") or {}
+
+    async def wait_pingback(self, task_id, waiter: asyncio.Future, started: float) -> dict | None:
+        """Ждёт pingback; если его долго нет — разово проверяет getTaskResult."""
+        log.debug("[RuCaptcha] ⏳ Жду pingback...")
+
+        while True:
+            remaining = self.timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                log.error("[RuCaptcha] ❌ Таймаут ожидания решения (>%.0f сек)", self.timeout)
+                return None
+
+            try:
+                solution = await asyncio.wait_for(asyncio.shield(waiter), min(self.pingback_fallback, remaining))
+                log.info("[RuCaptcha] 🎉 Решение пришло pingback'ом!")
+                self._observe(time.monotonic() - started)
+                return solution
+            except asyncio.TimeoutError:
+                pass
+
+            # Fallback: callback мог потеряться
+            try:
+                rd = await self.get_result(task_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("[RuCaptcha] ❌ Ошибка getTaskResult: %s", e)
+                continue
+
+            if rd.get("errorId"):
+                log.error("[RuCaptcha] ❌ errorId != 0: %s", rd)
+                return None
+
+            if rd.get("status") == "ready":
+                log.info("[RuCaptcha] 🎉 Решение готово (fallback getTaskResult)")
+                self._observe(time.monotonic() - started)
+                return rd.get("solution") or {}
+
+    async def solve_task(self, task: dict) -> dict | None:
+        with span("rucaptcha.solve") as solve_span:
+            if self._pending is not None:
+                # Очередь на наш собственный лимит max_pending
+                queued = time.perf_counter()
+                async with self._pending:
+                    observe("rucaptcha.queue", time.perf_counter() - queued)
+                    solution = await self._solve_task(task)
+            else:
+                solution = await self._solve_task(task)
+            if solution is None:
+                solve_span.set(outcome="failed")
+            return solution
+
+    async def _solve_task(self, task: dict) -> dict | None:
+        started = time.monotonic()
+
+        if self.pingback is None:
+            task_id = await self.create_task(task)
+            if not task_id:
+                return None
+            try:
+                # Очередь воркеров RuCaptcha + само решение
+                with span("rucaptcha.wait", mode="poll"):
+                    return await self.wait_result(task_id, started)
+            except asyncio.CancelledError:
+                log.info("[RuCaptcha] Задача %s отменена", task_id)
+                raise
+
+        await self.pingback.start()
+        task_id = await self.create_task(task, callbackUrl=self.pingback.url)
+        if not task_id:
+            return None
+
+        waiter = self.pingback.register(task_id)
+        try:
+            with span("rucaptcha.wait", mode="pingback"):
+                return await self.wait_pingback(task_id, waiter, started)
+        except asyncio.CancelledError:
+            log.info("[RuCaptcha] Задача %s отменена", task_id)
+            raise
+        finally:
+            self.pingback.discard(task_id)
+
+    async def solve(self, captcha: dict) -> int | None:
+        """VK slider captcha (parse_captcha_notrobot) → best_step."""
+        image_b64 = captcha.get("image")
+        steps = captcha.get("steps") or []
+
+        if not image_b64 or not steps:
+            log.error("[RuCaptcha] ❌ Нет image или steps — не могу отправить задачу.")
+            return None
+
+        try:
+            steps = [int(x) for x in steps]
+        except Exception:
+            log.error("[RuCaptcha] ❌ steps не приводятся к int: %s", steps)
+            return None
+
+        solution = await self.solve_task({
+            "type": "VKCaptchaImageTask",
+            "image": image_b64,
+            "steps": steps,
+        })
+
+        best_step = (solution or {}).get("best_step")
+
+        if best_step is None:
+            log.warning("[RuCaptcha] ❌ best_step не получен")
+        else:
+            log.info("[RuCaptcha] ✔ best_step = %s", best_step)
+
+        return best_step
@@ -0,0 +1,347 @@
+import os
+import time
+import zlib
+import pickle
+import asyncio
+import logging
+import itertools
+import threading
+import multiprocessing
+
+from libs.vk.vk_models import *
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_async import AsyncVK
+from libs.vk.vk_browser_pool import BrowserPool
+from libs.vk.vk_http import HTTPPool
+from libs.vk.vk_metrics import span
+from libs.vk.vk_token_store import SQLiteTokenStore, is_token_fresh
+
+__all__ = ['ShardPool', 'shard_of']
+
+log = logging.getLogger(__name__)
+
+
+def shard_of(login: str, shards: int) -> int:
+    """Номер шарды аккаунта. crc32, а не hash(): hash строк случаен в каждом процессе."""
+    return zlib.crc32(login.encode()) % shards
+
+
+def _error(e: BaseException) -> dict:
+    # APIError не пиклится (VKError без args) — через очередь едет сырой dict ошибки VK
+    if isinstance(e, VKExceptions.APIError):
+        return {"error_code": e.code, "error_msg": e.msg}
+    return {"error_code": -1, "error_msg": f"{type(e).__name__}: {e}"}
+
+
+# ----------------------------------------------------------------------------
+#                         ПРОЦЕСС-ШАРДА
+# ----------------------------------------------------------------------------
+
+class _Worker:
+    """
+    Одна шарда: свой event loop, свои AsyncVK по аккаунтам, свои HTTPPool и BrowserPool.
+    Задания (job_id, op, login, args) читаются из jobs, ответы (job_id, ok, payload) — в results.
+    """
+
+    def __init__(self, index: int, jobs, results, store_path: str, client_options: dict, browser_options: dict):
+        self.index = index
+        self.jobs = jobs
+        self.results = results
+        self.store = SQLiteTokenStore(store_path)
+        self.client_options = client_options
+        self.browser_options = browser_options
+        self.browser_pool: BrowserPool | None = None
+        self.clients: dict[str, AsyncVK] = {}
+
+    def client(self, login: str) -> AsyncVK:
+        vk = self.clients.get(login)
+        if vk is None:
+            vk = self.clients[login] = AsyncVK(
+                token_store=self.store, browser_pool=self.browser_pool, **self.client_options
+            )
+            vk.account = login
+        return vk
+
+    async def auth(self, login: str, password: str, proxy, force: bool):
+        vk = self.client(login)
+        if proxy:
+            vk.set_proxy(proxy)
+        return await vk.auth(login, password, force=force)
+
+    async def call(self, login: str, endpoint: str, params: dict, model):
+        vk = self.client(login)
+        if not vk.access_token:
+            # После рестарта шарды (или auth в другой шарде до решардинга) — токен из общего хранилища;
+            # чтение SQLite — в потоке, чтобы холодная шарда не стопорила остальные задания
+            stored = await asyncio.to_thread(self.store.get, login)
+            if not is_token_fresh(stored):
+                raise VKExceptions.APIError(VKError({"error_code": 5, "error_msg": "no stored token for account"}))
+            vk.set_session(stored)
+
+        try:
+            return await vk.call_api(endpoint, params, model=model)
+        except VKExceptions.APIError as e:
+            if e.code == 5:
+                # Токен отозван — следующий вызов перечитает хранилище (его мог обновить рефрешер)
+                vk.access_token = None
+            raise
+
+    async def handle(self, job_id: int, op: str, login: str, args: tuple):
+        try:
+            if op == "auth":
+                result = (job_id, True, await self.auth(login, *args))
+            else:
+                result = (job_id, True, await self.call(login, *args))
+        except Exception as e:
+            result = (job_id, False, _error(e))
+
+        # Ошибка пикла в фоновом потоке очереди до вызывающего не дошла бы —
+        # future так и висел бы (процесс жив, _on_crash не сработает)
+        try:
+            pickle.dumps(result)
+        except Exception as e:
+            result = (job_id, False, _error(e))
+        self.results.put(result)
+
+    async def serve(self):
+        self.browser_pool = BrowserPool(**self.browser_options)
+        loop = asyncio.get_running_loop()
+        tasks = set()
+
+        log.info("[VKShard] Шарда %d запущена (pid %d)", self.index, os.getpid())
+        try:
+            while True:
+                job = await loop.run_in_executor(None, self.jobs.get)
+                if job is None:
+                    break
+                task = asyncio.create_task(self.handle(*job))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await self.browser_pool.close()
+            await HTTPPool.default().close()
+            self.store.close()
+
+
+def _worker_main(index, jobs, results, store_path, client_options, browser_options, initializer):
+    if initializer is not None:
+        initializer()
+    asyncio.run(_Worker(index, jobs, results, store_path, client_options, browser_options).serve())
+
+
+# ----------------------------------------------------------------------------
+#                         СУПЕРВИЗОР
+# ----------------------------------------------------------------------------
+
+class _Shard:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.jobs = None
+        self.pending: set[int] = set()
+        self.started_at = 0.0
+        self.restarts = 0
+        self.crashes_in_row = 0
+        self.restarting = False
+
+
+class ShardPool:
+    """
+    Супервизор N процессов-шард для тысяч аккаунтов на одной машине.
+
+    Аккаунт закреплён за шардой (shard_of по логину), его auth/call_api
+    уходят в очередь этой шарды; каждая шарда — отдельный процесс со своим
+    event loop, сессиями AsyncVK и BrowserPool, так что Playwright и разбор
+    JSON грузят все ядра. Токены общие — SQLiteTokenStore (WAL) по одному пути.
+    Упавшая шарда перезапускается (с растущей задержкой, если падает сразу),
+    её незавершённые задания завершаются APIError(-1); повторять ли их — решает вызывающий.
+
+    client_options — аргументы AsyncVK в шардах (batch, cache, scheduler...),
+    browser_options — аргументы BrowserPool, initializer — вызывается в начале
+    каждого процесса (логирование и т.п.). Всё это должно пиклиться.
+    """
+
+    def __init__(self, shards: int | None = None, token_store_path: str = 'vk_tokens.sqlite3',
+                 client_options: dict | None = None, browser_options: dict | None = None,
+                 initializer=None, restart_delay: float = 1.0, max_restart_delay: float = 30.0,
+                 check_interval: float = 0.5, stop_timeout: float = 30.0):
+        self.shards = shards or os.cpu_count() or 1
+        self.token_store_path = token_store_path
+        self.client_options = client_options or {}
+        self.browser_options = {"headless": True} | (browser_options or {})
+        self.initializer = initializer
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.check_interval = check_interval
+        self.stop_timeout = stop_timeout
+
+        # spawn: fork процесса с потоками (vk-loop, aiohttp, Playwright) небезопасен
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shards = [_Shard(i) for i in range(self.shards)]
+        self._pending: dict[int, tuple[asyncio.Future, _Shard]] = {}
+        self._ids = itertools.count()
+        self._results = None
+        self._reader: threading.Thread | None = None
+        self._watcher: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closing = False
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ---------------- процессы ----------------
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._results = self._ctx.Queue()
+        for shard in self._shards:
+            shard.jobs = self._ctx.Queue()
+            self._spawn(shard)
+
+        self._reader = threading.Thread(target=self._read_results, name="vk-shard-results", daemon=True)
+        self._reader.start()
+        self._watcher = asyncio.create_task(self._watch())
+        return self
+
+    def _spawn(self, shard: _Shard):
+        shard.restarting = False
+        shard.started_at = time.monotonic()
+        shard.process = self._ctx.Process(
+            target=_worker_main,
+            args=(shard.index, shard.jobs, self._results, self.token_store_path,
+                  self.client_options, self.browser_options, self.initializer),
+            name=f"vk-shard-{shard.index}",
+            daemon=True,
+        )
+        shard.process.start()
+
+    async def _watch(self):
+        while not self._closing:
+            await asyncio.sleep(self.check_interval)
+            for shard in self._shards:
+                if shard.restarting or shard.process.is_alive() or self._closing:
+                    continue
+                self._on_crash(shard)
+
+    def _on_crash(self, shard: _Shard):
+        uptime = time.monotonic() - shard.started_at
+        log.warning("[VKShard] Шарда %d упала (код %s) через %.1f сек, потеряно заданий: %d",
+                    shard.index, shard.process.exitcode, uptime, len(shard.pending))
+
+        for job_id in list(shard.pending):
+            self._fail(job_id, {"error_code": -1, "error_msg": f"shard {shard.index} worker died"})
+
+        # Задания, не взятые умершим процессом, остались в старой очереди — она выбрасывается
+        shard.jobs = self._ctx.Queue()
+        shard.restarts += 1
+        shard.crashes_in_row = shard.crashes_in_row + 1 if uptime < 60 else 1
+        delay = min(self.max_restart_delay, self.restart_delay * 2 ** (shard.crashes_in_row - 1))
+
+        shard.restarting = True
+        self._loop.call_later(delay, self._respawn, shard)
+
+    def _respawn(self, shard: _Shard):
+        if not self._closing:
+            self._spawn(shard)
+
+    # ---------------- ответы ----------------
+
+    def _read_results(self):
+        while True:
+            result = self._results.get()
+            if result is None:
+                return
+            self._loop.call_soon_threadsafe(self._resolve, *result)
+
+    def _resolve(self, job_id: int, ok: bool, payload):
+        entry = self._pending.pop(job_id, None)
+        if entry is None:
+            return
+        future, shard = entry
+        shard.pending.discard(job_id)
+        if future.done():
+            return
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(VKExceptions.APIError(VKError(payload)))
+
+    def _fail(self, job_id: int, error: dict):
+        self._resolve(job_id, False, error)
+
+    # ---------------- задания ----------------
+
+    async def _submit(self, login: str, op: str, args: tuple):
+        if self._loop is None or self._closing:
+            raise RuntimeError("ShardPool не запущен")
+
+        shard = self._shards[shard_of(login, self.shards)]
+        job_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[job_id] = (future, shard)
+        shard.pending.add(job_id)
+
+        with span("shard.job", op=op):
+            shard.jobs.put((job_id, op, login, args))
+            try:
+                return await future
+            finally:
+                # Отмена: задание доработает в шарде, ответ будет проигнорирован
+                if self._pending.pop(job_id, None) is not None:
+                    shard.pending.discard(job_id)
+
+    async def auth(self, login: str, password: str, proxy=None, force: bool = False) -> dict | None:
+        """AsyncVK.auth в шарде аккаунта; токен сохраняется в общий token store."""
+        return await self._submit(login, "auth", (password, proxy, force))
+
+    async def call_api(self, login: str, endpoint: str, params=None, model=None):
+        """
+        AsyncVK.call_api от имени аккаунта в его шарде. Сессия берётся из
+        предыдущего auth или из token store; нет токена — APIError(5).
+        """
+        return await self._submit(login, "call", (endpoint, params or {}, model))
+
+    # ---------------- остановка ----------------
+
+    async def close(self):
+        if self._closing or self._loop is None:
+            return
+        self._closing = True
+        if self._watcher is not None:
+            self._watcher.cancel()
+
+        for shard in self._shards:
+            if shard.process is not None and shard.process.is_alive():
+                shard.jobs.put(None)
+
+        loop = asyncio.get_running_loop()
+        for shard in self._shards:
+            if shard.process is None:
+                continue
+            await loop.run_in_executor(None, shard.process.join, self.stop_timeout)
+            if shard.process.is_alive():
+                log.warning("[VKShard] Шарда %d не остановилась за %.0f сек — terminate", shard.index, self.stop_timeout)
+                shard.process.terminate()
+                await loop.run_in_executor(None, shard.process.join)
+
+        self._results.put(None)
+        await loop.run_in_executor(None, self._reader.join)
+
+        for job_id in list(self._pending):
+            self._fail(job_id, {"error_code": -1, "error_msg": "shard pool closed"})
+
+    def stats(self) -> list[dict]:
+        return [{
+            "shard": shard.index,
+            "pid": shard.process.pid if shard.process is not None else None,
+            "alive": shard.process is not None and shard.process.is_alive(),
+            "pending": len(shard.pending),
+            "restarts": shard.restarts,
+        } for shard in self._shards]
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+
+from libs.vk.vk_exceptions import VKExceptions
+from libs.vk.vk_async import AsyncVK
+from libs.vk.vk_token_store import TokenStore, is_token_fresh
+
+__all__ = ['TokenRefresher']
+
+log = logging.getLogger(__name__)
+
+# 5 — User authorization failed (токен отозван / протух)
+INVALID_TOKEN_ERROR_CODES = (5,)
+
+
+class TokenRefresher:
+    """
+    Фоновое обслуживание token store вне пути запросов:
+      - пачкой проверяет сохранённые токены (users.get, параллельно);
+      - аккаунты с невалидными или истекающими токенами переавторизует.
+
+    credentials: username → (password, proxy) | None. Без пароля аккаунт
+    переавторизовать нельзя — такой токен просто удаляется из store.
+    """
+
+    def __init__(self, store: TokenStore, credentials, interval: float = 3600, margin: float = 86400,
+                 concurrency: int = 20, vk_factory=AsyncVK):
+        self.store = store
+        self.credentials = credentials if callable(credentials) else credentials.get
+        self.interval = interval
+        self.margin = margin
+        self.concurrency = concurrency
+        self.vk_factory = vk_factory
+        self._task: asyncio.Task | None = None
+
+    async def _validate(self, auth_data: dict) -> bool | None:
+        """True — токен жив, False — VK его отверг, None — проверить не удалось (сеть/прокси)."""
+        vk = self.vk_factory().set_session(auth_data)
+        try:
+            await vk.call_api('users.get')
+            return True
+        except VKExceptions.APIError as e:
+            if e.code in INVALID_TOKEN_ERROR_CODES:
+                return False
+            return None
+
+    async def _reauth(self, username: str, auth_data: dict) -> bool:
+        creds = self.credentials(username)
+        if not creds:
+            log.warning("[TokenRefresher] %s: нет пароля — удаляю токен", username)
+            await asyncio.to_thread(self.store.delete, username)
+            return False
+
+        password, proxy = creds
+        vk = self.vk_factory(token_store=self.store)
+        vk.device_id = auth_data.get('device_id')
+        vk.set_proxy(proxy or auth_data.get('proxy'))
+        try:
+            return bool(await vk.auth(username, password, force=True))
+        except VKExceptions.APIError as e:
+            log.warning("[TokenRefresher] %s: переавторизация не удалась: %s %s", username, e.code, e.msg)
+            return False
+
+    async def refresh_once(self) -> dict:
+        stats = {"checked": 0, "valid": 0, "refreshed": 0, "failed": 0, "unknown": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def process(username: str, auth_data: dict):
+            async with semaphore:
+                stats["checked"] += 1
+
+                if is_token_fresh(auth_data, self.margin):
+                    valid = await self._validate(auth_data)
+                    if valid is None:
+                        stats["unknown"] += 1
+                        return
+                    if valid:
+                        stats["valid"] += 1
+                        return
+
+                if await self._reauth(username, auth_data):
+                    stats["refreshed"] += 1
+                else:
+                    stats["failed"] += 1
+
+        items = await asyncio.to_thread(lambda: list(self.store.items()))
+        await asyncio.gather(*(process(username, auth_data) for username, auth_data in items))
+
+        log.info("[TokenRefresher] %s", stats)
+        return stats
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("[TokenRefresher] ❌ Ошибка обхода: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,124 @@
+import abc
+import json
+import time
+import sqlite3
+import threading
+
+__all__ = ['TokenStore', 'MemoryTokenStore', 'SQLiteTokenStore', 'is_token_fresh']
+
+
+def is_token_fresh(auth_data: dict, margin: float = 0) -> bool:
+    """
+    Токен годен, если есть access_token и до истечения больше margin секунд.
+    expires_at == 0 — бессрочный токен (scope=all / offline).
+    """
+    if not auth_data or not auth_data.get('access_token'):
+        return False
+    expires_at = auth_data.get('expires_at') or 0
+    return expires_at == 0 or expires_at - time.time() > margin
+
+
+def _with_expiry(auth_data: dict) -> dict:
+    """Переводим относительный expires_in из ответа VK в абсолютный expires_at."""
+    data = dict(auth_data)
+    if 'expires_at' not in data:
+        expires_in = int(data.get('expires_in') or 0)
+        data['expires_at'] = time.time() + expires_in if expires_in else 0
+    data['stored_at'] = time.time()
+    return data
+
+
+class TokenStore(abc.ABC):
+    """Хранилище auth_data по username. Наследники реализуют _load/_save/delete/usernames."""
+
+    def get(self, username: str) -> dict | None:
+        return self._load(username)
+
+    def put(self, username: str, auth_data: dict):
+        self._save(username, _with_expiry(auth_data))
+
+    @abc.abstractmethod
+    def delete(self, username: str):
+        ...
+
+    @abc.abstractmethod
+    def usernames(self) -> list[str]:
+        ...
+
+    def items(self):
+        for username in self.usernames():
+            auth_data = self._load(username)
+            if auth_data is not None:
+                yield username, auth_data
+
+    @abc.abstractmethod
+    def _load(self, username: str) -> dict | None:
+        ...
+
+    @abc.abstractmethod
+    def _save(self, username: str, auth_data: dict):
+        ...
+
+
+class MemoryTokenStore(TokenStore):
+    def __init__(self):
+        self._data: dict[str, dict] = {}
+
+    def delete(self, username: str):
+        self._data.pop(username, None)
+
+    def usernames(self) -> list[str]:
+        return list(self._data)
+
+    def _load(self, username: str) -> dict | None:
+        auth_data = self._data.get(username)
+        return dict(auth_data) if auth_data is not None else None
+
+    def _save(self, username: str, auth_data: dict):
+        self._data[username] = auth_data
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Хранилище по умолчанию: один SQLite-файл, WAL-режим, чтобы
+    несколько процессов могли читать/писать токены одновременно.
+    """
+
+    def __init__(self, path: str = 'vk_tokens.sqlite3'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                " username TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " expires_at REAL NOT NULL DEFAULT 0,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def delete(self, username: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM tokens WHERE username = ?", (username,))
+
+    def usernames(self) -> list[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT username FROM tokens").fetchall()
+        return [row[0] for row in rows]
+
+    def _load(self, username: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM tokens WHERE username = ?", (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _save(self, username: str, auth_data: dict):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tokens (username, data, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+                (username, json.dumps(auth_data, ensure_ascii=False), auth_data.get('expires_at') or 0, time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,106 @@
+import asyncio
+from urllib.parse import urlparse
+
+__all__ = ['ResourceBlocker', 'BLOCKED_RESOURCE_TYPES', 'BLOCKED_HOSTS', 'BLOCKED_URL_PARTS',
+           'ALLOWED_URL_PARTS']
+
+# Логину и слайдеру картинки/шрифты/медиа не нужны: картинка капчи
+# приходит base64 внутри captchaNotRobot.getContent. "other" не режем:
+# туда Playwright относит часть fetch/beacon'ов и запросов виджета капчи
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "texttrack", "eventsource", "manifest"}
+
+# Счётчики, аналитика и рекламные маяки (с поддоменами)
+BLOCKED_HOSTS = (
+    "top-fwz1.mail.ru",
+    "mc.yandex.ru",
+    "ad.mail.ru",
+    "r.mradx.net",
+    "ads.vk.com",
+    "vk-portal.net",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+)
+
+# Телеметрия VK на основных доменах — по пути запроса
+BLOCKED_URL_PARTS = ("/rtrg", "/method/statEvents.", "/method/stats.trackEvents")
+
+# Всё, что относится к капче, пропускаем без проверок
+ALLOWED_URL_PARTS = ("captcha", "not_robot", "is_robot", "captchaNotRobot")
+
+
+class ResourceBlocker:
+    """
+    Перехват запросов BrowserContext'а: режет необязательные типы ресурсов
+    и трекеры, пропуская всё, что нужно форме логина и iframe капчи,
+    и считает трафик (заголовки + тела) за один логин.
+    """
+
+    def __init__(self, block_types=BLOCKED_RESOURCE_TYPES, block_hosts=BLOCKED_HOSTS,
+                 block_parts=BLOCKED_URL_PARTS, allow_parts=ALLOWED_URL_PARTS):
+        self.block_types = set(block_types)
+        self.block_hosts = tuple(block_hosts)
+        self.block_parts = tuple(block_parts)
+        self.allow_parts = tuple(allow_parts)
+
+        self.requests = 0
+        self.blocked = 0
+        self.bytes = 0
+        self._pending: set[asyncio.Task] = set()
+
+    async def attach(self, context):
+        await context.route("**/*", self._route)
+        context.on("requestfinished", self._on_finished)
+
+    def _allowed(self, request) -> bool:
+        url = request.url
+        if any(part in url for part in self.allow_parts):
+            return True
+        try:
+            frame_url = request.frame.url or ""
+        except Exception:
+            frame_url = ""
+        return any(part in frame_url for part in self.allow_parts)
+
+    def _blocked(self, request) -> bool:
+        if request.resource_type in self.block_types:
+            return True
+        url = urlparse(request.url)
+        host = url.hostname or ""
+        if any(host == h or host.endswith("." + h) for h in self.block_hosts):
+            return True
+        return any(part in url.path for part in self.block_parts)
+
+    async def _route(self, route):
+        request = route.request
+        self.requests += 1
+
+        if not self._allowed(request) and self._blocked(request):
+            self.blocked += 1
+            await route.abort("blockedbyclient")
+            return
+
+        await route.continue_()
+
+    def _on_finished(self, request):
+        task = asyncio.ensure_future(self._count(request))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _count(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.bytes += (
+            sizes.get("requestHeadersSize", 0) + sizes.get("requestBodySize", 0)
+            + sizes.get("responseHeadersSize", 0) + sizes.get("responseBodySize", 0)
+        )
+
+    async def flush(self):
+        """Дожидается подсчёта размеров уже завершённых запросов."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "blocked": self.blocked, "bytes": self.bytes}
@@ -0,0 +1,108 @@
+__all__ = ['Model', 'User', 'Group', 'Post', 'Message', 'Page', 'parse']
+
+
+class Model:
+    """
+    Компактная модель ответа VK на __slots__: известные поля — слоты,
+    остальное (если есть и extra=True) — в extra. Создаётся из уже разобранного dict.
+    """
+
+    __slots__ = ('extra',)
+    FIELDS: tuple[str, ...] = ()
+    _FIELD_SET: frozenset = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.pop(name, None))
+        self.extra = fields or None
+
+    @classmethod
+    def from_dict(cls, data: dict, extra: bool = True):
+        """extra=False — неописанные поля отбрасываются (меньше памяти)."""
+        obj = cls.__new__(cls)
+        get = data.get
+        for name in cls.FIELDS:
+            setattr(obj, name, get(name))
+        unknown = data.keys() - cls._FIELD_SET if extra else None
+        obj.extra = {k: data[k] for k in unknown} if unknown else None
+        return obj
+
+    def to_dict(self) -> dict:
+        data = {name: getattr(self, name) for name in self.FIELDS if getattr(self, name) is not None}
+        return data | (self.extra or {})
+
+    def __getattr__(self, name):
+        # Поля, запрошенные через fields=..., но не описанные моделью
+        extra = object.__getattribute__(self, 'extra')
+        if extra and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    # Модели изменяемые и сравниваются по содержимому — ключами dict/set они не служат
+    # (для дедупликации — по .id)
+    __hash__ = None
+
+    def __repr__(self):
+        shown = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS[:3])
+        return f"{type(self).__name__}({shown})"
+
+
+class User(Model):
+    FIELDS = ('id', 'first_name', 'last_name', 'deactivated', 'is_closed', 'can_access_closed')
+    __slots__ = FIELDS
+
+
+class Group(Model):
+    FIELDS = ('id', 'name', 'screen_name', 'is_closed', 'type', 'deactivated')
+    __slots__ = FIELDS
+
+
+class Post(Model):
+    FIELDS = ('id', 'owner_id', 'from_id', 'date', 'text', 'attachments', 'likes', 'reposts', 'comments', 'views')
+    __slots__ = FIELDS
+
+
+class Message(Model):
+    FIELDS = ('id', 'peer_id', 'from_id', 'date', 'text', 'out', 'conversation_message_id', 'attachments')
+    __slots__ = FIELDS
+
+
+class Page:
+    """Ответ offset/count-метода: {"count": N, "items": [...]}."""
+
+    __slots__ = ('count', 'items')
+
+    def __init__(self, count: int, items: list):
+        self.count = count
+        self.items = items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"Page(count={self.count}, items={len(self.items)})"
+
+
+def parse(response, model: type[Model], extra: bool = True):
+    """
+    response call_api → модели: список → list[model], {count, items} → Page,
+    dict → model. Элементы-не-dict (например, id в friends.get без fields) не трогаем.
+    """
+    if isinstance(response, list):
+        from_dict = model.from_dict
+        return [from_dict(x, extra) if type(x) is dict else x for x in response]
+    if isinstance(response, dict):
+        if "items" in response and "count" in response:
+            return Page(response["count"], parse(response["items"], model, extra))
+        return model.from_dict(response, extra)
+    return response